@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预处理与OCR热点路径性能基准
+
+生成合成的身份证样式图片（不同尺寸、旋转角度和噪声），分别统计
+程序启动（导入模块、创建识别器）、ImagePreprocessor各阶段、各预处理档位和识别器各入口的耗时，结果以JSON输出，便于在不同提交之间对比。
+
+用法：
+    python benchmark.py -o bench.json                      # 运行并保存结果
+    python benchmark.py --compare bench.json               # 与之前的结果对比，超出阈值时退出码为1
+    python benchmark.py --backends tesseract,opencv_dnn --dnn-model crnn.onnx --dnn-vocabulary alphabet.txt
+                                                           # 在相同的区域图像上对比OCR后端
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from config.settings import (ID_CARD_REGIONS, TESSERACT_CONFIGS, OCR_DNN_INPUT_SIZE, OCR_DNN_CHANNELS, OCR_BATCH_SIZE,
+                             PREPROCESS_PROFILES)
+from ocr.preprocessor import ImagePreprocessor
+from utils.metrics import PipelineMetrics
+
+
+# 常见的中文字体位置（Windows / macOS / Linux）
+CJK_FONT_CANDIDATES = [
+    r"C:\Windows\Fonts\simhei.ttf",
+    r"C:\Windows\Fonts\msyh.ttc",
+    r"C:\Windows\Fonts\simsun.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+]
+
+SAMPLE_NAMES = ['张三', '李四', '王小明', '欧阳娜娜', '赵敏', '阿依古丽']
+SAMPLE_ETHNICITIES = ['汉', '回', '满', '蒙古', '维吾尔', '朝鲜', '壮', '藏']
+
+# 合成图片的变化范围：(卡片宽度像素, 旋转角度, 噪声标准差)
+DEFAULT_VARIANTS = [
+    (640, 0, 0),
+    (1000, 3, 5),
+    (1600, -5, 10),
+    (2400, 8, 15),
+    (3200, 2, 8),
+]
+
+# 身份证标准宽高比（ID-1：85.6mm x 54mm）
+CARD_ASPECT = 85.6 / 54
+
+
+def find_cjk_font():
+    """查找可用的中文字体，找不到时返回None"""
+    for path in CJK_FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_font(font_path, size):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    try:
+        # Pillow 10.1+ 支持指定默认字体大小
+        return ImageFont.load_default(size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def render_card(card_width, rotation, noise, rng, font_path):
+    """渲染一张合成身份证图片（BGR），卡片放在深色桌面背景上"""
+    card_height = int(card_width / CARD_ASPECT)
+    card = Image.new('RGB', (card_width, card_height), (236, 240, 244))
+    draw = ImageDraw.Draw(card)
+    draw.rectangle([0, 0, card_width - 1, card_height - 1], outline=(180, 190, 200), width=max(2, card_width // 300))
+
+    label_font = load_font(font_path, max(10, int(card_height * 0.05)))
+    value_font = load_font(font_path, max(12, int(card_height * 0.065)))
+
+    name = rng.choice(SAMPLE_NAMES)
+    ethnicity = rng.choice(SAMPLE_ETHNICITIES)
+
+    # 标签位于区域左侧，内容位于ID_CARD_REGIONS定义的区域内
+    for label, value, region in (('姓名', name, ID_CARD_REGIONS['name']),
+                                 ('民族', ethnicity, ID_CARD_REGIONS['ethnicity'])):
+        y = int((region['y'] + region['height'] * 0.2) * card_height)
+        draw.text((int(0.04 * card_width), y), label, fill=(90, 120, 160), font=label_font)
+        draw.text((int((region['x'] + 0.01) * card_width), y), value, fill=(20, 20, 20), font=value_font)
+
+    # 其余字段，增加版面上的干扰
+    for i, line in enumerate(('性别 男', '出生 1990年1月1日', '住址 某省某市某区某街道1号')):
+        y = int((0.45 + i * 0.12) * card_height)
+        draw.text((int(0.04 * card_width), y), line, fill=(40, 40, 40), font=label_font)
+
+    # 放到比卡片大的背景上并旋转
+    margin = card_width // 5
+    background = Image.new('RGB', (card_width + 2 * margin, card_height + 2 * margin), (70, 60, 50))
+    background.paste(card, (margin, margin))
+    if rotation:
+        background = background.rotate(rotation, resample=Image.BICUBIC, expand=False, fillcolor=(70, 60, 50))
+
+    image = cv2.cvtColor(np.array(background), cv2.COLOR_RGB2BGR)
+    if noise:
+        noise_rng = np.random.default_rng(rng.randint(0, 2 ** 31))
+        image = np.clip(image + noise_rng.normal(0, noise, image.shape), 0, 255).astype(np.uint8)
+    return image, {'name': name, 'ethnicity': ethnicity + '族'}
+
+
+def generate_dataset(output_dir, variants, seed):
+    """生成合成图片，返回[(路径, 描述, 真值)]"""
+    rng = random.Random(seed)
+    font_path = find_cjk_font()
+    samples = []
+    for index, (width, rotation, noise) in enumerate(variants):
+        image, truth = render_card(width, rotation, noise, rng, font_path)
+        path = os.path.join(output_dir, f"card_{index:02d}_{width}px.jpg")
+        cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        samples.append((path, {'width': width, 'rotation': rotation, 'noise': noise}, truth))
+    return samples, font_path
+
+
+def time_call(func, repeat):
+    """预热一次后重复执行，返回(各次耗时毫秒列表, 最后一次的返回值)"""
+    timings = []
+    result = func()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.mean(ordered), 3),
+        'median_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)], 3),
+        'min_ms': round(ordered[0], 3),
+    }
+
+
+def bench_preprocessor(samples, repeat):
+    """逐阶段统计预处理耗时，每个阶段的输入为上一阶段的输出"""
+    preprocessor = ImagePreprocessor()
+    stage_timings = {name: [] for name in ('load_image', 'resize_image', 'denoise_image',
+                                           'enhance_contrast', 'detect_id_card', 'extract_text_regions')}
+
+    for path, _, _ in samples:
+        max_size = (preprocessor.max_width, preprocessor.max_height) if preprocessor.reduced_decode else None
+        timings, source = time_call(lambda: preprocessor.load_image(path, max_size), repeat)
+        stage_timings['load_image'] += timings
+        timings, image = time_call(lambda: preprocessor.resize_image(source), repeat)
+        stage_timings['resize_image'] += timings
+        timings, image = time_call(lambda: preprocessor.denoise_image(image), repeat)
+        stage_timings['denoise_image'] += timings
+        timings, image = time_call(lambda: preprocessor.enhance_contrast(image), repeat)
+        stage_timings['enhance_contrast'] += timings
+        timings, card = time_call(lambda: preprocessor.detect_id_card(image, source), repeat)
+        stage_timings['detect_id_card'] += timings
+        timings, _ = time_call(lambda: preprocessor.extract_text_regions(card, ID_CARD_REGIONS), repeat)
+        stage_timings['extract_text_regions'] += timings
+
+    return {name: summarize(timings) for name, timings in stage_timings.items()}
+
+
+def bench_profiles(samples, repeat):
+    """各预处理档位完整预处理流程的耗时，以及按解码像素数折算的每百万像素耗时"""
+    results = {}
+    for profile in PREPROCESS_PROFILES:
+        preprocessor = ImagePreprocessor(profile)
+        timings = []
+        total_ms = 0.0
+        megapixels = 0.0
+        for path, _, _ in samples:
+            sample_timings, _ = time_call(lambda: preprocessor.preprocess_for_ocr(path), repeat)
+            timings += sample_timings
+            metrics = PipelineMetrics()
+            preprocessor.preprocess_for_ocr(path, metrics)
+            total_ms += sum(sample_timings)
+            megapixels += metrics.counters['decoded_pixels'] / 1e6 * len(sample_timings)
+        summary = summarize(timings)
+        summary['ms_per_megapixel'] = round(total_ms / megapixels, 3)
+        results[profile] = summary
+    return results
+
+
+# 启动耗时在新进程中测量，避免受本进程已导入模块的影响
+STARTUP_SNIPPETS = {
+    'import_gui': "import gui.main_window",
+    'import_recognizer': "import ocr.recognizer",
+    'create_recognizer': "from ocr.recognizer import IDCardRecognizer; IDCardRecognizer()",
+}
+
+
+def bench_startup(repeat):
+    """在新的Python进程中分别统计导入界面模块、导入识别模块和创建识别器的耗时"""
+    results = {}
+    for name, snippet in STARTUP_SNIPPETS.items():
+        code = ("import time; start = time.perf_counter(); " + snippet +
+                "; print('elapsed_ms', (time.perf_counter() - start) * 1000)")
+        timings = []
+        for _ in range(repeat):
+            output = subprocess.check_output([sys.executable, '-c', code], cwd=src_dir,
+                                             stderr=subprocess.DEVNULL).decode()
+            timings.append(float(output.split('elapsed_ms')[-1]))
+        results[name] = summarize(timings)
+    return results
+
+
+def bench_recognizer(samples, repeat):
+    """统计识别器各入口耗时及识别准确数，Tesseract不可用时跳过"""
+    import pytesseract
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        return {'skipped': f"Tesseract不可用: {e}"}
+
+    from ocr.recognizer import IDCardRecognizer
+    recognizer = IDCardRecognizer()
+
+    entry_points = {
+        'recognize': lambda path: recognizer.recognize(path),
+        'recognize_with_regions': lambda path: recognizer.recognize_with_regions(path, ID_CARD_REGIONS),
+        'recognize_with_multiple_methods': lambda path: recognizer.recognize_with_multiple_methods(path),
+    }
+
+    results = {}
+    for entry_name, entry in entry_points.items():
+        timings = []
+        correct = {'name': 0, 'ethnicity': 0}
+        for path, _, truth in samples:
+            sample_timings, result = time_call(lambda: entry(path), repeat)
+            timings += sample_timings
+            for field in correct:
+                if result.get(field) == truth[field]:
+                    correct[field] += 1
+        summary = summarize(timings)
+        summary['correct'] = correct
+        results[entry_name] = summary
+
+    results['config_stats'] = recognizer.get_config_stats()
+    return results
+
+
+def extract_crops(samples):
+    """对每张样本做完整预处理并裁剪姓名、民族区域，返回[(区域图像, 字段名, 真值)]"""
+    preprocessor = ImagePreprocessor()
+    crops = []
+    for path, _, truth in samples:
+        card = preprocessor.preprocess_for_ocr(path)
+        regions = preprocessor.extract_text_regions(card, ID_CARD_REGIONS)
+        for field in ('name', 'ethnicity'):
+            crops.append((regions[field], field, truth[field]))
+    return crops
+
+
+def bench_backends(samples, repeat, backend_names, dnn_model=None, dnn_vocabulary=None):
+    """在同一组区域图像上对比各OCR后端：整批识别与逐个识别的耗时及识别准确数"""
+    from ocr.backends import create_backend
+    from ocr.recognizer import IDCardRecognizer
+
+    crops = extract_crops(samples)
+    images = [image for image, _, _ in crops]
+    recognizer = IDCardRecognizer()
+    cleaners = {'name': recognizer.clean_name_text, 'ethnicity': recognizer.clean_ethnicity_text}
+    config = TESSERACT_CONFIGS['single_line'] + " -l chi_sim"
+
+    results = {}
+    for backend_name in backend_names:
+        try:
+            if backend_name == 'opencv_dnn':
+                backend = create_backend(backend_name, model_path=dnn_model, vocabulary_path=dnn_vocabulary,
+                                         input_size=OCR_DNN_INPUT_SIZE, channels=OCR_DNN_CHANNELS,
+                                         batch_size=OCR_BATCH_SIZE)
+            else:
+                backend = create_backend(backend_name, recognizer.ocr_engine)
+            backend.recognize(images[0], config)
+        except Exception as e:
+            results[backend_name] = {'skipped': f"{backend_name}不可用: {e}"}
+            continue
+
+        timings, texts = time_call(lambda: backend.recognize_batch(images, config), repeat)
+        batch = summarize([t / len(images) for t in timings])
+        timings, _ = time_call(lambda: [backend.recognize(image, config) for image in images], repeat)
+        per_crop = summarize([t / len(images) for t in timings])
+
+        correct = sum(1 for (_, field, truth), result in zip(crops, texts)
+                      if cleaners[field](result.text.strip()) == truth)
+        batch['correct'] = per_crop['correct'] = f"{correct}/{len(crops)}"
+        results[f"{backend_name}.batch"] = batch
+        results[f"{backend_name}.per_crop"] = per_crop
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=current_dir,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline, threshold):
+    """与基准结果对比中位数耗时，返回回退的条目列表"""
+    regressions = []
+    for section in ('startup', 'preprocessor', 'profiles', 'recognizer', 'backends'):
+        for name, item in current.get(section, {}).items():
+            old = baseline.get(section, {}).get(name)
+            if not isinstance(item, dict) or not isinstance(old, dict) or 'median_ms' not in item or 'median_ms' not in old:
+                continue
+            ratio = item['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  <-- 变慢'
+                regressions.append(f"{section}.{name}")
+            print(f"{section}.{name:32s} {old['median_ms']:10.2f}ms -> {item['median_ms']:10.2f}ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预处理与OCR热点路径性能基准')
+    parser.add_argument('-o', '--output', help='结果JSON保存路径（默认输出到标准输出）')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='每个阶段重复次数')
+    parser.add_argument('--seed', type=int, default=20240101, help='合成数据随机种子')
+    parser.add_argument('--skip-ocr', action='store_true', help='只测试预处理阶段')
+    parser.add_argument('--compare', help='与之前保存的结果JSON对比')
+    parser.add_argument('--threshold', type=float, default=0.10, help='判定变慢的比例阈值（默认10%%）')
+    parser.add_argument('--keep-images', help='把合成图片保存到该目录（默认使用临时目录）')
+    parser.add_argument('--backends', help='逗号分隔的OCR后端列表（tesseract、opencv_dnn），在相同区域图像上对比')
+    parser.add_argument('--dnn-model', help='opencv_dnn后端的文字识别模型文件')
+    parser.add_argument('--dnn-vocabulary', help='opencv_dnn后端的字符表文件')
+    args = parser.parse_args()
+
+    output_dir = args.keep_images or tempfile.mkdtemp(prefix='idcard_bench_')
+    os.makedirs(output_dir, exist_ok=True)
+    samples, font_path = generate_dataset(output_dir, DEFAULT_VARIANTS, args.seed)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'font': font_path,
+            'samples': [description for _, description, _ in samples],
+        },
+    }
+
+    # 被测代码中的调试输出转到标准错误，保证标准输出只有JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report['startup'] = bench_startup(args.repeat)
+        report['preprocessor'] = bench_preprocessor(samples, args.repeat)
+        report['profiles'] = bench_profiles(samples, args.repeat)
+        if not args.skip_ocr:
+            report['recognizer'] = bench_recognizer(samples, max(1, args.repeat // 5))
+        if args.backends:
+            report['backends'] = bench_backends(samples, args.repeat, args.backends.split(','),
+                                                args.dnn_model, args.dnn_vocabulary)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"基准结果已保存: {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("=" * 80)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"性能回退: {', '.join(regressions)}")
+            return 1
+        print("未发现性能回退")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
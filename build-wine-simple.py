@@ -42,6 +42,7 @@ a = Analysis(
     hiddenimports=[
         'PIL._tkinter_finder',
         'pytesseract',
+        'tesserocr',
         'cv2', 
         'openpyxl',
         'tkinter',
@@ -190,6 +191,7 @@ def build_with_wine():
             "--add-data=src:src",
             "--hidden-import=PIL._tkinter_finder",
             "--hidden-import=pytesseract",
+            "--hidden-import=tesserocr",
             "--hidden-import=cv2",
             "--hidden-import=openpyxl",
             "src/main.py"
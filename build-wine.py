@@ -114,6 +114,7 @@ class WineBuilder:
             "pillow>=10.0.0",
             "opencv-python>=4.8.0", 
             "pytesseract>=0.3.10",
+            # tesserocr是可选依赖：没有Windows wheel且需要libtesseract头文件编译，这里不安装（程序回退到pytesseract）
             "openpyxl>=3.1.0",
             "pyinstaller>=6.0.0",
             "numpy>=1.24.0"
@@ -192,6 +193,7 @@ class WineBuilder:
             "--add-data=src;src",
             "--hidden-import=PIL._tkinter_finder",
             "--hidden-import=pytesseract",
+            "--hidden-import=tesserocr",
             "--hidden-import=cv2",
             "--hidden-import=openpyxl",
             "--distpath=dist-wine",
@@ -70,6 +70,7 @@ def build_executable():
         '--name=身份证信息提取工具',        # 可执行文件名称
         '--hidden-import=PIL._tkinter_finder',  # 隐式导入
         '--hidden-import=pytesseract',
+        '--hidden-import=tesserocr',  # 常驻OCR引擎（未安装时PyInstaller仅给出警告）
         '--hidden-import=cv2',
         '--hidden-import=openpyxl',
         '--hidden-import=tkinter',
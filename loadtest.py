@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地识别服务压力测试
+
+用多个线程并发上传图片（每个线程保持一个长连接），统计吞吐量和延迟分布。
+
+用法：
+    python -m src.server --workers 4                        # 先启动服务
+    python loadtest.py 图片文件夹 -c 16 -n 500               # 16个并发连接，共发送500个请求
+    python loadtest.py a.jpg b.jpg -c 8 -d 30 -o load.json   # 持续30秒，结果保存为JSON
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from config.settings import SERVER_HOST, SERVER_PORT, SUPPORTED_IMAGE_FORMATS
+from utils.metrics import percentile
+
+
+def collect_images(paths):
+    """展开命令行给出的图片文件和文件夹，返回[(文件名, 文件内容), ...]"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(SUPPORTED_IMAGE_FORMATS))
+        else:
+            files.append(path)
+
+    images = []
+    for file_path in files:
+        with open(file_path, 'rb') as f:
+            images.append((os.path.basename(file_path), f.read()))
+    return images
+
+
+class LoadTest:
+
+    def __init__(self, host, port, images, concurrency, total=None, duration=None, timeout=60):
+        """
+        total: 请求总数；duration: 持续时间（秒）。两者都未指定时每张图片发送一次
+        timeout: 单个请求的客户端超时（秒）
+        """
+        self.host = host
+        self.port = port
+        self.images = images
+        self.concurrency = max(1, concurrency)
+        self.total = total if total is not None or duration is not None else len(images)
+        self.duration = duration
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+        self.batch_sizes = []
+
+    def _next_image(self, deadline):
+        """取下一个要发送的图片，达到请求总数或持续时间时返回None"""
+        index = next(self._counter)
+        if self.total is not None and index >= self.total:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        return self.images[index % len(self.images)]
+
+    def _record(self, latency, status=None, error=None, body=None):
+        with self._lock:
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+                return
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if body and 'batch_size' in body:
+                self.batch_sizes.append(body['batch_size'])
+
+    def _worker(self, deadline):
+        connection = None
+        while True:
+            image = self._next_image(deadline)
+            if image is None:
+                break
+            filename, image_data = image
+            if connection is None:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+            start = time.perf_counter()
+            try:
+                connection.request('POST', f"/recognize?filename={quote(filename)}", body=image_data,
+                                   headers={'Content-Type': 'application/octet-stream'})
+                response = connection.getresponse()
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._record(None, error=type(e).__name__)
+                connection.close()
+                connection = None
+                continue
+
+            latency = time.perf_counter() - start
+            try:
+                body = json.loads(payload.decode('utf-8'))
+            except ValueError:
+                body = None
+            self._record(latency, status=response.status, body=body)
+            if response.will_close:
+                connection.close()
+                connection = None
+
+        if connection is not None:
+            connection.close()
+
+    def run(self):
+        start = time.perf_counter()
+        deadline = start + self.duration if self.duration else None
+        threads = [threading.Thread(target=self._worker, args=(deadline,), daemon=True)
+                   for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - start
+        return self.report(wall_time)
+
+    def report(self, wall_time):
+        ordered = sorted(self.latencies)
+        completed = len(ordered)
+        ok = self.statuses.get(200, 0)
+        return {
+            'concurrency': self.concurrency,
+            'requests': completed + sum(self.errors.values()),
+            'completed': completed,
+            'wall_time_s': round(wall_time, 3),
+            'requests_per_second': round(completed / wall_time, 2) if wall_time else 0.0,
+            'ok_per_second': round(ok / wall_time, 2) if wall_time else 0.0,
+            'latency_ms': {
+                'mean': round(sum(ordered) / completed * 1000, 1) if ordered else 0.0,
+                'p50': round(percentile(ordered, 50) * 1000, 1),
+                'p90': round(percentile(ordered, 90) * 1000, 1),
+                'p99': round(percentile(ordered, 99) * 1000, 1),
+                'max': round(ordered[-1] * 1000, 1) if ordered else 0.0
+            },
+            'mean_batch_size': round(sum(self.batch_sizes) / len(self.batch_sizes), 2) if self.batch_sizes else 0.0,
+            'status_counts': {str(status): count for status, count in sorted(self.statuses.items())},
+            'errors': dict(self.errors)
+        }
+
+
+def fetch_health(host, port):
+    """读取服务状态，服务不可用时返回None"""
+    try:
+        connection = http.client.HTTPConnection(host, port, timeout=5)
+        connection.request('GET', '/health')
+        response = connection.getresponse()
+        health = json.loads(response.read().decode('utf-8'))
+        connection.close()
+        return health
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地识别服务压力测试')
+    parser.add_argument('images', nargs='+', help='图片文件或包含图片的文件夹（循环使用）')
+    parser.add_argument('--host', default=SERVER_HOST, help=f'服务地址（默认{SERVER_HOST}）')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help=f'服务端口（默认{SERVER_PORT}）')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='并发连接数（默认8）')
+    parser.add_argument('-n', '--requests', type=int, help='请求总数（默认每张图片发送一次）')
+    parser.add_argument('-d', '--duration', type=float, help='持续时间（秒），与-n同时指定时先达到者为准')
+    parser.add_argument('--timeout', type=float, default=60, help='单个请求的客户端超时秒数（默认60）')
+    parser.add_argument('-o', '--output', help='把结果JSON保存到该文件')
+    args = parser.parse_args()
+
+    images = collect_images(args.images)
+    if not images:
+        print("未找到任何图片文件！", file=sys.stderr)
+        return 1
+
+    health = fetch_health(args.host, args.port)
+    if health is None:
+        print(f"错误: 无法连接识别服务 http://{args.host}:{args.port}", file=sys.stderr)
+        return 2
+    print(f"服务: {health['workers']} 个工作进程，识别方法 {health['method']}；图片 {len(images)} 张，并发 {args.concurrency}")
+
+    report = LoadTest(args.host, args.port, images, args.concurrency, args.requests, args.duration,
+                      args.timeout).run()
+    report['server'] = fetch_health(args.host, args.port)
+
+    latency = report['latency_ms']
+    print("=" * 50)
+    print(f"请求数: {report['requests']}（完成 {report['completed']}），耗时 {report['wall_time_s']:.2f} 秒")
+    print(f"吞吐量: {report['requests_per_second']:.2f} 请求/秒（成功 {report['ok_per_second']:.2f}/秒）")
+    print(f"延迟: mean={latency['mean']:.0f}ms  p50={latency['p50']:.0f}ms  p90={latency['p90']:.0f}ms  "
+          f"p99={latency['p99']:.0f}ms  max={latency['max']:.0f}ms")
+    print(f"平均微批大小: {report['mean_batch_size']:.2f}")
+    print("状态码: " + ', '.join(f"{status}={count}" for status, count in report['status_counts'].items()))
+    if report['errors']:
+        print("连接错误: " + ', '.join(f"{error}={count}" for error, count in report['errors'].items()))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+    return 0 if report['completed'] and not report['errors'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+身份证信息提取工具命令行入口（无图形界面，可用于服务器和定时任务）
+
+用法示例：
+    python -m src.cli 图片文件夹 -o 结果.xlsx --workers 8
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# 修复PyInstaller和直接运行的导入问题
+try:
+    from .config.settings import (APP_NAME, APP_VERSION, EXCEL_COLUMNS, BATCH_MAX_WORKERS, RESULT_CACHE_ENABLED,
+        LOG_LEVEL, LOG_MODULE_LEVELS, LOG_JSONL_PATH, SCAN_RECURSIVE, SCAN_WORKERS, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+    from .utils.file_handler import FileHandler
+    from .utils.excel_writer import StreamingExcelWriter
+    from .utils.batch_engine import BatchEngine, RECOGNITION_METHODS
+    from .utils.job_journal import JobJournal
+    from .utils.log_setup import setup_logging
+except ImportError:
+    try:
+        from src.config.settings import (APP_NAME, APP_VERSION, EXCEL_COLUMNS, BATCH_MAX_WORKERS, RESULT_CACHE_ENABLED,
+            LOG_LEVEL, LOG_MODULE_LEVELS, LOG_JSONL_PATH, SCAN_RECURSIVE, SCAN_WORKERS, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+        from src.utils.file_handler import FileHandler
+        from src.utils.excel_writer import StreamingExcelWriter
+        from src.utils.batch_engine import BatchEngine, RECOGNITION_METHODS
+        from src.utils.job_journal import JobJournal
+        from src.utils.log_setup import setup_logging
+    except ImportError:
+        # 动态路径处理
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        sys.path.insert(0, current_dir)
+
+        from config.settings import (APP_NAME, APP_VERSION, EXCEL_COLUMNS, BATCH_MAX_WORKERS, RESULT_CACHE_ENABLED,
+            LOG_LEVEL, LOG_MODULE_LEVELS, LOG_JSONL_PATH, SCAN_RECURSIVE, SCAN_WORKERS, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+        from utils.file_handler import FileHandler
+        from utils.excel_writer import StreamingExcelWriter
+        from utils.batch_engine import BatchEngine, RECOGNITION_METHODS
+        from utils.job_journal import JobJournal
+        from utils.log_setup import setup_logging
+
+
+OUTPUT_FORMATS = ('xlsx', 'csv', 'jsonl')
+
+# 输出字段（与Excel列一一对应）
+OUTPUT_FIELDS = ['filename', 'name', 'ethnicity', 'status', 'note']
+
+
+class CsvResultWriter:
+    """CSV结果写入器（带BOM，便于Excel直接打开）"""
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.total_count = 0
+
+    def open(self):
+        FileHandler().ensure_directory_exists(self.output_file)
+        self._file = open(self.output_file, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXCEL_COLUMNS)
+
+    def write_row(self, result):
+        self._writer.writerow([result.get(field, '') for field in OUTPUT_FIELDS])
+        self.total_count += 1
+
+    def close(self, performance=None):
+        self._file.close()
+        return True, f"CSV文件已保存: {self.output_file}"
+
+    def discard(self):
+        self._file.close()
+
+
+class JsonlResultWriter:
+    """JSONL结果写入器（每行一个结果，包含耗时等附加字段）"""
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.total_count = 0
+
+    def open(self):
+        FileHandler().ensure_directory_exists(self.output_file)
+        self._file = open(self.output_file, 'w', encoding='utf-8')
+
+    def write_row(self, result):
+        row = {key: value for key, value in result.items() if key not in ('debug', 'traceback')}
+        self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.total_count += 1
+
+    def close(self, performance=None):
+        self._file.close()
+        return True, f"JSONL文件已保存: {self.output_file}"
+
+    def discard(self):
+        self._file.close()
+
+
+def create_result_writer(output_format, output_file):
+    """按输出格式创建结果写入器"""
+    if output_format == 'csv':
+        return CsvResultWriter(output_file)
+    if output_format == 'jsonl':
+        return JsonlResultWriter(output_file)
+    return StreamingExcelWriter(output_file)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m src.cli',
+        description=f"{APP_NAME} {APP_VERSION} - 命令行批量识别"
+    )
+    parser.add_argument('folder', help='包含身份证图片的文件夹')
+    parser.add_argument('-o', '--output', help='输出文件路径（默认保存到图片文件夹中）')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS,
+                        help='输出格式（默认根据输出文件扩展名判断，否则为xlsx）')
+    parser.add_argument('-w', '--workers', type=int, default=BATCH_MAX_WORKERS,
+                        help='并行工作进程数（默认使用CPU核心数，1表示单进程顺序处理）')
+    parser.add_argument('-m', '--method', choices=RECOGNITION_METHODS, default='multiple',
+                        help='识别方法：multiple为多区域配置（默认），single为单区域配置')
+    parser.add_argument('-p', '--profile', choices=tuple(PREPROCESS_PROFILES), default=PREPROCESS_PROFILE,
+                        help=f'预处理档位：fast最快（适合清晰的扫描件），accurate最慢（默认{PREPROCESS_PROFILE}）')
+    parser.add_argument('-r', '--recursive', action='store_true', default=SCAN_RECURSIVE, help='包含子文件夹')
+    parser.add_argument('--scan-workers', type=int, default=SCAN_WORKERS, help=f'并行扫描子文件夹的线程数（默认{SCAN_WORKERS}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用识别结果缓存')
+    parser.add_argument('--no-resume', action='store_true', help='忽略断点日志，重新处理所有文件')
+    parser.add_argument('--debug', action='store_true', help='调试模式（保存中间图像，输出详细日志，不使用缓存）')
+    parser.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                        help=f'日志级别（默认{LOG_LEVEL}，调试模式下为DEBUG）')
+    parser.add_argument('--log-jsonl', default=LOG_JSONL_PATH, help='把日志同时写入该JSONL文件')
+    return parser.parse_args(argv)
+
+
+def resolve_output(args):
+    """确定输出文件路径和格式"""
+    output_format = args.format
+    output_file = args.output
+
+    if output_format is None:
+        ext = os.path.splitext(output_file)[1].lower().lstrip('.') if output_file else ''
+        output_format = ext if ext in OUTPUT_FORMATS else 'xlsx'
+
+    if not output_file:
+        output_file = os.path.join(args.folder, f"身份证信息提取结果.{output_format}")
+
+    return output_file, output_format
+
+
+def main(argv=None):
+    """命令行主函数，返回进程退出码"""
+    args = parse_args(argv)
+    setup_logging(args.log_level or ('DEBUG' if args.debug else LOG_LEVEL), LOG_MODULE_LEVELS, args.log_jsonl)
+    output_file, output_format = resolve_output(args)
+
+    try:
+        # 后台扫描，找到第一个文件即开始识别
+        scanner = FileHandler().scan_image_files(args.folder, recursive=args.recursive, workers=args.scan_workers)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    batch_engine = BatchEngine(max_workers=args.workers, debug=args.debug,
+                               use_cache=RESULT_CACHE_ENABLED and not args.no_cache,
+                               method=args.method, profile=args.profile)
+    print(f"工作进程数: {batch_engine.max_workers}，识别方法: {args.method}，预处理档位: {args.profile}")
+
+    journal = JobJournal(output_file, args.folder, batch_engine.profile, batch_engine.method)
+    if args.no_resume and os.path.exists(journal.journal_path):
+        os.remove(journal.journal_path)
+    completed = journal.open()
+    if completed:
+        print(f"从断点继续：已有 {len(completed)} 个文件处理完成")
+
+    writer = create_result_writer(output_format, output_file)
+    writer.open()
+
+    status_counts = {}
+    cached_count = 0
+    duplicate_count = 0
+    start_time = time.perf_counter()
+
+    try:
+        for i, row in enumerate(batch_engine.run(scanner, journal=journal), 1):
+            writer.write_row(row)
+            status_counts[row['status']] = status_counts.get(row['status'], 0) + 1
+
+            if row.get('resumed'):
+                continue
+            if row.get('cached'):
+                cached_count += 1
+            if row.get('duplicate_of'):
+                duplicate_count += 1
+            total = scanner.found if scanner.finished else f"{scanner.found}+"
+            print(f"[{i}/{total}] {row['filename']}: {row['status']} "
+                  f"姓名={row['name']} 民族={row['ethnicity']} {row['note']}".rstrip())
+    except KeyboardInterrupt:
+        writer.discard()
+        print("\n处理已中断，重新运行相同命令即可从断点继续", file=sys.stderr)
+        return 130
+    except ValueError as e:
+        writer.discard()
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    except Exception:
+        # 其他异常同样删除未完成的输出文件，已完成的文件保留在断点日志中
+        writer.discard()
+        raise
+    finally:
+        journal.close()
+
+    if writer.total_count == 0:
+        writer.discard()
+        journal.remove()
+        print("未找到任何图片文件！", file=sys.stderr)
+        return 1
+
+    wall_time = time.perf_counter() - start_time
+    performance = batch_engine.metrics.summary()
+    saved, message = writer.close(performance)
+    print(message)
+    if not saved:
+        return 1
+    journal.remove()
+
+    # 吞吐量统计
+    processed = performance['image_count']
+    latency = performance['latency']
+    print("=" * 50)
+    print(f"总文件数: {writer.total_count}（本次处理 {processed}，断点跳过 {writer.total_count - processed}，缓存命中 {cached_count}，近似重复 {duplicate_count}）")
+    for status, count in sorted(status_counts.items()):
+        print(f"  {status}: {count}")
+    print(f"总耗时: {wall_time:.2f} 秒")
+    if processed:
+        print(f"吞吐量: {processed / wall_time:.2f} 张/秒")
+        print(f"单张耗时: p50={latency['p50']:.0f}ms  p95={latency['p95']:.0f}ms  max={latency['max']:.0f}ms")
+    if performance['preprocess']['megapixels']:
+        print(f"预处理（{args.profile}）: {performance['preprocess']['ms_per_megapixel']:.1f}ms/百万像素  "
+              f"共 {performance['preprocess']['megapixels']:.1f} 百万像素")
+    for stage_name, stage in performance['stages'].items():
+        print(f"阶段 {stage_name}: 平均 {stage['mean_ms']:.1f}ms  占比 {stage['share'] * 100:.1f}%")
+    for config_name, call in performance['ocr_calls'].items():
+        print(f"OCR {config_name}: {call['count']} 次  平均 {call['mean_ms']:.1f}ms")
+    if performance['counters']:
+        print("计数: " + ', '.join(f"{name}={count}" for name, count in sorted(performance['counters'].items())))
+    # 多进程处理时各流水线阶段的负载：利用率最高、排队最多的阶段决定整体吞吐
+    for stage_name, stage in batch_engine.stage_stats().items():
+        print(f"流水线 {stage_name}: 并发 {stage['concurrency']}  处理 {stage['processed']}  "
+              f"最大排队 {stage['max_queued']}  利用率 {stage['utilization'] * 100:.0f}%")
+    for field_name, counts in batch_engine.source_counts.items():
+        summary = ', '.join(f"{source}={count}" for source, count in sorted(counts.items(), key=lambda item: -item[1]))
+        print(f"{field_name}结果来源: {summary}")
+    # 各OCR配置的命中率（命中/尝试），可据此调整TESSERACT_CONFIG_ORDER
+    for field_name, stats in batch_engine.get_config_stats().items():
+        attempted = sorted(((name, item) for name, item in stats.items() if item['attempts']),
+                           key=lambda entry: -entry[1]['hit_rate'])
+        summary = ', '.join(f"{name} {item['hits']}/{item['attempts']}={item['hit_rate'] * 100:.0f}%"
+                            f"（提前结束 {item['early_exits']}）" for name, item in attempted)
+        print(f"{field_name}配置命中率: {summary}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
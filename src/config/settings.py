@@ -24,6 +24,46 @@ TESSERACT_CONFIGS = {
     'sparse': '--oem 3 --psm 11'  # 稀疏文字
 }
 
+# 多配置OCR的默认尝试顺序（运行中会按各配置的历史命中率自动调整）
+TESSERACT_CONFIG_ORDER = ['default', 'single_line', 'sparse', 'single_word']
+
+# 某个配置的结果置信度不低于该值且通过校验（如民族名在56个民族之内）时，不再尝试其余配置
+EARLY_EXIT_MIN_CONFIDENCE = 70
+
+# 民族文本匹配到民族词典的分数（0~1）不低于该值时视为可信：即使OCR置信度不足也不再尝试其余配置
+ETHNICITY_MATCH_MIN_SCORE = 0.9
+
+# 单次整卡OCR：对矫正后的整张卡片只运行一次image_to_data，按词框位置把文字分配到各字段
+# （整卡与各字段区域一样，从原图直接变换到预处理参数target_glyph_height对应的尺寸）
+SINGLE_PASS_OCR = True
+SINGLE_PASS_OCR_CONFIG = 'sparse'   # 使用TESSERACT_CONFIGS中的哪个配置
+SINGLE_PASS_MIN_CONFIDENCE = 60     # 字段词平均置信度低于该值时回退到逐区域多配置OCR
+
+# OCR引擎：'auto'（安装了tesserocr时使用常驻引擎）、'tesserocr'、'pytesseract'
+OCR_ENGINE = 'auto'
+# 找到的Tesseract路径和版本缓存在该文件中（按可执行文件的修改时间校验），删除后下次启动重新查找
+TESSERACT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.idcard_ocr', 'tesseract.json')
+
+# OCR后端：'tesseract'（默认），或'opencv_dnn'（cv2.dnn加载本地CRNN文字识别模型，同一张卡片的各字段一次批量识别）
+OCR_BACKEND = 'tesseract'
+OCR_DNN_MODEL_PATH = None          # 模型文件，如 text_recognition_CRNN_CN_2021nov.onnx
+OCR_DNN_VOCABULARY_PATH = None     # 字符表文件，每行一个字符
+OCR_DNN_INPUT_SIZE = (100, 32)     # 模型输入尺寸(宽, 高)
+OCR_DNN_CHANNELS = 3
+OCR_BATCH_SIZE = 32                # 每次前向计算的最大区域数
+
+# 图像预处理档位（命令行 -p/--profile 或界面中可临时选择）
+# fast：直接解码为灰度图，中值滤波去噪，不做整图对比度增强，适合清晰的扫描件
+# balanced：灰度解码，在灰度图上做双边滤波和CLAHE，省去彩色处理和LAB颜色空间往返转换
+# accurate：彩色双边滤波，在LAB颜色空间对亮度通道做CLAHE，适合光照不均的手机照片
+# 文字区域二值化前的局部去噪和对比度增强（见ImagePreprocessor.preprocess_text_region）与档位无关
+PREPROCESS_PROFILES = {
+    'fast': {'grayscale': True, 'denoise': 'median', 'enhance_contrast': False},
+    'balanced': {'grayscale': True, 'denoise': 'bilateral', 'enhance_contrast': True},
+    'accurate': {'grayscale': False, 'denoise': 'bilateral', 'enhance_contrast': True}
+}
+PREPROCESS_PROFILE = 'accurate'
+
 # 身份证信息位置配置（相对坐标，百分比）
 # 注：根据中国第二代身份证标准布局调整
 ID_CARD_REGIONS = {
@@ -53,11 +93,85 @@ ALTERNATIVE_REGIONS = {
     }
 }
 
+# 图片扫描配置
+# 是否包含子文件夹；并行扫描子文件夹的线程数（网络共享盘上可适当调大）
+SCAN_RECURSIVE = False
+SCAN_WORKERS = 4
+# 递归扫描时跳过的子文件夹（调试模式会在图片旁生成debug文件夹）
+SCAN_SKIP_DIRS = ('debug',)
+# 单个图片文件大小上限
+MAX_IMAGE_FILE_SIZE = 50 * 1024 * 1024
+
+# 批量处理配置
+# 并行工作进程数：None表示使用CPU核心数，1表示在当前进程内顺序处理
+BATCH_MAX_WORKERS = None
+
+# 分阶段流水线（多进程处理时）：发现 → 读取 → 解码/预处理 → 近似重复检测 → OCR → 后处理 → 输出
+# 各阶段的并发数（None表示工作进程数）；预处理和OCR阶段共用同一个进程池
+PIPELINE_STAGE_CONCURRENCY = {'read': 4, 'preprocess': None, 'ocr': None}
+# 阶段之间的队列长度上限（None表示工作进程数），同时在流水线中的文件数上限（None表示工作进程数的4倍）
+PIPELINE_QUEUE_SIZE = None
+PIPELINE_MAX_IN_FLIGHT = None
+# 每隔多少秒在INFO日志中记录一次各阶段的队列深度，None表示不记录
+PIPELINE_MONITOR_INTERVAL = 5
+
+# 图片预读：识别当前图片时，后台线程提前读取后面的文件，隐藏磁盘/网络共享盘的读取延迟
+# （单进程顺序处理时使用；多进程处理时由流水线的读取阶段完成，PREFETCH_ENABLED = False时工作进程自行读取文件）
+PREFETCH_ENABLED = True
+PREFETCH_DEPTH = 8
+PREFETCH_THREADS = 4
+# 已提交预读（含尚未读完）但尚未处理的文件总大小上限，按文件大小计算
+PREFETCH_MAX_BYTES = 256 * 1024 * 1024
+
+# 近似重复图片检测：同一批中姓名、民族区域的哈希汉明距离不超过DEDUP_MAX_DISTANCE、
+# 且识别尺寸下文字像素不一致比例不超过DEDUP_MAX_MISMATCH的图片直接复用先识别的结果（默认关闭）
+DEDUP_ENABLED = False
+DEDUP_HASH_WIDTH = 32      # 每个区域的哈希为 宽 x 高 位
+DEDUP_HASH_HEIGHT = 8
+DEDUP_MAX_DISTANCE = 8     # 只用于筛选候选：不同姓名的哈希距离也可能很小
+DEDUP_MAX_MISMATCH = 0.02
+
+# 本地识别服务（python -m src.server）
+# 只监听本机；工作进程数None表示使用CPU核心数
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_WORKERS = None
+# 微批：把并发到达的请求合并为最多SERVER_BATCH_SIZE张一批，第一张到达后最多再等SERVER_BATCH_WAIT_MS毫秒
+# （只对整批识别的后端生效；Tesseract后端按空闲工作进程数分批，不等待）
+SERVER_BATCH_SIZE = 8
+SERVER_BATCH_WAIT_MS = 10
+# 单个请求的超时时间（秒），以及排队等待识别的请求数上限（超出时返回503）
+SERVER_REQUEST_TIMEOUT = 30
+SERVER_MAX_QUEUE = 256
+
+# 识别结果缓存：图片内容和识别配置都未变化时直接复用上次结果
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.idcard_ocr', 'result_cache.sqlite3')
+RESULT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# 日志配置
+# 默认级别（调试模式下自动使用DEBUG）；可单独设置模块级别，如 {'recognizer': 'DEBUG', 'file_handler': 'INFO'}
+LOG_LEVEL = 'WARNING'
+LOG_MODULE_LEVELS = {}
+# 可选的JSONL日志文件路径，None表示不写日志文件
+LOG_JSONL_PATH = None
+
 # Excel输出配置
 EXCEL_COLUMNS = ['文件名', '姓名', '民族', '识别状态', '备注']
+# 是否在结果表中增加单张耗时列，并追加"性能统计"工作表
+EXCEL_INCLUDE_TIMING = True
+EXCEL_TIMING_COLUMN = '耗时（毫秒）'
 
 # 界面配置
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
 WINDOW_MIN_WIDTH = 600
-WINDOW_MIN_HEIGHT = 400
\ No newline at end of file
+WINDOW_MIN_HEIGHT = 400
+
+# 界面刷新配置
+# 后台线程把日志、状态和进度放入队列，界面每隔GUI_UPDATE_INTERVAL_MS毫秒合并刷新一次
+GUI_UPDATE_INTERVAL_MS = 100
+# 日志框最多保留的行数，超出后丢弃最早的日志
+GUI_LOG_MAX_LINES = 2000
+# 计算实时速度时参考最近多少个文件
+GUI_THROUGHPUT_WINDOW = 20
\ No newline at end of file
@@ -5,23 +5,29 @@
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import logging
 import threading
+import queue
+import time
 import os
 import sys
+from collections import deque
 
 # 修复PyInstaller打包后的导入问题
+# 识别和Excel输出模块（依赖OpenCV、numpy、openpyxl，首次导入较慢）不在这里导入，
+# 窗口显示后由后台预热线程加载（见load_processing_modules）
 try:
     from ..config.settings import *
     from ..utils.file_handler import FileHandler
-    from ..ocr.recognizer import IDCardRecognizer
-    from ..utils.excel_writer import ExcelWriter
+    from ..utils.job_journal import JobJournal
+    from ..utils.log_setup import setup_logging
 except ImportError:
     # 备选导入方式
     try:
         from src.config.settings import *
         from src.utils.file_handler import FileHandler
-        from src.ocr.recognizer import IDCardRecognizer
-        from src.utils.excel_writer import ExcelWriter
+        from src.utils.job_journal import JobJournal
+        from src.utils.log_setup import setup_logging
     except ImportError:
         # 最后的备选方式
         import importlib.util
@@ -36,20 +42,124 @@ except ImportError:
         
         from config.settings import *
         from utils.file_handler import FileHandler
-        from ocr.recognizer import IDCardRecognizer
-        from utils.excel_writer import ExcelWriter
+        from utils.job_journal import JobJournal
+        from utils.log_setup import setup_logging
+
+
+logger = logging.getLogger('idcard_ocr.gui')
+
+IDCardRecognizer = None
+StreamingExcelWriter = None
+BatchEngine = None
+
+
+def load_processing_modules():
+    """导入识别和Excel输出模块（在后台预热线程中调用，不阻塞窗口显示）"""
+    global IDCardRecognizer, StreamingExcelWriter, BatchEngine
+    try:
+        from ..ocr.recognizer import IDCardRecognizer
+        from ..utils.excel_writer import StreamingExcelWriter
+        from ..utils.batch_engine import BatchEngine
+    except ImportError:
+        try:
+            from src.ocr.recognizer import IDCardRecognizer
+            from src.utils.excel_writer import StreamingExcelWriter
+            from src.utils.batch_engine import BatchEngine
+        except ImportError:
+            from ocr.recognizer import IDCardRecognizer
+            from utils.excel_writer import StreamingExcelWriter
+            from utils.batch_engine import BatchEngine
+
+
+class ThroughputMeter:
+    """根据最近若干个文件的完成时间估算处理速度和剩余时间"""
+    
+    def __init__(self, window=GUI_THROUGHPUT_WINDOW):
+        self.samples = deque(maxlen=window + 1)
+        
+    def reset(self):
+        self.samples.clear()
+        
+    def add(self, processed, timestamp):
+        """记录截至timestamp已实际处理（不含断点跳过）的文件数"""
+        if not self.samples or processed != self.samples[-1][0]:
+            self.samples.append((processed, timestamp))
+            
+    def rate(self):
+        """最近的处理速度（张/秒），样本不足时返回None"""
+        if len(self.samples) < 2:
+            return None
+        (first_count, first_time), (last_count, last_time) = self.samples[0], self.samples[-1]
+        if last_time <= first_time:
+            return None
+        return (last_count - first_count) / (last_time - first_time)
+        
+    def eta(self, remaining):
+        """剩余时间（秒），无法估算时返回None"""
+        rate = self.rate()
+        if not rate:
+            return None
+        return remaining / rate
+        
+        
+def format_duration(seconds):
+    """把秒数格式化为 时:分:秒 或 分:秒"""
+    seconds = int(round(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
 
 
 class MainWindow:
-    def __init__(self):
+    def __init__(self, start_time=None):
+        """start_time: 程序开始运行的时刻（time.perf_counter()），用于统计从启动到界面可操作的用时"""
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        setup_logging(LOG_LEVEL, LOG_MODULE_LEVELS, LOG_JSONL_PATH)
         self.root = tk.Tk()
         self.setup_window()
         self.create_widgets()
         self.file_handler = FileHandler()
-        self.recognizer = IDCardRecognizer()
-        self.excel_writer = ExcelWriter()
         self.processing = False
         
+        # 识别器由后台预热线程创建，开始处理前等待预热完成
+        self.recognizer = None
+        self.warm_up_error = None
+        self.warm_up_done = threading.Event()
+        
+        # 后台线程不直接操作界面，而是把更新事件放入队列，由界面主循环定时合并处理
+        self.ui_queue = queue.Queue()
+        self.throughput = ThroughputMeter()
+        self.root.after(GUI_UPDATE_INTERVAL_MS, self.drain_ui_queue)
+        # 窗口绘制完成、可以操作后再开始预热
+        self.root.after_idle(self.on_window_ready)
+        
+    def on_window_ready(self):
+        """记录启动到界面可操作的用时，并在后台开始预热"""
+        elapsed = time.perf_counter() - self.start_time
+        logger.info("界面启动用时 %.2f 秒", elapsed)
+        self.log(f"界面启动用时 {elapsed:.2f} 秒")
+        threading.Thread(target=self.warm_up, name='warm-up', daemon=True).start()
+        
+    def warm_up(self):
+        """后台预热：导入OpenCV、Tesseract等识别相关模块，并创建识别器（Tesseract查找结果有缓存）"""
+        start = time.perf_counter()
+        try:
+            load_processing_modules()
+            self.recognizer = IDCardRecognizer()
+        except Exception as e:
+            self.warm_up_error = e
+            logger.exception("识别组件加载失败: %s", e)
+            self.log(f"❌ 识别组件加载失败: {e}")
+        else:
+            elapsed = time.perf_counter() - start
+            total = time.perf_counter() - self.start_time
+            logger.info("识别组件加载用时 %.2f 秒（启动后 %.2f 秒就绪）", elapsed, total)
+            self.log(f"识别组件已就绪，加载用时 {elapsed:.2f} 秒（启动后 {total:.2f} 秒）")
+        finally:
+            self.warm_up_done.set()
+        
     def setup_window(self):
         """设置窗口基本属性"""
         self.root.title(APP_NAME)
@@ -100,7 +210,18 @@ class MainWindow:
         self.debug_var = tk.BooleanVar()
         debug_check = ttk.Checkbutton(debug_frame, text="启用调试模式（保存中间图像和详细日志）", 
                                      variable=self.debug_var)
-        debug_check.pack()
+        debug_check.pack(side=tk.LEFT, padx=5)
+        
+        self.recursive_var = tk.BooleanVar(value=SCAN_RECURSIVE)
+        recursive_check = ttk.Checkbutton(debug_frame, text="包含子文件夹", variable=self.recursive_var)
+        recursive_check.pack(side=tk.LEFT, padx=5)
+        
+        # 预处理档位：清晰的扫描件可选fast，光照不均的照片选accurate
+        ttk.Label(debug_frame, text="预处理档位:").pack(side=tk.LEFT, padx=(15, 0))
+        self.profile_var = tk.StringVar(value=PREPROCESS_PROFILE)
+        profile_combo = ttk.Combobox(debug_frame, textvariable=self.profile_var, values=list(PREPROCESS_PROFILES),
+                                     state='readonly', width=10)
+        profile_combo.pack(side=tk.LEFT, padx=5)
         
         # 控制按钮
         button_frame = ttk.Frame(main_frame)
@@ -167,25 +288,132 @@ class MainWindow:
             self.log(f"输出文件: {file_path}")
             
     def log(self, message):
-        """添加日志信息"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """添加日志信息（可在任意线程调用）"""
+        self.ui_queue.put(('log', message))
         
     def update_status(self, status):
-        """更新状态"""
-        self.status_var.set(status)
-        self.root.update_idletasks()
-        
-    def update_progress(self, current, total):
-        """更新进度条"""
-        if total > 0:
-            progress = (current / total) * 100
-            self.progress_var.set(progress)
+        """更新状态（可在任意线程调用）"""
+        self.ui_queue.put(('status', status))
+        
+    def update_progress(self, current, total, processed=None, scanning=False):
+        """
+        更新进度条（可在任意线程调用）
+
+        processed为实际处理（不含断点跳过）的文件数，用于估算速度；scanning表示文件仍在扫描中，total尚不完整
+        """
+        self.ui_queue.put(('progress', current, total, processed, scanning, time.monotonic()))
+        
+    def show_dialog(self, kind, title, message):
+        """在界面线程中弹出对话框（kind为'info'或'error'）"""
+        self.ui_queue.put(('dialog', kind, title, message))
+        
+    def drain_ui_queue(self):
+        """取出队列中的全部更新事件，合并后一次性刷新界面"""
+        log_lines = []
+        status = None
+        progress = None
+        dialogs = []
+        finished = False
+        
+        while True:
+            try:
+                event = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+                
+            kind = event[0]
+            if kind == 'log':
+                log_lines.append(event[1])
+            elif kind == 'status':
+                status = event[1]
+            elif kind == 'progress':
+                progress = event[1:5]
+                if event[3] is not None:
+                    self.throughput.add(event[3], event[5])
+            elif kind == 'dialog':
+                dialogs.append(event[1:])
+            elif kind == 'finished':
+                finished = True
+                
+        if log_lines:
+            self.append_log_lines(log_lines)
+            
+        if progress is not None:
+            current, total, processed, scanning = progress
+            self.progress_var.set(current / total * 100 if total > 0 else 0)
+            if status is None and self.processing and (scanning or current < total):
+                status = self.format_progress_status(current, total, scanning)
+                
+        if status is not None:
+            self.status_var.set(status)
+            
+        if finished:
+            self.start_button.config(state='normal')
+            self.stop_button.config(state='disabled')
+            
+        for kind, title, message in dialogs:
+            if kind == 'error':
+                messagebox.showerror(title, message)
+            else:
+                messagebox.showinfo(title, message)
+                
+        self.root.after(GUI_UPDATE_INTERVAL_MS, self.drain_ui_queue)
+        
+    def append_log_lines(self, lines):
+        """追加日志，只保留最近GUI_LOG_MAX_LINES行"""
+        lines = lines[-GUI_LOG_MAX_LINES:]
+        self.log_text.insert(tk.END, '\n'.join(lines) + '\n')
+        
+        # 末尾总有一个空行，实际行数为 end-1c 所在行号
+        line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        if line_count > GUI_LOG_MAX_LINES:
+            self.log_text.delete('1.0', f"{line_count - GUI_LOG_MAX_LINES + 1}.0")
+        self.log_text.see(tk.END)
+        
+    def format_progress_status(self, current, total, scanning=False):
+        """处理中的状态文本：进度、实时速度和预计剩余时间（仍在扫描时总数未知，不显示剩余时间）"""
+        if scanning:
+            status = f"处理中... ({current}/已找到{total}，仍在扫描)"
         else:
-            self.progress_var.set(0)
-        self.root.update_idletasks()
+            status = f"处理中... ({current}/{total})"
+        rate = self.throughput.rate()
+        if rate:
+            status += f"  {rate:.1f} 张/秒"
+            if not scanning:
+                status += f"  预计剩余 {format_duration((total - current) / rate)}"
+        return status
+        
+    def log_row(self, row):
+        """输出单个文件的处理结果日志"""
+        filename = row['filename']
+        self.log(f"处理文件: {filename}")
         
+        status = row['status']
+        if status in ("成功", "部分成功"):
+            cached_note = "（缓存）" if row.get('cached') else ""
+            if row.get('duplicate_of'):
+                cached_note = f"（与 {os.path.basename(row['duplicate_of'])} 近似重复）"
+            self.log(f"  ✅ 识别成功{cached_note} - 姓名: {row['name']}, 民族: {row['ethnicity']}")
+            
+            # 显示调试信息
+            if self.debug_var.get() and 'debug' in row:
+                debug_info = row['debug']
+                self.log(f"  [调试] 姓名原始OCR文本: '{debug_info.get('name_raw_text', '')}'")
+                self.log(f"  [调试] 民族原始OCR文本: '{debug_info.get('ethnicity_raw_text', '')}'")
+                self.log(f"  [调试] 图像尺寸: {debug_info.get('image_shape', '')}")
+                self.log(f"  [调试] 提取区域: {debug_info.get('regions_extracted', [])}")
+                
+            # 如果识别成功但结果为空，给出提示
+            if status == "部分成功":
+                self.log(f"  ⚠️ 警告: 识别成功但姓名和民族均为空，可能是区域定位或文本清理问题")
+        elif status == "失败":
+            self.log(f"  ❌ 识别失败: {row['note']}")
+        else:
+            self.log(f"  ❌ {row['note']}")
+            # 记录更详细的错误信息用于调试
+            if 'traceback' in row:
+                self.log(f"  详细错误: {row['traceback']}")
+                
     def start_processing(self):
         """开始处理"""
         if not self.folder_var.get():
@@ -199,6 +427,7 @@ class MainWindow:
         self.processing = True
         self.start_button.config(state='disabled')
         self.stop_button.config(state='normal')
+        self.throughput.reset()
         
         # 在新线程中处理
         thread = threading.Thread(target=self.process_images)
@@ -219,152 +448,129 @@ class MainWindow:
             folder = self.folder_var.get()
             output_file = self.output_var.get()
             
+            # 启动后立即开始处理时，等待后台预热完成
+            if not self.warm_up_done.is_set():
+                self.update_status("正在加载识别组件...")
+                self.warm_up_done.wait()
+            if self.warm_up_error is not None:
+                raise RuntimeError(f"识别组件加载失败: {self.warm_up_error}")
+                
             self.log("开始扫描图片文件...")
+            # 调试模式下输出详细日志，否则只记录警告和错误
+            setup_logging('DEBUG' if self.debug_var.get() else LOG_LEVEL, LOG_MODULE_LEVELS, LOG_JSONL_PATH)
             if self.debug_var.get():
                 self.log("⚙️ 调试模式已启用")
             self.update_status("扫描图片文件...")
             
-            # 获取所有图片文件
-            image_files = self.file_handler.get_image_files(folder)
-            if not image_files:
-                self.log("未找到任何图片文件！")
-                self.processing = False
-                self.start_button.config(state='normal')
-                self.stop_button.config(state='disabled')
-                return
-                
-            self.log(f"找到 {len(image_files)} 个图片文件")
+            # 在后台扫描图片文件，找到第一个文件即开始识别
+            scanner = self.file_handler.scan_image_files(folder, recursive=self.recursive_var.get())
             
-            # 处理结果列表
-            results = []
+            # 统计数据（结果逐行流式写入Excel，不在内存中保留全部结果）
+            status_counts = {}
             
-            # 处理每个图片文件
-            for i, image_path in enumerate(image_files):
-                if not self.processing:
-                    break
-                    
-                self.update_progress(i, len(image_files))
-                self.update_status(f"处理中... ({i+1}/{len(image_files)})")
-                
-                filename = os.path.basename(image_path)
-                self.log(f"处理文件: {filename}")
-                
-                try:
-                    # 记录处理开始
-                    self.log(f"  正在处理: {os.path.basename(image_path)}")
-                    self.log(f"  完整路径: {image_path}")
-                    
-                    # 检查文件是否存在
-                    if not os.path.exists(image_path):
-                        raise FileNotFoundError(f"File not found: {image_path}")
-                    
-                    # OCR识别（使用多种方法提高准确率）
-                    result = self.recognizer.recognize_with_multiple_methods(image_path, debug=self.debug_var.get())
+            # 批量识别（按输入顺序返回结果，支持多进程并行）
+            batch_engine = BatchEngine(max_workers=BATCH_MAX_WORKERS, debug=self.debug_var.get(),
+                                       recognizer=self.recognizer, profile=self.profile_var.get())
+            self.log(f"并行工作进程数: {batch_engine.max_workers}，预处理档位: {batch_engine.profile}")
+            
+            # 断点日志：每完成一个文件就记录结果，中断后重新开始可跳过已完成的文件
+            journal = JobJournal(output_file, folder, batch_engine.profile, batch_engine.method)
+            completed = journal.open()
+            if completed:
+                self.log(f"从断点继续：已有 {len(completed)} 个文件处理完成，将跳过这些文件")
+            
+            excel_writer = StreamingExcelWriter(output_file)
+            excel_writer.open()
+            
+            try:
+                processed = 0
+                rows = batch_engine.run(scanner, should_stop=lambda: not self.processing, journal=journal)
+                for i, row in enumerate(rows):
+                    excel_writer.write_row(row)
+                    status_counts[row['status']] = status_counts.get(row['status'], 0) + 1
                     
-                    if result['success']:
-                        name = result.get('name', '')
-                        ethnicity = result.get('ethnicity', '')
-                        status = "成功"
-                        note = ""
-                        self.log(f"  ✅ 识别成功 - 姓名: {name}, 民族: {ethnicity}")
+                    if not row.get('resumed'):
+                        processed += 1
+                        self.log_row(row)
                         
-                        # 显示调试信息
-                        if self.debug_var.get() and 'debug' in result:
-                            debug_info = result['debug']
-                            self.log(f"  [调试] 姓名原始OCR文本: '{debug_info.get('name_raw_text', '')}'")
-                            self.log(f"  [调试] 民族原始OCR文本: '{debug_info.get('ethnicity_raw_text', '')}'")
-                            self.log(f"  [调试] 图像尺寸: {debug_info.get('image_shape', '')}")
-                            self.log(f"  [调试] 提取区域: {debug_info.get('regions_extracted', [])}")
-                            
-                        # 如果识别成功但结果为空，给出提示
-                        if not name and not ethnicity:
-                            self.log(f"  ⚠️ 警告: 识别成功但姓名和民族均为空，可能是区域定位或文本清理问题")
-                            status = "部分成功"
-                            note = "识别到文本但姓名民族为空"
-                    else:
-                        name = ""
-                        ethnicity = ""
-                        status = "失败"
-                        note = result.get('error', '识别失败')
-                        self.log(f"  ❌ 识别失败: {note}")
-                        
-                    results.append({
-                        'filename': filename,
-                        'name': name,
-                        'ethnicity': ethnicity,
-                        'status': status,
-                        'note': note
-                    })
-                    
-                except FileNotFoundError as fnf_error:
-                    error_msg = f"文件未找到: {str(fnf_error)}"
-                    self.log(f"  ❌ {error_msg}")
-                    results.append({
-                        'filename': filename,
-                        'name': "",
-                        'ethnicity': "",
-                        'status': "文件不存在",
-                        'note': error_msg
-                    })
-                    
-                except Exception as e:
-                    error_msg = f"处理异常: {str(e)}"
-                    self.log(f"  ❌ {error_msg}")
-                    # 记录更详细的错误信息用于调试
-                    import traceback
-                    self.log(f"  详细错误: {traceback.format_exc()}")
-                    
-                    results.append({
-                        'filename': filename,
-                        'name': "",
-                        'ethnicity': "",
-                        'status': "处理错误",
-                        'note': error_msg
-                    })
-                    
-            if self.processing:
+                    # 状态文本（速度、剩余时间）由界面线程根据进度事件合并生成
+                    self.update_progress(i + 1, scanner.found, processed, scanning=not scanner.finished)
+            except Exception:
+                # 处理中断时删除未完成的输出文件（已完成的文件保留在断点日志中），错误由外层记录并提示
+                excel_writer.discard()
+                raise
+            finally:
+                journal.close()
+                
+            if self.processing and excel_writer.total_count == 0:
+                self.log("未找到任何图片文件！")
+                self.update_status("就绪")
+                excel_writer.discard()
+                journal.remove()
+            elif not self.processing:
+                excel_writer.discard()
+            else:
                 # 生成Excel文件
                 self.update_status("生成Excel文件...")
                 self.log("生成Excel文件...")
                 
                 try:
-                    self.excel_writer.write_results(results, output_file)
+                    performance = batch_engine.metrics.summary()
+                    saved, save_message = excel_writer.close(performance)
+                    if not saved:
+                        raise ValueError(save_message)
+                        
+                    if performance['preprocess']['megapixels']:
+                        self.log(f"预处理耗时: {performance['preprocess']['ms_per_megapixel']:.1f}ms/百万像素")
+                        
+                    # 耗时最多的处理阶段
+                    for stage_name, stage in list(performance['stages'].items())[:3]:
+                        self.log(f"阶段耗时 {stage_name}: 平均 {stage['mean_ms']:.1f}ms（占 {stage['share'] * 100:.0f}%）")
+                    
+                    # 多进程处理时利用率最高的流水线阶段
+                    stage_stats = batch_engine.stage_stats()
+                    if stage_stats:
+                        stage_name, stage = max(stage_stats.items(), key=lambda item: item[1]['utilization'])
+                        self.log(f"流水线瓶颈阶段 {stage_name}: 利用率 {stage['utilization'] * 100:.0f}%（最大排队 {stage['max_queued']}）")
+                        
+                    # 结果已完整保存，不再需要断点日志
+                    journal.remove()
                     self.log(f"Excel文件已保存: {output_file}")
                     self.update_status("处理完成")
-                    self.update_progress(len(image_files), len(image_files))
+                    self.update_progress(excel_writer.total_count, excel_writer.total_count)
                     
                     # 显示完成对话框
-                    success_count = sum(1 for r in results if r['status'] == '成功')
-                    partial_count = sum(1 for r in results if r['status'] == '部分成功')
+                    processed_count = excel_writer.total_count
+                    success_count = status_counts.get('成功', 0)
+                    partial_count = status_counts.get('部分成功', 0)
                     
                     message = (f"处理完成！\n"
-                             f"总文件数: {len(results)}\n"
+                             f"总文件数: {processed_count}\n"
                              f"完全成功: {success_count}\n")
                     
                     if partial_count > 0:
                         message += f"部分成功: {partial_count}\n"
                         
-                    message += (f"失败数量: {len(results) - success_count - partial_count}\n"
+                    message += (f"失败数量: {processed_count - success_count - partial_count}\n"
                               f"结果已保存到: {output_file}")
                     
                     if self.debug_var.get():
                         debug_dir = os.path.join(os.path.dirname(output_file), 'debug')
                         message += f"\n\n调试图像已保存到: {debug_dir}"
                     
-                    messagebox.showinfo("处理完成", message)
+                    self.show_dialog('info', "处理完成", message)
                                       
                 except Exception as e:
                     self.log(f"保存Excel文件时出错: {str(e)}")
-                    messagebox.showerror("错误", f"保存Excel文件时出错: {str(e)}")
+                    self.show_dialog('error', "错误", f"保存Excel文件时出错: {str(e)}")
                     
         except Exception as e:
             self.log(f"处理过程中出现错误: {str(e)}")
-            messagebox.showerror("错误", f"处理过程中出现错误: {str(e)}")
+            self.show_dialog('error', "错误", f"处理过程中出现错误: {str(e)}")
             
         finally:
             self.processing = False
-            self.start_button.config(state='normal')
-            self.stop_button.config(state='disabled')
+            self.ui_queue.put(('finished',))
             
     def run(self):
         """运行主窗口"""
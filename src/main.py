@@ -3,8 +3,14 @@
 身份证信息提取工具主程序
 """
 
+import time
+
+# 尽早记录启动时刻，用于统计从启动到界面可操作的用时
+_start_time = time.perf_counter()
+
 import sys
 import os
+import multiprocessing
 
 # 添加src目录到Python路径 - 支持开发环境和打包后的环境
 if getattr(sys, 'frozen', False):
@@ -51,7 +57,7 @@ except ImportError:
 def main():
     """主函数"""
     try:
-        app = MainWindow()
+        app = MainWindow(start_time=_start_time)
         app.run()
     except Exception as e:
         print(f"程序启动失败: {e}")
@@ -59,4 +65,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序使用多进程时需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
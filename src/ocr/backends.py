@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+OCR后端
+
+识别器通过OCRBackend接口识别文字区域：输入一组裁剪好的区域图像，返回同样顺序的(文本, 置信度)列表。
+- TesseractBackend：基于TesseractEngine（tesserocr常驻API或pytesseract），作为参考实现；
+- OpenCVTextBackend：用cv2.dnn加载本地的CRNN文字识别模型（ONNX等），
+  一批区域缩放到同一输入尺寸后只做一次前向计算，适合大批量识别。
+"""
+
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# 修复PyInstaller打包后的导入问题
+try:
+    from .engine import TesseractEngine
+except ImportError:
+    try:
+        from src.ocr.engine import TesseractEngine
+    except ImportError:
+        # 动态路径处理
+        import sys
+        sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+        from ocr.engine import TesseractEngine
+
+
+# 单个区域的识别结果，confidence为0~100（与Tesseract的词置信度一致）
+OCRResult = namedtuple('OCRResult', ['text', 'confidence'])
+
+
+class OCRBackend:
+    """OCR后端接口"""
+
+    # 后端名称，用于统计和流水线指纹
+    name = 'base'
+    # 是否使用Tesseract命令行风格的配置（--psm等）；不使用时多配置尝试没有意义
+    uses_config = True
+    # 是否支持返回带词框的整卡识别结果（单次整卡OCR需要）
+    supports_words = False
+
+    def recognize_batch(self, images, config=''):
+        """识别一组区域图像，返回同样顺序的OCRResult列表"""
+        raise NotImplementedError
+
+    def recognize(self, image, config=''):
+        """识别单个区域图像"""
+        return self.recognize_batch([image], config)[0]
+
+    def image_to_data(self, image, config=''):
+        """识别整张图像并返回词级结果（见TesseractEngine.image_to_data），supports_words为True时可用"""
+        raise NotImplementedError(f"{self.name} 后端不支持词框输出")
+
+    def get_parameters(self):
+        """后端参数，计入识别流水线指纹"""
+        return {'name': self.name}
+
+    def close(self):
+        pass
+
+
+class TesseractBackend(OCRBackend):
+
+    uses_config = True
+    supports_words = True
+
+    def __init__(self, engine=None, engine_name='auto'):
+        """engine: 可选的已创建的TesseractEngine，未提供时按engine_name创建"""
+        self.engine = engine if engine is not None else TesseractEngine(engine_name)
+
+    @property
+    def name(self):
+        return self.engine.name
+
+    def get_parameters(self):
+        # tesserocr与pytesseract的识别结果相同，切换引擎不影响缓存；
+        # 安装、升级或修复Tesseract后版本变化，旧的缓存结果随之失效
+        return {'name': 'tesseract', 'version': self.engine.get_version()}
+
+    def recognize_batch(self, images, config=''):
+        # Tesseract逐个区域识别；tesserocr的语言模型常驻，批内只有图像数据需要传入
+        return [OCRResult(*self.engine.image_to_text(image, config)) for image in images]
+
+    def image_to_data(self, image, config=''):
+        return self.engine.image_to_data(image, config)
+
+    def close(self):
+        self.engine.close()
+
+
+class OpenCVTextBackend(OCRBackend):
+
+    name = 'opencv_dnn'
+    uses_config = False
+
+    def __init__(self, model_path, vocabulary_path, input_size=(100, 32), channels=3, batch_size=32):
+        """
+        model_path: 文字识别模型文件（如OpenCV Model Zoo的CRNN中文模型.onnx）
+        vocabulary_path: 字符表文件，每行一个字符，顺序与模型输出类别一致（第0类为CTC空白）
+        input_size: 模型输入尺寸(宽, 高)
+        channels: 模型输入通道数（1为灰度，3为彩色）
+        batch_size: 每次前向计算的最大区域数
+        """
+        if not model_path or not os.path.exists(model_path):
+            raise ValueError(f"文字识别模型不存在: {model_path}")
+        if not vocabulary_path or not os.path.exists(vocabulary_path):
+            raise ValueError(f"字符表文件不存在: {vocabulary_path}")
+
+        self.model_path = model_path
+        self.net = cv2.dnn.readNet(model_path)
+        with open(vocabulary_path, 'r', encoding='utf-8') as f:
+            self.vocabulary = [line.rstrip('\r\n') for line in f]
+        self.input_size = tuple(input_size)
+        self.channels = channels
+        self.batch_size = max(1, batch_size)
+        # 部分模型导出时固定了批大小为1，此时逐个计算
+        self._batched = True
+        # 输出中批维度的位置（CRNN通常为(序列长度, 批大小, 类别数)），创建时探测一次
+        self._batch_axis = self._detect_batch_axis()
+
+    def get_parameters(self):
+        return {
+            'name': self.name,
+            'model': os.path.basename(self.model_path),
+            'model_size': os.path.getsize(self.model_path),
+            'vocabulary_size': len(self.vocabulary),
+            'input_size': list(self.input_size),
+            'channels': self.channels
+        }
+
+    def _prepare(self, image):
+        """转换为模型要求的通道数（缩放和归一化由blobFromImages完成）"""
+        if self.channels == 1 and image.ndim == 3:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.channels == 3 and image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return image
+
+    def _run(self, images):
+        blob = cv2.dnn.blobFromImages([self._prepare(image) for image in images], scalefactor=1 / 127.5,
+                                      size=self.input_size, mean=(127.5, 127.5, 127.5), swapRB=False)
+        self.net.setInput(blob)
+        return self.net.forward()
+
+    def _detect_batch_axis(self):
+        """
+        分别以批大小1和2前向一次，输出中随之从1变为2的维度即为批维度
+
+        不能按每次的输出形状猜测：批大小恰好等于序列长度时两种排列的形状相同。
+        模型不支持批量计算时改为逐个计算。
+        """
+        blank = np.full((self.input_size[1], self.input_size[0], 3), 255, dtype=np.uint8)
+        single = self._run([blank]).shape
+        try:
+            double = self._run([blank, blank]).shape
+        except cv2.error:
+            self._batched = False
+            return 0
+        if len(single) == len(double):
+            for axis, (a, b) in enumerate(zip(single, double)):
+                if a == 1 and b == 2:
+                    return axis
+        raise ValueError(f"无法确定文字识别模型输出的批维度: {single} -> {double}")
+
+    def _forward(self, images):
+        output = self._run(images)
+        if self._batch_axis:
+            output = np.moveaxis(output, self._batch_axis, 0)
+        return output.reshape(len(images), -1, output.shape[-1])
+
+    def _decode(self, scores):
+        """CTC贪心解码，返回(文本, 平均字符概率*100)"""
+        scores = scores - scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+        best = probabilities.argmax(axis=1)
+        chars = []
+        confidences = []
+        previous = 0
+        for step, index in enumerate(best):
+            if index != 0 and index != previous and index - 1 < len(self.vocabulary):
+                chars.append(self.vocabulary[index - 1])
+                confidences.append(probabilities[step, index])
+            previous = index
+        if not chars:
+            return OCRResult("", 0.0)
+        return OCRResult(''.join(chars), float(np.mean(confidences)) * 100)
+
+    def recognize_batch(self, images, config=''):
+        results = [OCRResult("", 0.0)] * len(images)
+        indices = [i for i, image in enumerate(images) if image is not None and image.size > 0]
+
+        for start in range(0, len(indices), self.batch_size):
+            chunk = indices[start:start + self.batch_size]
+            if self._batched and len(chunk) > 1:
+                try:
+                    outputs = self._forward([images[i] for i in chunk])
+                except cv2.error:
+                    self._batched = False
+            if not self._batched or len(chunk) == 1:
+                outputs = [self._forward([images[i]])[0] for i in chunk]
+            for i, scores in zip(chunk, outputs):
+                results[i] = self._decode(scores)
+        return results
+
+
+def create_backend(name='tesseract', engine=None, **options):
+    """
+    按名称创建OCR后端
+
+    name: 'tesseract'或'opencv_dnn'
+    engine: tesseract后端可复用的TesseractEngine
+    options: opencv_dnn后端的参数（model_path、vocabulary_path、input_size、channels、batch_size）
+    """
+    if name == 'tesseract':
+        return TesseractBackend(engine)
+    if name == 'opencv_dnn':
+        return OpenCVTextBackend(**options)
+    raise ValueError(f"未知的OCR后端: {name}")
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+OCR配置命中率统计
+
+记录每个Tesseract配置被尝试的次数、结果被采用的次数以及提前结束的次数，
+并按历史命中率给出尝试顺序。
+"""
+
+import threading
+
+
+class OCRConfigStats:
+
+    def __init__(self, default_order):
+        """default_order: 没有历史数据时的配置尝试顺序"""
+        self.default_order = list(default_order)
+        self.attempts = {name: 0 for name in self.default_order}
+        self.hits = {name: 0 for name in self.default_order}
+        self.early_exits = {name: 0 for name in self.default_order}
+        # take_delta已经报告过的(尝试, 命中, 提前结束)次数
+        self._reported = {}
+        self._lock = threading.Lock()
+
+    def hit_rate(self, config_name):
+        """命中率（加一平滑，避免少量样本时顺序剧烈波动）"""
+        return (self.hits.get(config_name, 0) + 1) / (self.attempts.get(config_name, 0) + 2)
+
+    def ordered(self):
+        """按历史命中率从高到低排列配置，命中率相同时保持默认顺序"""
+        with self._lock:
+            return sorted(self.default_order,
+                          key=lambda name: (-self.hit_rate(name), self.default_order.index(name)))
+
+    def record_attempt(self, config_name):
+        with self._lock:
+            self.attempts[config_name] = self.attempts.get(config_name, 0) + 1
+
+    def record_hit(self, config_name, early_exit=False):
+        with self._lock:
+            self.hits[config_name] = self.hits.get(config_name, 0) + 1
+            if early_exit:
+                self.early_exits[config_name] = self.early_exits.get(config_name, 0) + 1
+
+    def merge(self, other):
+        """合并另一份统计（to_dict的输出），用于汇总多个工作进程的数据"""
+        with self._lock:
+            for name, item in other.items():
+                self.attempts[name] = self.attempts.get(name, 0) + item.get('attempts', 0)
+                self.hits[name] = self.hits.get(name, 0) + item.get('hits', 0)
+                self.early_exits[name] = self.early_exits.get(name, 0) + item.get('early_exits', 0)
+                if name not in self.default_order:
+                    self.default_order.append(name)
+
+    def take_delta(self):
+        """
+        自上次调用以来新增的统计（格式同to_dict，不含命中率），没有新增时为空字典
+
+        工作进程随每个结果返回新增的部分，主进程用merge汇总
+        """
+        with self._lock:
+            delta = {}
+            for name in self.default_order:
+                current = (self.attempts.get(name, 0), self.hits.get(name, 0), self.early_exits.get(name, 0))
+                reported = self._reported.get(name, (0, 0, 0))
+                if current != reported:
+                    delta[name] = {key: now - before for key, now, before
+                                   in zip(('attempts', 'hits', 'early_exits'), current, reported)}
+                    self._reported[name] = current
+            return delta
+
+    def to_dict(self):
+        """导出统计数据"""
+        with self._lock:
+            return {
+                name: {
+                    'attempts': self.attempts.get(name, 0),
+                    'hits': self.hits.get(name, 0),
+                    'early_exits': self.early_exits.get(name, 0),
+                    'hit_rate': round(self.hits.get(name, 0) / self.attempts[name], 3) if self.attempts.get(name) else 0.0
+                }
+                for name in self.default_order
+            }
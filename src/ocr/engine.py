@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+OCR引擎模块
+
+优先使用 tesserocr 在进程内常驻 libtesseract API，语言模型只加载一次；
+未安装 tesserocr 时回退到 pytesseract（每次调用启动一个 tesseract 子进程）。
+"""
+
+import logging
+import os
+import re
+import threading
+
+import cv2
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+logger = logging.getLogger('idcard_ocr.engine')
+
+# 每个进程只提示一次回退到pytesseract
+_fallback_warned = False
+
+
+class TesseractEngine:
+
+    def __init__(self, engine='auto'):
+        """
+        engine: 'auto'（有tesserocr则使用常驻API）、'tesserocr' 或 'pytesseract'
+        """
+        if engine == 'tesserocr' and tesserocr is None:
+            raise ValueError("tesserocr 未安装，无法使用常驻OCR引擎")
+
+        self.use_api = tesserocr is not None and engine in ('auto', 'tesserocr')
+        if engine == 'auto' and not self.use_api:
+            self._warn_fallback()
+        self._apis = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._parsed_configs = {}
+
+    @staticmethod
+    def _warn_fallback():
+        global _fallback_warned
+        if not _fallback_warned:
+            _fallback_warned = True
+            logger.warning("未安装tesserocr，回退到pytesseract：每次识别都会启动tesseract进程并重新加载语言模型，"
+                           "速度明显变慢（pip install tesserocr 后使用常驻引擎）")
+
+    @property
+    def name(self):
+        """当前使用的引擎名称"""
+        return 'tesserocr' if self.use_api else 'pytesseract'
+
+    def get_version(self):
+        """Tesseract版本（首次调用时查询），不可用时返回None"""
+        if self._version is None:
+            try:
+                if self.use_api:
+                    self._version = tesserocr.tesseract_version().splitlines()[0].strip()
+                else:
+                    self._version = str(pytesseract.get_tesseract_version())
+            except Exception as e:
+                logger.debug("无法获取Tesseract版本: %s", e)
+                return None
+        return self._version
+
+    def parse_config(self, config):
+        """
+        从命令行风格的配置中解析语言、OEM、PSM和-c变量，返回(lang, oem, psm, variables)
+
+        variables为按名称排序的((名称, 值), ...)；常驻API不支持的其余参数（如--dpi）被忽略，
+        每个配置只警告一次（pytesseract仍会使用这些参数，两个引擎的结果可能不同）
+        """
+        parsed = self._parsed_configs.get(config)
+        if parsed is not None:
+            return parsed
+
+        lang = 'eng'
+        oem = 3
+        psm = 3
+        variables = {}
+        unsupported = []
+
+        tokens = config.split()
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            value = tokens[index + 1] if index + 1 < len(tokens) else None
+            if token in ('-l', '--oem', '--psm', '-c') and value is not None:
+                index += 2
+                if token == '-l':
+                    lang = value
+                elif token == '--oem' and value.isdigit():
+                    oem = int(value)
+                elif token == '--psm' and value.isdigit():
+                    psm = int(value)
+                elif token == '-c' and '=' in value:
+                    name, _, variable_value = value.partition('=')
+                    variables[name] = variable_value
+                else:
+                    unsupported.extend([token, value])
+                continue
+            if token.startswith('-c') and '=' in token:
+                name, _, variable_value = token[2:].partition('=')
+                variables[name] = variable_value
+            else:
+                unsupported.append(token)
+            index += 1
+
+        if unsupported and self.use_api:
+            logger.warning("常驻OCR引擎忽略不支持的Tesseract参数 %s（配置: '%s'）", ' '.join(unsupported), config)
+
+        parsed = (lang, oem, psm, tuple(sorted(variables.items())))
+        self._parsed_configs[config] = parsed
+        return parsed
+
+    def _get_api(self, lang, oem, variables=()):
+        """获取（必要时创建）常驻的Tesseract API句柄；-c变量在创建时设置，不同变量使用不同的句柄"""
+        key = (lang, oem, variables)
+        api = self._apis.get(key)
+        if api is None:
+            kwargs = {'lang': lang, 'oem': oem}
+            if variables:
+                kwargs['variables'] = dict(variables)
+            tessdata_dir = self._find_tessdata_dir()
+            if tessdata_dir:
+                kwargs['path'] = tessdata_dir
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            self._apis[key] = api
+        return api
+
+    def _find_tessdata_dir(self):
+        """根据已发现的tesseract可执行文件推断tessdata目录"""
+        if os.environ.get('TESSDATA_PREFIX'):
+            return None
+
+        tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
+        if tesseract_cmd and os.path.isabs(tesseract_cmd):
+            tessdata_dir = os.path.join(os.path.dirname(tesseract_cmd), 'tessdata')
+            if os.path.isdir(tessdata_dir):
+                return tessdata_dir + os.sep
+        return None
+
+    def _set_image(self, api, image):
+        """将numpy图像直接传入API，避免写临时文件"""
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            channels = 3
+        else:
+            channels = 1
+
+        height, width = image.shape[:2]
+        api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+
+    def image_to_string(self, image, config):
+        """识别图像中的文字"""
+        if image.size == 0:
+            return ""
+
+        if not self.use_api:
+            return pytesseract.image_to_string(image, config=config)
+
+        lang, oem, psm, variables = self.parse_config(config)
+        with self._lock:
+            api = self._get_api(lang, oem, variables)
+            api.SetPageSegMode(psm)
+            self._set_image(api, image)
+            return api.GetUTF8Text()
+
+    def image_to_text(self, image, config):
+        """识别图像中的文字，返回(文本, 平均词置信度)"""
+        if image.size == 0:
+            return "", 0.0
+
+        if not self.use_api:
+            # 一次调用同时得到文本和置信度
+            words = self.image_to_data(image, config)
+            if not words:
+                return "", 0.0
+            text = ' '.join(word['text'] for word in words)
+            confidence = sum(word['conf'] for word in words) / len(words)
+            return text, confidence
+
+        lang, oem, psm, variables = self.parse_config(config)
+        with self._lock:
+            api = self._get_api(lang, oem, variables)
+            api.SetPageSegMode(psm)
+            self._set_image(api, image)
+            text = api.GetUTF8Text()
+            confidence = float(api.MeanTextConf())
+        return text, confidence
+
+    def image_to_data(self, image, config):
+        """
+        识别图像中的文字并返回词级结果
+
+        返回列表，每项包含 text、conf 以及词框的 left、top、width、height（像素）
+        """
+        if image.size == 0:
+            return []
+
+        words = []
+        if not self.use_api:
+            data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+            for i, text in enumerate(data['text']):
+                conf = float(data['conf'][i])
+                if not text.strip() or conf < 0:
+                    continue
+                words.append({
+                    'text': text.strip(),
+                    'conf': conf,
+                    'left': data['left'][i],
+                    'top': data['top'][i],
+                    'width': data['width'][i],
+                    'height': data['height'][i]
+                })
+            return words
+
+        lang, oem, psm, variables = self.parse_config(config)
+        with self._lock:
+            api = self._get_api(lang, oem, variables)
+            api.SetPageSegMode(psm)
+            self._set_image(api, image)
+            api.Recognize()
+
+            iterator = api.GetIterator()
+            if iterator is None:
+                return words
+
+            level = tesserocr.RIL.WORD
+            for item in tesserocr.iterate_level(iterator, level):
+                text = item.GetUTF8Text(level)
+                if not text or not text.strip():
+                    continue
+                left, top, right, bottom = item.BoundingBox(level)
+                words.append({
+                    'text': text.strip(),
+                    'conf': float(item.Confidence(level)),
+                    'left': left,
+                    'top': top,
+                    'width': right - left,
+                    'height': bottom - top
+                })
+        return words
+
+    def close(self):
+        """释放常驻的API句柄"""
+        with self._lock:
+            for api in self._apis.values():
+                api.End()
+            self._apis.clear()
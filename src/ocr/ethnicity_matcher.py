@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+民族名称匹配
+
+把OCR得到的民族文本规范化为56个民族的标准名称：
+- 精确匹配：用Aho-Corasick自动机一次扫描找出文本中出现的所有词条，取最长的一个，
+  结果与词典顺序无关（如"土家族"不会被"土"截断）；
+- 模糊匹配：精确匹配失败时，用BK树在编辑距离内查找最接近的词条，
+  OCR常见的形近字（如"汊/汉"、"状/壮"、"旅/族"）之间的替换只计0.5。
+
+匹配结果带有0~1的分数，识别器据此判断结果是否可信、能否提前结束。
+"""
+
+from collections import deque, namedtuple
+from functools import lru_cache
+
+
+# 匹配结果：标准民族名、分数、方式（'exact'或'fuzzy'）、命中的词条
+EthnicityMatch = namedtuple('EthnicityMatch', ['name', 'score', 'method', 'matched'])
+
+# OCR（chi_sim）常见的形近字，同一组内的字互相替换时编辑距离只计0.5
+CONFUSABLE_GLYPHS = (
+    '汉汊汶议', '回四囗', '藏臧蔵', '壮状庄', '满蒲瞒', '傣泰俸', '佤瓦', '畲佘畬',
+    '彝彜彛', '侗洞恫桐', '瑶谣遥摇', '苗笛亩', '黎梨犁藜', '羌差', '傈栗慄', '僳粟',
+    '仡亿', '仫么', '佬老姥', '维推唯', '吾五', '尔尓', '鄂萼颚', '裕浴', '土士',
+    '水永', '白自百', '怒恕努', '京亰', '珞洛骆', '蒙豪', '锡赐', '撒撤散', '布市',
+    '依侬', '朗郎', '哈恰', '萨莎', '斡翰幹', '纳呐钠', '西酉', '颇颜', '乌鸟',
+    '孜孙', '德徳', '昂昴', '保堡', '独浊', '龙尤', '伦仑论', '春舂', '哲晢',
+    '门们问', '巴已', '基碁', '诺喏', '毛毫', '南喃', '阿何', '昌冒', '普晋',
+    '米来', '塔搭', '吉告', '古占', '乡多', '柯珂', '拉垃', '祜枯', '鲜藓', '朝潮',
+    '尼泥', '俄饿娥', '罗萝', '斯期', '温湿', '固国', '赫郝', '族旅簇',
+)
+
+FUZZY_MATCH_MAX_DISTANCE = 1.0
+CONFUSABLE_COST = 0.5
+
+
+def _confusable_pairs(groups):
+    pairs = set()
+    for group in groups:
+        for a in group:
+            for b in group:
+                if a != b:
+                    pairs.add((a, b))
+    return frozenset(pairs)
+
+
+class AhoCorasick:
+    """多模式串匹配自动机，一次扫描返回所有命中的词条"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build_fail_links()
+
+    def _add(self, pattern):
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append(pattern)
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.fail[child] == child:
+                    self.fail[child] = 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text):
+        """返回[(起始位置, 词条), ...]"""
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for pattern in self.output[state]:
+                matches.append((index - len(pattern) + 1, pattern))
+        return matches
+
+
+class BKTree:
+    """BK树：按度量距离组织词条，查询时只访问可能落在容差内的子树"""
+
+    def __init__(self, words, distance):
+        self.distance = distance
+        self.root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            d = self.distance(word, node[0])
+            if d == 0:
+                return
+            if d not in node[1]:
+                node[1][d] = (word, {})
+                return
+            node = node[1][d]
+
+    def search(self, word, max_distance):
+        """返回[(距离, 词条), ...]，按距离从小到大排列"""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            candidate, children = stack.pop()
+            d = self.distance(word, candidate)
+            if d <= max_distance:
+                found.append((d, candidate))
+            for child_distance, child in children.items():
+                if d - max_distance <= child_distance <= d + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+
+class EthnicityMatcher:
+
+    def __init__(self, lexicon, confusables=CONFUSABLE_GLYPHS, max_distance=FUZZY_MATCH_MAX_DISTANCE):
+        """
+        lexicon: {词条: 标准民族名}，如{'汉': '汉族', '蒙古': '蒙古族'}，标准名本身会自动加入词条
+        confusables: 形近字分组
+        max_distance: 模糊匹配允许的最大编辑距离
+        """
+        self.lexicon = dict(lexicon)
+        for name in set(self.lexicon.values()):
+            self.lexicon.setdefault(name, name)
+        self.max_distance = max_distance
+        self.suffix = '族'
+        self._confusable_pairs = _confusable_pairs(confusables)
+        self._suffix_glyphs = {b for a, b in self._confusable_pairs if a == self.suffix} | {self.suffix}
+        self._automaton = AhoCorasick(self.lexicon)
+        # 模糊匹配只比较去掉"族"字后的词干
+        self._stems = {}
+        for key, name in self.lexicon.items():
+            self._stems.setdefault(self._strip_suffix(key), set()).add(name)
+        self._bk_tree = BKTree(sorted(self._stems), self.edit_distance)
+        self.match = lru_cache(maxsize=4096)(self._match)
+
+    def get_parameters(self):
+        """匹配参数，计入识别流水线指纹"""
+        return {
+            'lexicon_size': len(self.lexicon),
+            'confusable_pairs': len(self._confusable_pairs),
+            'max_distance': self.max_distance,
+            'confusable_cost': CONFUSABLE_COST
+        }
+
+    def _strip_suffix(self, text):
+        if len(text) > 1 and text[-1] in self._suffix_glyphs:
+            return text[:-1]
+        return text
+
+    def substitution_cost(self, a, b):
+        if a == b:
+            return 0
+        if (a, b) in self._confusable_pairs:
+            return CONFUSABLE_COST
+        return 1
+
+    def edit_distance(self, a, b):
+        """形近字加权的编辑距离（插入、删除计1，形近字替换计0.5，其他替换计1）"""
+        previous = [float(j) for j in range(len(b) + 1)]
+        for i, char_a in enumerate(a, 1):
+            current = [float(i)]
+            for j, char_b in enumerate(b, 1):
+                current.append(min(previous[j] + 1,
+                                   current[j - 1] + 1,
+                                   previous[j - 1] + self.substitution_cost(char_a, char_b)))
+            previous = current
+        return previous[-1]
+
+    def _match(self, text):
+        """
+        匹配民族名称，返回EthnicityMatch，无法确定时返回None
+
+        text应为已去除空白、标签和非中文字符的文本
+        """
+        if not text:
+            return None
+
+        exact = self._match_exact(text)
+        if exact is not None:
+            return exact
+        return self._match_fuzzy(text)
+
+    def _match_exact(self, text):
+        matches = self._automaton.find_all(text)
+        if not matches:
+            return None
+
+        # 取最长的词条，长度相同时取靠前的
+        start, matched = min(matches, key=lambda item: (-len(item[1]), item[0]))
+        span = len(matched)
+        if not matched.endswith(self.suffix) and text[start + span:start + span + 1] in self._suffix_glyphs:
+            span += 1
+        coverage = span / len(text)
+        return EthnicityMatch(self.lexicon[matched], round(0.5 + 0.5 * coverage, 3), 'exact', matched)
+
+    def _match_fuzzy(self, text):
+        query = self._strip_suffix(text)
+        # 单字只允许形近字替换，否则任何一个汉字都会被匹配成单字民族
+        max_distance = CONFUSABLE_COST if len(query) == 1 else self.max_distance
+        candidates = self._bk_tree.search(query, max_distance)
+        if not candidates:
+            return None
+
+        best_distance = candidates[0][0]
+        names = set()
+        for d, stem in candidates:
+            if d == best_distance:
+                names |= self._stems[stem]
+        # 距离相同的候选对应不同民族时无法判断
+        if len(names) != 1:
+            return None
+
+        name = names.pop()
+        matched = min((stem for d, stem in candidates if d == best_distance), key=len)
+        score = max(0.0, 1 - best_distance / len(name))
+        return EthnicityMatch(name, round(score, 3), 'fuzzy', matched)
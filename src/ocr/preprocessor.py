@@ -3,77 +3,290 @@
 图像预处理模块
 """
 
+import io
+import logging
+import os
+import sys
+
 import cv2
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
+
+# 修复PyInstaller打包后的导入问题
+try:
+    from ..utils.metrics import NULL_METRICS
+    from ..config.settings import PREPROCESS_PROFILES, PREPROCESS_PROFILE
+except ImportError:
+    try:
+        from src.utils.metrics import NULL_METRICS
+        from src.config.settings import PREPROCESS_PROFILES, PREPROCESS_PROFILE
+    except ImportError:
+        # 动态路径处理
+        current_dir = os.path.dirname(__file__)
+        parent_dir = os.path.dirname(current_dir)
+        sys.path.insert(0, parent_dir)
+        
+        from utils.metrics import NULL_METRICS
+        from config.settings import PREPROCESS_PROFILES, PREPROCESS_PROFILE
+
+
+logger = logging.getLogger('idcard_ocr.preprocessor')
+
+
+# JPEG按1/2、1/4、1/8分辨率解码的OpenCV标志
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+REDUCED_GRAYSCALE_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8
+}
+
+# 不含尺寸信息的JPEG标记（没有长度字段）
+_JPEG_STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xDA))
+# 帧头标记（SOF0-SOF15，不含DHT/JPG/DAC）
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# 整张卡片（相对坐标），用于单次整卡OCR
+FULL_CARD_REGION = {'x': 0.0, 'y': 0.0, 'width': 1.0, 'height': 1.0}
+
+# 卡片相对坐标的四个角（左上、右上、右下、左下）
+_UNIT_CORNERS = np.float32([[0, 0], [1, 0], [1, 1], [0, 1]])
+
+
+def sniff_image_format(data):
+    """根据文件头的魔数判断图像格式，无法识别时返回None"""
+    data = memoryview(data)[:8].tobytes()
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:2] == b'BM':
+        return 'bmp'
+    if data[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'tiff'
+    return None
+
+
+def jpeg_dimensions(data):
+    """从JPEG帧头读取(宽, 高)，不解码像素；解析失败时返回None"""
+    data = memoryview(data)
+    index = 2
+    length = len(data)
+    while index + 4 <= length:
+        if data[index] != 0xFF:
+            return None
+        marker = data[index + 1]
+        if marker == 0xFF:
+            # 填充字节
+            index += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            index += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            if index + 9 > length:
+                return None
+            height = int.from_bytes(data[index + 5:index + 7], 'big')
+            width = int.from_bytes(data[index + 7:index + 9], 'big')
+            return (width, height) if width and height else None
+        if marker == 0xDA:
+            # 扫描数据开始前仍未找到帧头
+            return None
+        index += 2 + int.from_bytes(data[index + 2:index + 4], 'big')
+    return None
+
+
+class CardImage:
+    """
+    矫正后的身份证
+
+    image为card_size大小的矫正图像，用于近似重复检测和调试输出；文字区域不从image中裁剪，
+    而是按卡片的单应矩阵从原图直接透视变换到识别所需的尺寸（见ImagePreprocessor.warp_region）。
+    """
+
+    def __init__(self, image, source, matrix, ocr_size, interpolation):
+        """
+        source: 原图（灰度，只保留卡片外接矩形内的部分）
+        matrix: 卡片相对坐标（0~1）到source像素坐标的3x3单应矩阵
+        ocr_size: 识别时整张卡片的(宽, 高)，各区域按相对尺寸从中换算
+        interpolation: 从source变换时使用的插值方式（放大用INTER_CUBIC，缩小用INTER_LINEAR）
+        """
+        self.image = image
+        self.source = source
+        self.matrix = matrix
+        self.ocr_size = ocr_size
+        self.interpolation = interpolation
+
+    @property
+    def shape(self):
+        return self.image.shape
 
 
 class ImagePreprocessor:
     
-    def __init__(self):
-        pass
-        
-    def load_image(self, image_path):
-        """加载图像"""
+    def __init__(self, profile=None):
+        """profile: 预处理档位（PREPROCESS_PROFILES中的名称），None表示使用PREPROCESS_PROFILE"""
+        # 预处理参数（参与结果缓存的流水线指纹计算，修改后旧缓存自动失效）
+        self.max_width = 1200
+        self.max_height = 800
+        # JPEG直接以缩小的分辨率解码（见load_image）
+        self.reduced_decode = True
+        self.bilateral_params = (9, 75, 75)
+        self.median_ksize = 3
+        self.clahe_clip_limit = 2.0
+        self.clahe_tile_grid = (8, 8)
+        self.canny_thresholds = (50, 150)
+        self.min_card_area = 10000
+        # 卡片定位在约detect_width像素宽的金字塔层上进行，再回到原分辨率精修角点
+        self.detect_width = 320
+        # 身份证宽高比（ID-1：85.6mm x 54mm）及允许的相对偏差（透视变形会改变外接矩形比例）
+        self.card_aspect = 85.6 / 54
+        self.aspect_tolerance = 0.35
+        # 精修角点时每条边的取样数
+        self.refine_samples = 48
+        self.card_size = (640, 400)
+        # 文字区域的识别尺寸：使字高约为target_glyph_height像素（glyph_height_ratio为字高与卡片高度之比）
+        self.target_glyph_height = 40
+        self.glyph_height_ratio = 0.06
+        # 直接对普通图像提取文字区域时的放大倍数（见extract_text_regions）
+        self.region_scale = 3
+        self.set_profile(profile or PREPROCESS_PROFILE)
+        
+    def set_profile(self, profile):
+        """
+        切换预处理档位
+
+        grayscale: 直接解码为灰度图，后续各步骤都在单通道上进行
+        denoise: 'bilateral'（双边滤波）或'median'（中值滤波，远快于双边滤波）
+        enhance_contrast: 是否对整张图片做CLAHE
+        """
+        if profile not in PREPROCESS_PROFILES:
+            raise ValueError(f"不支持的预处理档位: {profile}")
+        options = PREPROCESS_PROFILES[profile]
+        self.profile = profile
+        self.grayscale = options['grayscale']
+        self.denoise_method = options['denoise']
+        self.contrast_enhancement = options['enhance_contrast']
+
+    def get_parameters(self):
+        """获取当前预处理参数"""
+        return {
+            'profile': self.profile,
+            'grayscale': self.grayscale,
+            'denoise_method': self.denoise_method,
+            'contrast_enhancement': self.contrast_enhancement,
+            'max_width': self.max_width,
+            'max_height': self.max_height,
+            'reduced_decode': self.reduced_decode,
+            'bilateral_params': list(self.bilateral_params),
+            'median_ksize': self.median_ksize,
+            'clahe_clip_limit': self.clahe_clip_limit,
+            'clahe_tile_grid': list(self.clahe_tile_grid),
+            'canny_thresholds': list(self.canny_thresholds),
+            'min_card_area': self.min_card_area,
+            'detect_width': self.detect_width,
+            'card_aspect': round(self.card_aspect, 4),
+            'aspect_tolerance': self.aspect_tolerance,
+            'card_size': list(self.card_size),
+            'target_glyph_height': self.target_glyph_height,
+            'glyph_height_ratio': self.glyph_height_ratio,
+            'region_scale': self.region_scale
+        }
+        
+    def load_image(self, image_path, max_size=None, image_data=None):
+        """
+        加载图像（文件只读取一次）
+
+        max_size: 可选的(最大宽度, 最大高度)。指定后JPEG图像会直接以1/2、1/4或1/8分辨率解码，
+        解码结果仍不小于缩放到该尺寸后的大小，最终尺寸由resize_image确定。
+        image_data: 可选的已读入的文件内容（bytes或uint8数组，如预读得到的结果），提供时不再读取文件
+        """
         try:
-            import os
-            
             # 标准化路径分隔符
             normalized_path = os.path.normpath(image_path)
             
-            # 检查文件是否存在
-            if not os.path.exists(normalized_path):
-                raise ValueError(f"File not found: {normalized_path}")
-            
-            # 方法1: 尝试直接使用OpenCV加载
-            image = cv2.imread(normalized_path)
-            
-            # 如果OpenCV加载失败（通常是中文路径问题）
-            if image is None:
-                print(f"OpenCV failed to load, trying alternative method for: {normalized_path}")
-                
-                # 方法2: 使用numpy和cv2的组合处理中文路径
-                try:
-                    # 读取文件为二进制数据
-                    with open(normalized_path, 'rb') as f:
-                        image_data = f.read()
-                    
-                    # 将二进制数据转换为numpy数组
-                    nparr = np.frombuffer(image_data, np.uint8)
-                    
-                    # 使用cv2解码图像
-                    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    
-                    if image is None:
-                        raise ValueError("Failed to decode image data")
-                        
-                except Exception as decode_error:
-                    print(f"Alternative method also failed: {decode_error}")
-                    
-                    # 方法3: 使用PIL作为最后的备选方案
-                    try:
-                        from PIL import Image as PILImage
-                        pil_image = PILImage.open(normalized_path)
-                        
-                        # 转换PIL图像为OpenCV格式
-                        image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-                        
-                        if image is None:
-                            raise ValueError("PIL conversion failed")
-                            
-                    except Exception as pil_error:
-                        raise ValueError(f"All image loading methods failed. Path: {normalized_path}, PIL error: {pil_error}")
-            
-            print(f"Successfully loaded image: {normalized_path}, shape: {image.shape}")
+            if image_data is None:
+                image_data = self.read_image_bytes(normalized_path)
+            image = self.decode_image(image_data, max_size)
+            logger.debug("Successfully loaded image: %s, shape: %s", normalized_path, image.shape)
             return image
             
         except Exception as e:
             error_msg = f"Image loading failed: {str(e)}"
-            print(f"ERROR: {error_msg}")
+            logger.error("%s", error_msg)
             raise ValueError(error_msg)
             
-    def resize_image(self, image, max_width=1200, max_height=800):
+    def read_image_bytes(self, image_path):
+        """读取图像文件内容（以二进制方式读取，支持中文路径）"""
+        if not os.path.exists(image_path):
+            raise ValueError(f"File not found: {image_path}")
+            
+        with open(image_path, 'rb') as f:
+            return f.read()
+            
+    def decode_image(self, data, max_size=None):
+        """
+        从内存中的文件内容（bytes或uint8数组）解码图像，OpenCV无法解码时使用PIL
+
+        grayscale档位直接解码为灰度图（JPEG可省去颜色空间转换），否则为BGR图像
+        """
+        image_format = sniff_image_format(data)
+        # 不复制数据，直接以数组视图交给OpenCV
+        buffer = np.frombuffer(data, np.uint8)
+        
+        flag, reduced_flags = cv2.IMREAD_COLOR, REDUCED_DECODE_FLAGS
+        if self.grayscale:
+            flag, reduced_flags = cv2.IMREAD_GRAYSCALE, REDUCED_GRAYSCALE_DECODE_FLAGS
+        if image_format == 'jpeg' and max_size is not None:
+            flag = reduced_flags.get(self.get_decode_reduction(data, max_size), flag)
+            
+        image = cv2.imdecode(buffer, flag)
+        if image is not None:
+            return image
+            
+        logger.debug("OpenCV failed to decode %s data, trying PIL", image_format or 'unknown')
+        try:
+            pil_image = Image.open(io.BytesIO(memoryview(data)))
+            if image_format == 'jpeg' and max_size is not None:
+                # JPEG在解码阶段直接缩小，尺寸不小于max_size
+                pil_image.draft('RGB', tuple(max_size))
+            if self.grayscale:
+                return np.array(ImageOps.exif_transpose(pil_image).convert('L'))
+            pil_image = ImageOps.exif_transpose(pil_image).convert('RGB')
+            return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        except Exception as pil_error:
+            raise ValueError(f"All image decoding methods failed ({image_format or 'unknown format'}): {pil_error}")
+            
+    def get_decode_reduction(self, data, max_size):
+        """
+        根据JPEG头部中的尺寸选择解码缩小倍数（1、2、4或8）
+
+        保证缩小后的图像不小于resize_image缩放后的尺寸；EXIF旋转可能交换宽高，按两种方向中较大的需求计算。
+        """
+        size = jpeg_dimensions(data)
+        if size is None:
+            return 1
+            
+        width, height = size
+        max_width, max_height = max_size
+        scale = max(min(max_width / width, max_height / height),
+                    min(max_width / height, max_height / width))
+        if scale >= 1.0:
+            return 1
+            
+        for reduction in (8, 4, 2):
+            if reduction * scale <= 1.0:
+                return reduction
+        return 1
+        
+    def resize_image(self, image, max_width=None, max_height=None):
         """调整图像大小以提高处理速度"""
+        max_width = max_width or self.max_width
+        max_height = max_height or self.max_height
         h, w = image.shape[:2]
         
         # 计算缩放比例
@@ -90,12 +303,16 @@ class ImagePreprocessor:
         
     def enhance_contrast(self, image):
         """增强对比度"""
+        clahe = cv2.createCLAHE(clipLimit=self.clahe_clip_limit, tileGridSize=self.clahe_tile_grid)
+        if len(image.shape) == 2:
+            # 灰度图直接做CLAHE
+            return clahe.apply(image)
+            
         # 转换为LAB颜色空间
         lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
         l_channel, a, b = cv2.split(lab)
         
         # 对L通道应用CLAHE（限制对比度自适应直方图均衡化）
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
         l_channel = clahe.apply(l_channel)
         
         # 合并通道并转换回BGR
@@ -106,8 +323,11 @@ class ImagePreprocessor:
         
     def denoise_image(self, image):
         """图像去噪"""
+        if self.denoise_method == 'median':
+            return cv2.medianBlur(image, self.median_ksize)
+            
         # 使用双边滤波去噪，保持边缘
-        denoised = cv2.bilateralFilter(image, 9, 75, 75)
+        denoised = cv2.bilateralFilter(image, *self.bilateral_params)
         return denoised
         
     def convert_to_grayscale(self, image):
@@ -127,50 +347,189 @@ class ImagePreprocessor:
         )
         return binary
         
-    def detect_id_card(self, image):
-        """检测身份证区域"""
+    def detect_id_card(self, image, source=None):
+        """
+        检测身份证区域，返回CardImage
+
+        先在约detect_width宽的金字塔层上定位卡片轮廓，再在原分辨率下沿四条边拟合直线精修角点，
+        最后透视变换矫正。detect_width为None时直接在原图上检测。
+        source: 可选的原始分辨率图像（image由其缩小并增强得到），文字区域从中直接变换；默认为image
+        """
+        source = image if source is None else source
+        quad = self.locate_id_card(image)
+        if quad is not None:
+            # 透视变换矫正
+            corrected = self.perspective_transform(image, quad)
+            scale = np.float32([source.shape[1] / image.shape[1], source.shape[0] / image.shape[0]])
+            return self.make_card_image(corrected, source, self.order_points(quad) * scale, self.card_aspect)
+            
+        # 如果没有检测到身份证轮廓，把整张图片视为卡片（角点取像素边缘）
+        h, w = source.shape[:2]
+        quad = np.float32([[0, 0], [w, 0], [w, h], [0, h]]) - 0.5
+        return self.make_card_image(image, source, quad, w / h)
+        
+    def locate_id_card(self, image):
+        """查找身份证的四个角点（image像素坐标），找不到时返回None"""
         gray = self.convert_to_grayscale(image)
         
+        if not self.detect_width or gray.shape[1] < self.detect_width * 2:
+            quad = self.find_card_quad(gray, self.min_card_area)
+        else:
+            # 构建金字塔，取宽度最接近detect_width的一层
+            small = gray
+            while abs(small.shape[1] // 2 - self.detect_width) < abs(small.shape[1] - self.detect_width):
+                small = cv2.pyrDown(small)
+            scale_x = gray.shape[1] / small.shape[1]
+            scale_y = gray.shape[0] / small.shape[0]
+            
+            quad = self.find_card_quad(small, self.min_card_area / (scale_x * scale_y))
+            if quad is not None:
+                quad = quad.reshape(4, 2).astype(np.float32) * np.float32([scale_x, scale_y])
+                quad = self.refine_quad(gray, quad, band=max(3, int(np.ceil(max(scale_x, scale_y) * 2))))
+                
+        return None if quad is None else np.asarray(quad, dtype=np.float32).reshape(4, 2)
+        
+    def make_card_image(self, corrected, source, quad, card_aspect):
+        """
+        从原图中截取卡片的外接矩形（转为灰度），计算卡片相对坐标到截图的单应矩阵
+
+        quad: 按左上、右上、右下、左下排列的卡片角点（source像素坐标）
+        card_aspect: 卡片宽高比，与target_glyph_height一起决定识别时的卡片尺寸
+        """
+        h, w = source.shape[:2]
+        x1, y1 = np.maximum(np.floor(quad.min(axis=0)).astype(int) - 2, 0)
+        x2, y2 = np.ceil(quad.max(axis=0)).astype(int) + 3
+        crop = np.ascontiguousarray(self.convert_to_grayscale(source[y1:min(h, y2), x1:min(w, x2)]))
+        matrix = cv2.getPerspectiveTransform(_UNIT_CORNERS, (quad - np.float32([x1, y1])).astype(np.float32))
+        
+        ocr_height = self.target_glyph_height / self.glyph_height_ratio
+        ocr_size = (int(round(ocr_height * card_aspect)), int(round(ocr_height)))
+        # 卡片在原图中的高度（左右两条边的平均长度）小于识别尺寸时需要放大
+        source_height = (np.linalg.norm(quad[3] - quad[0]) + np.linalg.norm(quad[2] - quad[1])) / 2
+        interpolation = cv2.INTER_CUBIC if ocr_height > source_height else cv2.INTER_LINEAR
+        return CardImage(corrected, crop, matrix, ocr_size, interpolation)
+        
+
+    def find_card_quad(self, gray, min_area):
+        """
+        查找面积最大、宽高比接近身份证的四边形轮廓，返回4x1x2角点数组，找不到时返回None
+
+        先按面积和最小外接矩形的宽高比过滤轮廓，只对剩余轮廓做多边形近似。
+        """
         # 边缘检测
-        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+        edges = cv2.Canny(gray, *self.canny_thresholds, apertureSize=3)
         
         # 查找轮廓
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
-        # 寻找最大的矩形轮廓
-        max_area = 0
-        best_contour = None
-        
+        candidates = []
         for contour in contours:
-            # 近似轮廓
+            area = cv2.contourArea(contour)
+            if area <= min_area:
+                continue
+            (_, _), (rect_w, rect_h), _ = cv2.minAreaRect(contour)
+            if min(rect_w, rect_h) == 0:
+                continue
+            aspect = max(rect_w, rect_h) / min(rect_w, rect_h)
+            if abs(aspect - self.card_aspect) > self.card_aspect * self.aspect_tolerance:
+                continue
+            candidates.append((area, contour))
+            
+        # 按面积从大到小，第一个能近似为四边形的即为结果
+        for area, contour in sorted(candidates, key=lambda item: -item[0]):
             epsilon = 0.02 * cv2.arcLength(contour, True)
             approx = cv2.approxPolyDP(contour, epsilon, True)
-            
-            # 如果是四边形且面积足够大
             if len(approx) == 4:
-                area = cv2.contourArea(contour)
-                if area > max_area and area > 10000:  # 最小面积阈值
-                    max_area = area
-                    best_contour = approx
-                    
-        if best_contour is not None:
-            # 透视变换矫正
-            return self.perspective_transform(image, best_contour)
-        else:
-            # 如果没有检测到身份证轮廓，返回原图
-            return image
+                return approx
+        return None
+        
+    def refine_quad(self, gray, quad, band):
+        """
+        在原分辨率下精修四边形角点
+
+        在每条边两侧band像素范围内寻找边缘点并拟合直线，相邻直线的交点作为新角点；
+        某条边拟合失败或交点偏离过远时保留粗定位的结果。
+        """
+        quad = self.order_points(quad)
+        
+        lines = []
+        for i in range(4):
+            start, end = quad[i], quad[(i + 1) % 4]
+            lines.append(self._fit_edge_line(gray, start, end, band))
             
+        refined = quad.copy()
+        for i in range(4):
+            # 角点i是第i-1条边与第i条边的交点
+            previous_line, line = lines[i - 1], lines[i]
+            if previous_line is None or line is None:
+                continue
+            corner = self._intersect_lines(previous_line, line)
+            if corner is not None and np.linalg.norm(corner - quad[i]) <= band * 2:
+                refined[i] = corner
+        return refined
+        
+    def _fit_edge_line(self, gray, start, end, band):
+        """
+        拟合一条边的精确位置，返回(点, 方向)，可用的边缘点不足时返回None
+
+        沿粗定位边均匀取样，在每个样本处沿法线方向±band范围内取灰度变化最大的位置作为边缘点。
+        """
+        direction = end - start
+        length = float(np.linalg.norm(direction))
+        if length < 10:
+            return None
+        direction = direction / length
+        normal = np.float32([-direction[1], direction[0]])
+        
+        # 避开两端角点附近（圆角、相邻边的干扰）
+        samples = np.linspace(0.1, 0.9, self.refine_samples, dtype=np.float32) * length
+        offsets = np.arange(-band, band + 1, dtype=np.float32)
+        base = start + samples[:, None] * direction
+        grid = base[:, None, :] + offsets[None, :, None] * normal
+        profiles = cv2.remap(gray, grid[..., 0], grid[..., 1], cv2.INTER_LINEAR,
+                             borderMode=cv2.BORDER_REPLICATE).astype(np.float32)
+                             
+        # 法线方向上相邻像素的差分，取绝对值最大处（位于两个采样点之间）
+        gradient = np.abs(np.diff(profiles, axis=1))
+        best = np.argmax(gradient, axis=1)
+        strength = gradient[np.arange(len(best)), best]
+        positions = offsets[best] + 0.5
+        
+        # 丢弃没有明显边缘的样本
+        keep = strength >= max(8.0, float(np.median(strength)) * 0.5)
+        if keep.sum() < len(samples) * 0.3:
+            return None
+        points = (base[keep] + positions[keep, None] * normal).astype(np.float32)
+        
+        # 最小二乘拟合，去掉离群点后再拟合一次
+        for _ in range(2):
+            vx, vy, x0, y0 = cv2.fitLine(points, cv2.DIST_L2, 0, 0.01, 0.01).ravel()
+            distances = np.abs((points[:, 0] - x0) * vy - (points[:, 1] - y0) * vx)
+            inliers = points[distances <= 1.5]
+            if len(inliers) < len(samples) * 0.3 or len(inliers) == len(points):
+                break
+            points = inliers
+        return np.float32([x0, y0]), np.float32([vx, vy])
+        
+    def _intersect_lines(self, line_a, line_b):
+        """求两条直线（点+方向）的交点，近似平行时返回None"""
+        (p, r), (q, s) = line_a, line_b
+        denominator = r[0] * s[1] - r[1] * s[0]
+        if abs(denominator) < 1e-6:
+            return None
+        t = ((q[0] - p[0]) * s[1] - (q[1] - p[1]) * s[0]) / denominator
+        return p + t * r
+        
     def perspective_transform(self, image, contour):
         """透视变换矫正身份证"""
         # 获取四个角点
-        points = contour.reshape(4, 2).astype(np.float32)
+        points = np.asarray(contour, dtype=np.float32).reshape(4, 2)
         
         # 排序角点：左上、右上、右下、左下
         points = self.order_points(points)
         
         # 计算目标尺寸（身份证标准比例约为1.6:1）
-        width = 640
-        height = 400
+        width, height = self.card_size
         
         # 目标角点
         dst_points = np.array([
@@ -208,7 +567,15 @@ class ImagePreprocessor:
         return rect
         
     def extract_text_regions(self, image, region_configs):
-        """提取文字区域"""
+        """
+        提取文字区域
+
+        image为CardImage时各区域从原图直接透视变换到识别尺寸；为普通图像时按相对坐标裁剪，再放大region_scale倍
+        """
+        if isinstance(image, CardImage):
+            return {region_name: self.preprocess_text_region(self.warp_region(image, config), scale_factor=1)
+                    for region_name, config in region_configs.items()}
+            
         regions = {}
         h, w = image.shape[:2]
         
@@ -234,17 +601,38 @@ class ImagePreprocessor:
             
         return regions
         
-    def preprocess_text_region(self, region):
+    def warp_region(self, card, region_config):
+        """把一个文字区域（卡片相对坐标）从原图直接透视变换为识别尺寸的灰度图，只做一次重采样"""
+        card_w, card_h = card.ocr_size
+        out_w = max(1, int(round(region_config['width'] * card_w)))
+        out_h = max(1, int(round(region_config['height'] * card_h)))
+        
+        # 输出像素（中心）→ 卡片相对坐标 → 原图像素坐标
+        step_x = region_config['width'] / out_w
+        step_y = region_config['height'] / out_h
+        to_card = np.array([
+            [step_x, 0, region_config['x'] + step_x / 2],
+            [0, step_y, region_config['y'] + step_y / 2],
+            [0, 0, 1]
+        ])
+        matrix = card.matrix @ to_card
+        return cv2.warpPerspective(card.source, matrix, (out_w, out_h),
+                                   flags=card.interpolation | cv2.WARP_INVERSE_MAP,
+                                   borderMode=cv2.BORDER_REPLICATE)
+        
+    def preprocess_text_region(self, region, scale_factor=None):
         """对文字区域进行专门的预处理"""
         if region.size == 0:
             return region
             
-        # 放大区域以提高OCR精度
-        scale_factor = 3
-        h, w = region.shape[:2]
-        new_w = w * scale_factor
-        new_h = h * scale_factor
-        enlarged = cv2.resize(region, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
+        scale_factor = scale_factor or self.region_scale
+            
+        # 放大区域以提高OCR精度（从原图变换得到的区域已是识别尺寸）
+        if scale_factor != 1:
+            h, w = region.shape[:2]
+            enlarged = cv2.resize(region, (w * scale_factor, h * scale_factor), interpolation=cv2.INTER_CUBIC)
+        else:
+            enlarged = region
         
         # 转换为灰度
         if len(enlarged.shape) == 3:
@@ -268,25 +656,40 @@ class ImagePreprocessor:
         
         return binary
         
-    def preprocess_for_ocr(self, image_path):
-        """完整的OCR预处理流程"""
+    def preprocess_for_ocr(self, image_path, metrics=None, image_data=None):
+        """
+        完整的OCR预处理流程，返回CardImage
+
+        缩小、去噪和增强后的图像只用于定位卡片和生成矫正图像，文字区域从解码得到的原图直接变换
+        metrics: 可选的PipelineMetrics，用于统计各阶段耗时和解码得到的像素数（decoded_pixels，用于计算每百万像素的预处理耗时）
+        image_data: 可选的已读入的文件内容（见load_image）
+        """
+        metrics = metrics or NULL_METRICS
         try:
             # 加载图像
-            image = self.load_image(image_path)
+            with metrics.stage('load_image'):
+                max_size = (self.max_width, self.max_height) if self.reduced_decode else None
+                source = self.load_image(image_path, max_size, image_data)
+            metrics.increment('decoded_pixels', source.shape[0] * source.shape[1])
             
             # 调整大小
-            image = self.resize_image(image)
+            with metrics.stage('resize_image'):
+                image = self.resize_image(source)
             
             # 去噪
-            image = self.denoise_image(image)
+            with metrics.stage('denoise_image'):
+                image = self.denoise_image(image)
             
             # 增强对比度
-            image = self.enhance_contrast(image)
+            if self.contrast_enhancement:
+                with metrics.stage('enhance_contrast'):
+                    image = self.enhance_contrast(image)
             
             # 检测并矫正身份证
-            corrected = self.detect_id_card(image)
+            with metrics.stage('detect_id_card'):
+                card = self.detect_id_card(image, source)
             
-            return corrected
+            return card
             
         except Exception as e:
             raise ValueError(f"图像预处理失败: {str(e)}")
\ No newline at end of file
@@ -4,150 +4,267 @@ OCR识别模块
 """
 
 import cv2
-import pytesseract
 import re
 import os
 import sys
+import json
+import hashlib
+import logging
 
 # 修复PyInstaller打包后的导入问题
 try:
-    from .preprocessor import ImagePreprocessor
-    from ..config.settings import TESSERACT_CONFIG, TESSERACT_CONFIGS, ID_CARD_REGIONS, ALTERNATIVE_REGIONS
+    from .preprocessor import ImagePreprocessor, FULL_CARD_REGION
+    from .engine import TesseractEngine
+    from .tesseract_locator import configure_tesseract
+    from .backends import create_backend
+    from .config_stats import OCRConfigStats
+    from .ethnicity_matcher import EthnicityMatcher
+    from ..utils.metrics import PipelineMetrics, NULL_METRICS
+    from ..utils.duplicate_index import image_fingerprint, image_signature
+    from ..config.settings import (TESSERACT_CONFIG, TESSERACT_CONFIGS, ID_CARD_REGIONS, ALTERNATIVE_REGIONS, OCR_ENGINE,
+        SINGLE_PASS_OCR, SINGLE_PASS_OCR_CONFIG, SINGLE_PASS_MIN_CONFIDENCE,
+        TESSERACT_CONFIG_ORDER, EARLY_EXIT_MIN_CONFIDENCE, ETHNICITY_MATCH_MIN_SCORE, APP_VERSION,
+        OCR_BACKEND, OCR_DNN_MODEL_PATH, OCR_DNN_VOCABULARY_PATH, OCR_DNN_INPUT_SIZE, OCR_DNN_CHANNELS, OCR_BATCH_SIZE,
+        DEDUP_ENABLED, DEDUP_HASH_WIDTH, DEDUP_HASH_HEIGHT, TESSERACT_CACHE_PATH)
 except ImportError:
     try:
-        from src.ocr.preprocessor import ImagePreprocessor
-        from src.config.settings import TESSERACT_CONFIG, TESSERACT_CONFIGS, ID_CARD_REGIONS, ALTERNATIVE_REGIONS
+        from src.ocr.preprocessor import ImagePreprocessor, FULL_CARD_REGION
+        from src.ocr.engine import TesseractEngine
+        from src.ocr.tesseract_locator import configure_tesseract
+        from src.ocr.backends import create_backend
+        from src.ocr.config_stats import OCRConfigStats
+        from src.ocr.ethnicity_matcher import EthnicityMatcher
+        from src.utils.metrics import PipelineMetrics, NULL_METRICS
+        from src.utils.duplicate_index import image_fingerprint, image_signature
+        from src.config.settings import (TESSERACT_CONFIG, TESSERACT_CONFIGS, ID_CARD_REGIONS, ALTERNATIVE_REGIONS, OCR_ENGINE,
+            SINGLE_PASS_OCR, SINGLE_PASS_OCR_CONFIG, SINGLE_PASS_MIN_CONFIDENCE,
+            TESSERACT_CONFIG_ORDER, EARLY_EXIT_MIN_CONFIDENCE, ETHNICITY_MATCH_MIN_SCORE, APP_VERSION,
+            OCR_BACKEND, OCR_DNN_MODEL_PATH, OCR_DNN_VOCABULARY_PATH, OCR_DNN_INPUT_SIZE, OCR_DNN_CHANNELS, OCR_BATCH_SIZE,
+            DEDUP_ENABLED, DEDUP_HASH_WIDTH, DEDUP_HASH_HEIGHT, TESSERACT_CACHE_PATH)
     except ImportError:
         # 动态路径处理
         current_dir = os.path.dirname(__file__)
         parent_dir = os.path.dirname(current_dir)
         sys.path.insert(0, parent_dir)
         
-        from ocr.preprocessor import ImagePreprocessor
-        from config.settings import TESSERACT_CONFIG, TESSERACT_CONFIGS, ID_CARD_REGIONS, ALTERNATIVE_REGIONS
+        from ocr.preprocessor import ImagePreprocessor, FULL_CARD_REGION
+        from ocr.engine import TesseractEngine
+        from ocr.tesseract_locator import configure_tesseract
+        from ocr.backends import create_backend
+        from ocr.config_stats import OCRConfigStats
+        from ocr.ethnicity_matcher import EthnicityMatcher
+        from utils.metrics import PipelineMetrics, NULL_METRICS
+        from utils.duplicate_index import image_fingerprint, image_signature
+        from config.settings import (TESSERACT_CONFIG, TESSERACT_CONFIGS, ID_CARD_REGIONS, ALTERNATIVE_REGIONS, OCR_ENGINE,
+            SINGLE_PASS_OCR, SINGLE_PASS_OCR_CONFIG, SINGLE_PASS_MIN_CONFIDENCE,
+            TESSERACT_CONFIG_ORDER, EARLY_EXIT_MIN_CONFIDENCE, ETHNICITY_MATCH_MIN_SCORE, APP_VERSION,
+            OCR_BACKEND, OCR_DNN_MODEL_PATH, OCR_DNN_VOCABULARY_PATH, OCR_DNN_INPUT_SIZE, OCR_DNN_CHANNELS, OCR_BATCH_SIZE,
+            DEDUP_ENABLED, DEDUP_HASH_WIDTH, DEDUP_HASH_HEIGHT, TESSERACT_CACHE_PATH)
+
+
+logger = logging.getLogger('idcard_ocr.recognizer')
+
+
+# 常见民族名称映射（处理OCR识别错误）
+ETHNICITY_MAP = {
+    '汉': '汉族',
+    '蒙': '蒙古族',
+    '蒙古': '蒙古族',
+    '回': '回族',
+    '藏': '藏族',
+    '维': '维吾尔族',
+    '维吾尔': '维吾尔族',
+    '苗': '苗族',
+    '彝': '彝族',
+    '壮': '壮族',
+    '布依': '布依族',
+    '朝鲜': '朝鲜族',
+    '满': '满族',
+    '侗': '侗族',
+    '瑶': '瑶族',
+    '白': '白族',
+    '土家': '土家族',
+    '哈尼': '哈尼族',
+    '哈萨克': '哈萨克族',
+    '傣': '傣族',
+    '黎': '黎族',
+    '傈僳': '傈僳族',
+    '佤': '佤族',
+    '畲': '畲族',
+    '高山': '高山族',
+    '拉祜': '拉祜族',
+    '水': '水族',
+    '东乡': '东乡族',
+    '纳西': '纳西族',
+    '景颇': '景颇族',
+    '柯尔克孜': '柯尔克孜族',
+    '土': '土族',
+    '达斡尔': '达斡尔族',
+    '仫佬': '仫佬族',
+    '羌': '羌族',
+    '布朗': '布朗族',
+    '撒拉': '撒拉族',
+    '毛南': '毛南族',
+    '仡佬': '仡佬族',
+    '锡伯': '锡伯族',
+    '阿昌': '阿昌族',
+    '普米': '普米族',
+    '塔吉克': '塔吉克族',
+    '怒': '怒族',
+    '乌孜别克': '乌孜别克族',
+    '俄罗斯': '俄罗斯族',
+    '鄂温克': '鄂温克族',
+    '德昂': '德昂族',
+    '保安': '保安族',
+    '裕固': '裕固族',
+    '京': '京族',
+    '塔塔尔': '塔塔尔族',
+    '独龙': '独龙族',
+    '鄂伦春': '鄂伦春族',
+    '赫哲': '赫哲族',
+    '门巴': '门巴族',
+    '珞巴': '珞巴族',
+    '基诺': '基诺族'
+}
+
+# 56个民族的标准名称，用于校验识别结果
+ETHNICITY_NAMES = frozenset(ETHNICITY_MAP.values())
+
+# 民族名称匹配器（精确匹配 + 形近字模糊匹配），模块加载时构建一次
+ETHNICITY_MATCHER = EthnicityMatcher(ETHNICITY_MAP)
 
 
 class IDCardRecognizer:
     
-    def __init__(self):
-        self.preprocessor = ImagePreprocessor()
+    def __init__(self, profile=None):
+        """profile: 预处理档位（见PREPROCESS_PROFILES），None表示使用配置的默认档位"""
+        self.preprocessor = ImagePreprocessor(profile)
         self.setup_tesseract()
+        self.ocr_engine = TesseractEngine(OCR_ENGINE)
+        self.ocr_backend = self.create_ocr_backend(OCR_BACKEND)
+        
+        # 当前图片的耗时统计，由recognize / recognize_with_multiple_methods在每次调用开始时重置
+        self.metrics = NULL_METRICS
+        
+        # 批内近似重复图片索引（DuplicateIndex），由批量识别引擎顺序处理时在每批开始时设置，None表示不检测
+        self.duplicate_index = None
+        
+        # 各字段多配置OCR的命中率统计，决定配置的尝试顺序
+        config_order = [name for name in TESSERACT_CONFIG_ORDER if name in TESSERACT_CONFIGS]
+        config_order += [name for name in TESSERACT_CONFIGS if name not in config_order]
+        self.config_stats = {
+            'name': OCRConfigStats(config_order),
+            'ethnicity': OCRConfigStats(config_order)
+        }
+        
+    def create_ocr_backend(self, name):
+        """按名称创建OCR后端（tesseract后端复用self.ocr_engine）"""
+        if name == 'opencv_dnn':
+            return create_backend(name, model_path=OCR_DNN_MODEL_PATH, vocabulary_path=OCR_DNN_VOCABULARY_PATH,
+                                  input_size=OCR_DNN_INPUT_SIZE, channels=OCR_DNN_CHANNELS, batch_size=OCR_BATCH_SIZE)
+        return create_backend(name, self.ocr_engine)
         
     def setup_tesseract(self):
-        """设置Tesseract OCR"""
-        # 根据操作系统设置Tesseract路径
-        import platform
-        system = platform.system()
-        
-        if system == "Windows":
-            # Windows常见安装路径（包括chocolatey安装路径）
-            possible_paths = [
-                r"C:\ProgramData\chocolatey\lib\tesseract\tools\tesseract.exe",
-                r"C:\Program Files\Tesseract-OCR\tesseract.exe", 
-                r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-                r"C:\Users\%USERNAME%\AppData\Local\Tesseract-OCR\tesseract.exe"
-            ]
-            
-            for path in possible_paths:
-                expanded_path = os.path.expandvars(path)
-                if os.path.exists(expanded_path):
-                    pytesseract.pytesseract.tesseract_cmd = expanded_path
-                    print(f"找到Tesseract: {expanded_path}")
-                    break
-            else:
-                # 如果都找不到，尝试从PATH中查找
-                import shutil
-                tesseract_path = shutil.which("tesseract")
-                if tesseract_path:
-                    pytesseract.pytesseract.tesseract_cmd = tesseract_path
-                    print(f"从PATH找到Tesseract: {tesseract_path}")
-                else:
-                    print("警告：未找到Tesseract OCR，OCR功能可能无法工作")
-        
-        # 测试Tesseract是否可用
-        try:
-            pytesseract.get_tesseract_version()
-        except Exception as e:
-            print(f"警告：Tesseract OCR未正确安装或配置: {e}")
-            print("请确保已安装Tesseract OCR并正确配置路径")
-            
-    def recognize(self, image_path, debug=False):
-        """识别身份证信息"""
+        """设置Tesseract OCR（查找结果缓存在TESSERACT_CACHE_PATH，之后的启动和工作进程不再重复查找）"""
+        self.tesseract_info = configure_tesseract(TESSERACT_CACHE_PATH)
+        if self.tesseract_info is None:
+            logger.warning("未找到可用的Tesseract OCR，OCR功能可能无法工作")
+            logger.warning("请确保已安装Tesseract OCR并正确配置路径")
+            
+    def recognize(self, image_path, debug=False, image_data=None):
+        """识别身份证信息（image_data为可选的已读入的文件内容）"""
+        self.metrics = PipelineMetrics()
         try:
-            print(f"[DEBUG] 开始识别图像: {image_path}")
+            logger.debug("开始识别图像: %s", image_path)
             
             # 预处理图像
-            processed_image = self.preprocessor.preprocess_for_ocr(image_path)
-            print(f"[DEBUG] 预处理完成，图像尺寸: {processed_image.shape}")
+            processed_image = self.preprocessor.preprocess_for_ocr(image_path, self.metrics, image_data)
+            logger.debug("预处理完成，图像尺寸: %s", processed_image.shape)
             
-            # 保存调试图像
-            if debug:
-                import os
-                debug_dir = os.path.join(os.path.dirname(image_path), 'debug')
-                if not os.path.exists(debug_dir):
-                    os.makedirs(debug_dir)
-                    
-                base_name = os.path.splitext(os.path.basename(image_path))[0]
-                processed_path = os.path.join(debug_dir, f"{base_name}_processed.jpg")
-                cv2.imwrite(processed_path, processed_image)
-                print(f"[DEBUG] 预处理图像保存至: {processed_path}")
-            
-            # 提取文字区域
-            regions = self.preprocessor.extract_text_regions(processed_image, ID_CARD_REGIONS)
-            print(f"[DEBUG] 提取到 {len(regions)} 个文字区域")
-            
-            # 保存区域调试图像
+            # 本批已识别过近似重复的图片时直接复用其结果
+            image_hash, duplicate = self.check_duplicate(image_path, processed_image, debug)
+            if duplicate is not None:
+                return duplicate
+            
+            # 单次整卡OCR，得到带位置的词
+            words = self.get_card_words(processed_image) if SINGLE_PASS_OCR else None
+            
+            # 各字段在recognize_field中按需从原图矫正提取，这里只在调试时提取区域图像并记录原始文本
             if debug:
-                for region_name, region_image in regions.items():
-                    region_path = os.path.join(debug_dir, f"{base_name}_{region_name}_region.jpg")
-                    cv2.imwrite(region_path, region_image)
-                    print(f"[DEBUG] {region_name}区域保存至: {region_path}")
+                debug_info = self.save_debug_images(image_path, processed_image, words)
             
-            # 识别姓名
-            name = ""
-            name_raw_text = ""
-            if 'name' in regions:
-                name_raw_text = self.get_raw_ocr_text(regions['name'])
-                print(f"[DEBUG] 姓名区域OCR原始文本: '{name_raw_text}'")
-                name = self.recognize_name(regions['name'])
-                print(f"[DEBUG] 姓名清理后结果: '{name}'")
-                
-            # 识别民族
-            ethnicity = ""
-            ethnicity_raw_text = ""
-            if 'ethnicity' in regions:
-                ethnicity_raw_text = self.get_raw_ocr_text(regions['ethnicity'])
-                print(f"[DEBUG] 民族区域OCR原始文本: '{ethnicity_raw_text}'")
-                ethnicity = self.recognize_ethnicity(regions['ethnicity'])
-                print(f"[DEBUG] 民族清理后结果: '{ethnicity}'")
+            name, _ = self.recognize_field('name', processed_image, ID_CARD_REGIONS['name'], words)
+            logger.debug("姓名清理后结果: '%s'", name)
+            
+            ethnicity, _ = self.recognize_field('ethnicity', processed_image, ID_CARD_REGIONS['ethnicity'], words)
+            logger.debug("民族清理后结果: '%s'", ethnicity)
             
             result = {
                 'success': True,
                 'name': name,
-                'ethnicity': ethnicity
+                'ethnicity': ethnicity,
+                'metrics': self.metrics.to_dict()
             }
             
             # 添加调试信息
             if debug:
-                result['debug'] = {
-                    'name_raw_text': name_raw_text,
-                    'ethnicity_raw_text': ethnicity_raw_text,
-                    'image_shape': processed_image.shape,
-                    'regions_extracted': list(regions.keys())
-                }
-            
-            print(f"[DEBUG] 最终识别结果: 姓名='{name}', 民族='{ethnicity}'")
+                result['debug'] = debug_info
+            
+            logger.debug("最终识别结果: 姓名='%s', 民族='%s'", name, ethnicity)
+            self.attach_image_hash(result, image_hash)
             return result
             
         except Exception as e:
-            print(f"[DEBUG] 识别过程出错: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("识别过程出错: %s", e)
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'metrics': self.metrics.to_dict()
             }
             
+    def check_duplicate(self, image_path, processed_image, debug=False):
+        """
+        批内近似重复检测（未设置duplicate_index或调试模式下不检测）
+
+        返回(图像哈希, 近似重复结果)。图片与本批先登记的图片近似重复（区域哈希相近且文字像素一致）时不再做OCR，
+        近似重复结果只带duplicate_of，姓名、民族由批量识别引擎从原图的结果中复制；
+        否则登记这张图片，近似重复结果为None。
+        """
+        if self.duplicate_index is None or debug:
+            return None, None
+            
+        image_hash = self.compute_image_hash(processed_image)
+        signature = self.compute_image_signature(processed_image)
+        original_path = self.duplicate_index.claim(image_hash, image_path, signature)
+        if original_path is None:
+            return image_hash, None
+            
+        logger.debug("%s 与 %s 近似重复，跳过OCR", image_path, original_path)
+        self.metrics.increment('duplicates')
+        result = {
+            'success': True,
+            'name': "",
+            'ethnicity': "",
+            'duplicate_of': original_path,
+            'metrics': self.metrics.to_dict()
+        }
+        self.attach_image_hash(result, image_hash)
+        return image_hash, result
+        
+    def compute_image_hash(self, processed_image):
+        """计算矫正后图像的姓名、民族区域哈希（用于近似重复检测）"""
+        with self.metrics.stage('image_hash'):
+            return image_fingerprint(processed_image.image, ID_CARD_REGIONS, DEDUP_HASH_WIDTH, DEDUP_HASH_HEIGHT)
+            
+    def compute_image_signature(self, processed_image):
+        """提取识别尺寸的姓名、民族区域，计算用于确认近似重复的文字像素掩码"""
+        with self.metrics.stage('image_hash'):
+            return image_signature(self.preprocessor.extract_text_regions(processed_image, ID_CARD_REGIONS))
+            
+    def attach_image_hash(self, result, image_hash):
+        if image_hash is not None:
+            result['image_hash'] = format(image_hash, 'x')
+            
     def get_raw_ocr_text(self, region_image, config_name='default'):
         """获取原始OCR文本，用于调试"""
         try:
@@ -157,70 +274,237 @@ class IDCardRecognizer:
             else:
                 config = TESSERACT_CONFIG + " -l chi_sim"
                 
-            text = pytesseract.image_to_string(region_image, config=config)
+            with self.metrics.ocr_call(config_name):
+                text = self.ocr_backend.recognize(region_image, config).text
             return text.strip()
         except Exception as e:
-            print(f"OCR识别失败: {e}")
+            logger.warning("OCR识别失败: %s", e)
             return ""
     
+    def get_card_words(self, processed_image):
+        """对整张矫正后的卡片运行一次OCR，返回带相对中心坐标的词列表（后端不支持词框时返回None）"""
+        if not self.ocr_backend.supports_words:
+            return None
+            
+        try:
+            with self.metrics.stage('extract_text_regions'):
+                card = self.preprocessor.extract_text_regions(processed_image, {'card': FULL_CARD_REGION})['card']
+            config = TESSERACT_CONFIGS[SINGLE_PASS_OCR_CONFIG] + " -l chi_sim"
+            with self.metrics.ocr_call('single_pass'):
+                words = self.ocr_backend.image_to_data(card, config)
+        except Exception as e:
+            logger.warning("整卡OCR失败，回退到逐区域识别: %s", e)
+            return None
+            
+        h, w = card.shape[:2]
+        for word in words:
+            word['cx'] = (word['left'] + word['width'] / 2) / w
+            word['cy'] = (word['top'] + word['height'] / 2) / h
+        return words
+        
+    def save_debug_images(self, image_path, processed_image, words):
+        """保存预处理图像和各区域图像，返回调试信息（含各区域的OCR原始文本）"""
+        debug_dir = os.path.join(os.path.dirname(image_path), 'debug')
+        os.makedirs(debug_dir, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        
+        processed_path = os.path.join(debug_dir, f"{base_name}_processed.jpg")
+        cv2.imwrite(processed_path, processed_image.image)
+        logger.debug("预处理图像保存至: %s", processed_path)
+        
+        regions = self.preprocessor.extract_text_regions(processed_image, ID_CARD_REGIONS)
+        logger.debug("提取到 %s 个文字区域", len(regions))
+        
+        debug_info = {
+            'image_shape': processed_image.shape,
+            'regions_extracted': list(regions.keys())
+        }
+        for region_name, region_image in regions.items():
+            region_path = os.path.join(debug_dir, f"{base_name}_{region_name}_region.jpg")
+            cv2.imwrite(region_path, region_image)
+            logger.debug("%s区域保存至: %s", region_name, region_path)
+            
+            if words is not None:
+                raw_text, _ = self.get_region_words_text(words, ID_CARD_REGIONS[region_name])
+            else:
+                raw_text = self.get_raw_ocr_text(region_image)
+            logger.debug("%s区域OCR原始文本: '%s'", region_name, raw_text)
+            debug_info[f"{region_name}_raw_text"] = raw_text
+        return debug_info
+        
+    def get_region_words_text(self, words, region_config):
+        """收集中心点落在区域内的词，返回(拼接文本, 平均置信度)"""
+        x1 = region_config['x']
+        y1 = region_config['y']
+        x2 = x1 + region_config['width']
+        y2 = y1 + region_config['height']
+        
+        selected = [word for word in words
+                    if x1 <= word['cx'] < x2 and y1 <= word['cy'] < y2]
+        if not selected:
+            return "", 0.0
+            
+        text = ''.join(word['text'] for word in selected)
+        confidence = sum(word['conf'] for word in selected) / len(selected)
+        return text, confidence
+        
+    def recognize_field(self, field_name, processed_image, region_config, words=None):
+        """
+        识别单个字段：优先使用整卡OCR的词框结果，置信度不足时回退到逐区域多配置OCR
+
+        返回(识别结果, 结果来源)，来源为'single_pass'或采用的OCR配置名
+        """
+        if field_name == 'name':
+            clean_text, validate, confident = self.clean_name_text, self.is_valid_name, None
+        else:
+            clean_text, validate, confident = self.clean_ethnicity_text, self.is_valid_ethnicity, self.is_confident_ethnicity
+            
+        if words is not None:
+            raw_text, confidence = self.get_region_words_text(words, region_config)
+            cleaned = clean_text(raw_text)
+            if cleaned and validate(cleaned) and (confidence >= SINGLE_PASS_MIN_CONFIDENCE or
+                                                  (confident is not None and confident(raw_text))):
+                logger.debug("%s使用整卡OCR结果: '%s' (置信度 %.0f)", field_name, cleaned, confidence)
+                return cleaned, 'single_pass'
+            self.metrics.increment('single_pass_fallbacks')
+                
+        with self.metrics.stage('extract_text_regions'):
+            regions = self.preprocessor.extract_text_regions(processed_image, {field_name: region_config})
+        return self.run_ocr_cascade(regions[field_name], clean_text, validate, self.config_stats[field_name], confident)
+        
     def get_multiple_ocr_attempts(self, region_image):
         """使用多种OCR配置尝试识别"""
         results = {}
         
+        if not self.ocr_backend.uses_config:
+            results[self.ocr_backend.name] = self.ocr_backend.recognize(region_image).text.strip()
+            return results
+            
         for config_name in TESSERACT_CONFIGS:
             try:
                 config = TESSERACT_CONFIGS[config_name] + " -l chi_sim"
-                text = pytesseract.image_to_string(region_image, config=config)
+                text = self.ocr_backend.recognize(region_image, config).text
                 results[config_name] = text.strip()
             except Exception as e:
                 results[config_name] = f"Error: {str(e)}"
                 
         return results
+        
+    def run_ocr_cascade(self, region_image, clean_text, validate, stats, confident=None):
+        """
+        按历史命中率依次尝试多种OCR配置，返回(最佳清理结果, 采用的配置名)
+
+        某个配置的结果置信度足够高且清理后通过校验时立即返回，不再尝试其余配置；
+        confident为可选的判断函数（参数为OCR原始文本），返回True时即使OCR置信度不足也立即返回。
+        否则与原来一样选择清理后最长的结果。
+        """
+        if not self.ocr_backend.uses_config:
+            # 后端不使用Tesseract配置，只需识别一次
+            with self.metrics.ocr_call(self.ocr_backend.name):
+                text = self.ocr_backend.recognize(region_image).text
+            cleaned = clean_text(text.strip())
+            return cleaned, self.ocr_backend.name if cleaned else None
+            
+        best_text = ""
+        best_config = None
+        
+        for config_name in stats.ordered():
+            stats.record_attempt(config_name)
+            try:
+                config = TESSERACT_CONFIGS[config_name] + " -l chi_sim"
+                with self.metrics.ocr_call(config_name):
+                    text, confidence = self.ocr_backend.recognize(region_image, config)
+            except Exception as e:
+                logger.debug("%s配置OCR失败: %s", config_name, e)
+                continue
+                
+            cleaned = clean_text(text.strip())
+            if not cleaned:
+                continue
+                
+            if validate(cleaned) and (confidence >= EARLY_EXIT_MIN_CONFIDENCE or
+                                      (confident is not None and confident(text))):
+                logger.debug("%s配置结果可信，提前结束: '%s' (置信度 %.0f)", config_name, cleaned, confidence)
+                stats.record_hit(config_name, early_exit=True)
+                self.metrics.increment('early_exits')
+                return cleaned, config_name
+                
+            if len(cleaned) >= len(best_text):
+                best_text = cleaned
+                best_config = config_name
+                logger.debug("选择%s配置的结果: '%s'", config_name, cleaned)
+                
+        if best_config is not None:
+            stats.record_hit(best_config)
+        return best_text, best_config
+        
+    def is_valid_name(self, name):
+        """校验姓名：2-6个汉字"""
+        return re.fullmatch(r'[\u4e00-\u9fff]{2,6}', name) is not None
+        
+    def is_valid_ethnicity(self, ethnicity):
+        """校验民族：必须是56个民族之一"""
+        return ethnicity in ETHNICITY_NAMES
+        
+    def is_confident_ethnicity(self, text):
+        """OCR原始文本能否以足够高的分数匹配到民族词典（可信时不再尝试其余OCR配置）"""
+        match = self.match_ethnicity(text)
+        return match is not None and match.score >= ETHNICITY_MATCH_MIN_SCORE
+        
+    def get_pipeline_fingerprint(self):
+        """
+        计算识别流水线指纹
+
+        OCR配置、区域坐标、预处理参数等任何一项变化都会得到不同的指纹，用于结果缓存失效
+        """
+        pipeline = {
+            'app_version': APP_VERSION,
+            'tesseract_config': TESSERACT_CONFIG,
+            'tesseract_configs': TESSERACT_CONFIGS,
+            'tesseract_config_order': TESSERACT_CONFIG_ORDER,
+            'early_exit_min_confidence': EARLY_EXIT_MIN_CONFIDENCE,
+            'id_card_regions': ID_CARD_REGIONS,
+            'alternative_regions': ALTERNATIVE_REGIONS,
+            'single_pass': [SINGLE_PASS_OCR, SINGLE_PASS_OCR_CONFIG, SINGLE_PASS_MIN_CONFIDENCE],
+            'ocr_backend': self.ocr_backend.get_parameters(),
+            'dedup': [DEDUP_ENABLED, DEDUP_HASH_WIDTH, DEDUP_HASH_HEIGHT],
+            'ethnicity_matcher': [ETHNICITY_MATCHER.get_parameters(), ETHNICITY_MATCH_MIN_SCORE],
+            'preprocessor': self.preprocessor.get_parameters()
+        }
+        encoded = json.dumps(pipeline, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+        
+    def get_config_stats(self):
+        """按字段获取各OCR配置的尝试次数、命中次数、提前结束次数和命中率"""
+        return {field_name: stats.to_dict() for field_name, stats in self.config_stats.items()}
+
+    def take_config_stats(self):
+        """按字段获取自上次调用以来新增的OCR配置统计（见OCRConfigStats.take_delta），只包含有新增的字段"""
+        deltas = {field_name: stats.take_delta() for field_name, stats in self.config_stats.items()}
+        return {field_name: delta for field_name, delta in deltas.items() if delta}
     
     def recognize_name(self, name_region):
         """识别姓名 - 使用多种OCR配置尝试"""
         try:
-            # 尝试多种OCR配置
-            ocr_results = self.get_multiple_ocr_attempts(name_region)
-            print(f"[DEBUG] 姓名多种OCR结果: {ocr_results}")
-            
-            # 选择最佳OCR结果
-            best_text = ""
-            for config_name, text in ocr_results.items():
-                if text and not text.startswith("Error:"):
-                    cleaned = self.clean_name_text(text)
-                    if cleaned and len(cleaned) >= len(best_text):
-                        best_text = cleaned
-                        print(f"[DEBUG] 选择{config_name}配置的结果: '{cleaned}'")
-            
-            print(f"[DEBUG] 姓名最终结果: '{best_text}'")
+            best_text, _ = self.run_ocr_cascade(name_region, self.clean_name_text, self.is_valid_name,
+                                            self.config_stats['name'])
+            logger.debug("姓名最终结果: '%s'", best_text)
             return best_text
             
         except Exception as e:
-            print(f"姓名识别失败: {e}")
+            logger.warning("姓名识别失败: %s", e)
             return ""
             
     def recognize_ethnicity(self, ethnicity_region):
         """识别民族 - 使用多种OCR配置尝试"""
         try:
-            # 尝试多种OCR配置
-            ocr_results = self.get_multiple_ocr_attempts(ethnicity_region)
-            print(f"[DEBUG] 民族多种OCR结果: {ocr_results}")
-            
-            # 选择最佳OCR结果
-            best_text = ""
-            for config_name, text in ocr_results.items():
-                if text and not text.startswith("Error:"):
-                    cleaned = self.clean_ethnicity_text(text)
-                    if cleaned and (not best_text or len(cleaned) >= len(best_text)):
-                        best_text = cleaned
-                        print(f"[DEBUG] 选择{config_name}配置的结果: '{cleaned}'")
-            
-            print(f"[DEBUG] 民族最终结果: '{best_text}'")
+            best_text, _ = self.run_ocr_cascade(ethnicity_region, self.clean_ethnicity_text, self.is_valid_ethnicity,
+                                            self.config_stats['ethnicity'], self.is_confident_ethnicity)
+            logger.debug("民族最终结果: '%s'", best_text)
             return best_text
             
         except Exception as e:
-            print(f"民族识别失败: {e}")
+            logger.warning("民族识别失败: %s", e)
             return ""
             
     def clean_name_text(self, text):
@@ -228,18 +512,18 @@ class IDCardRecognizer:
         if not text:
             return ""
             
-        print(f"[DEBUG] 姓名清理前: '{text}'")
+        logger.debug("姓名清理前: '%s'", text)
         
         # 移除空白字符
         text = text.strip()
-        print(f"[DEBUG] 去除空白后: '{text}'")
+        logger.debug("去除空白后: '%s'", text)
         
         # 保存原始文本用于备选方案
         original_text = text
         
         # 移除非中文字符，但保留英文字母（少数民族姓名可能包含）
         text = re.sub(r'[^\u4e00-\u9fff\u3400-\u4dbf\uf900-\ufaff\u0041-\u005a\u0061-\u007a]', '', text)
-        print(f"[DEBUG] 保留中英文后: '{text}'")
+        logger.debug("保留中英文后: '%s'", text)
         
         # 移除常见的OCR误识别标签，但更保守
         if '姓名' in text:
@@ -249,7 +533,7 @@ class IDCardRecognizer:
         if text.startswith('姓') and len(text) > 1:
             text = text[1:]
         
-        print(f"[DEBUG] 移除标签后: '{text}'")
+        logger.debug("移除标签后: '%s'", text)
         
         # 如果清理后为空，尝试从原始文本中提取
         if not text.strip():
@@ -258,33 +542,30 @@ class IDCardRecognizer:
             if chinese_matches:
                 # 选择最长的中文字符串
                 text = max(chinese_matches, key=len)
-                print(f"[DEBUG] 从原始文本提取: '{text}'")
+                logger.debug("从原始文本提取: '%s'", text)
         
         # 限制长度（中文姓名一般不超过6个字）
         if len(text) > 8:
             text = text[:8]
             
         result = text.strip()
-        print(f"[DEBUG] 姓名最终结果: '{result}'")
+        logger.debug("姓名最终结果: '%s'", result)
         return result
         
-    def clean_ethnicity_text(self, text):
-        """清理民族文本"""
-        if not text:
-            return ""
-            
-        print(f"[DEBUG] 民族清理前: '{text}'")
+    def normalize_ethnicity_text(self, text):
+        """去除空白、非中文字符和"民族"标签，得到用于匹配的文本"""
+        logger.debug("民族清理前: '%s'", text)
         
         # 移除空白字符
         text = text.strip()
-        print(f"[DEBUG] 去除空白后: '{text}'")
+        logger.debug("去除空白后: '%s'", text)
         
         # 保存原始文本
         original_text = text
         
         # 移除非中文字符
         text = re.sub(r'[^\u4e00-\u9fff\u3400-\u4dbf\uf900-\ufaff]', '', text)
-        print(f"[DEBUG] 保留中文后: '{text}'")
+        logger.debug("保留中文后: '%s'", text)
         
         # 更保守地移除标签
         if '民族' in text:
@@ -293,81 +574,34 @@ class IDCardRecognizer:
         if text.startswith('民') and len(text) > 1 and not text.endswith('族'):
             text = text[1:]
         
-        print(f"[DEBUG] 移除标签后: '{text}'")
+        logger.debug("移除标签后: '%s'", text)
         
         # 如果清理后为空，尝试从原始文本中提取
         if not text.strip():
             chinese_matches = re.findall(r'[\u4e00-\u9fff]+', original_text)
             if chinese_matches:
                 text = max(chinese_matches, key=len)
-                print(f"[DEBUG] 从原始文本提取: '{text}'")
-        
-        # 常见民族名称映射（处理OCR识别错误）
-        ethnicity_map = {
-            '汉': '汉族',
-            '蒙': '蒙古族',
-            '蒙古': '蒙古族',
-            '回': '回族',
-            '藏': '藏族',
-            '维': '维吾尔族',
-            '维吾尔': '维吾尔族',
-            '苗': '苗族',
-            '彝': '彝族',
-            '壮': '壮族',
-            '布依': '布依族',
-            '朝鲜': '朝鲜族',
-            '满': '满族',
-            '侗': '侗族',
-            '瑶': '瑶族',
-            '白': '白族',
-            '土家': '土家族',
-            '哈尼': '哈尼族',
-            '哈萨克': '哈萨克族',
-            '傣': '傣族',
-            '黎': '黎族',
-            '傈僳': '傈僳族',
-            '佤': '佤族',
-            '畲': '畲族',
-            '高山': '高山族',
-            '拉祜': '拉祜族',
-            '水': '水族',
-            '东乡': '东乡族',
-            '纳西': '纳西族',
-            '景颇': '景颇族',
-            '柯尔克孜': '柯尔克孜族',
-            '土': '土族',
-            '达斡尔': '达斡尔族',
-            '仫佬': '仫佬族',
-            '羌': '羌族',
-            '布朗': '布朗族',
-            '撒拉': '撒拉族',
-            '毛南': '毛南族',
-            '仡佬': '仡佬族',
-            '锡伯': '锡伯族',
-            '阿昌': '阿昌族',
-            '普米': '普米族',
-            '塔吉克': '塔吉克族',
-            '怒': '怒族',
-            '乌孜别克': '乌孜别克族',
-            '俄罗斯': '俄罗斯族',
-            '鄂温克': '鄂温克族',
-            '德昂': '德昂族',
-            '保安': '保安族',
-            '裕固': '裕固族',
-            '京': '京族',
-            '塔塔尔': '塔塔尔族',
-            '独龙': '独龙族',
-            '鄂伦春': '鄂伦春族',
-            '赫哲': '赫哲族',
-            '门巴': '门巴族',
-            '珞巴': '珞巴族',
-            '基诺': '基诺族'
-        }
+                logger.debug("从原始文本提取: '%s'", text)
+        return text
+        
+    def match_ethnicity(self, text):
+        """把OCR原始文本匹配到民族词典，返回EthnicityMatch（见ethnicity_matcher），无法匹配时返回None"""
+        if not text:
+            return None
+        return ETHNICITY_MATCHER.match(self.normalize_ethnicity_text(text))
         
-        # 尝试匹配民族名称
-        for key, value in ethnicity_map.items():
-            if key in text:
-                return value
+    def clean_ethnicity_text(self, text):
+        """清理民族文本"""
+        if not text:
+            return ""
+            
+        text = self.normalize_ethnicity_text(text)
+        
+        # 匹配民族名称（最长精确匹配，其次形近字模糊匹配）
+        match = ETHNICITY_MATCHER.match(text)
+        if match is not None:
+            logger.debug("民族匹配: '%s' -> '%s' (%s, 分数 %.2f)", text, match.name, match.method, match.score)
+            return match.name
                 
         # 如果没有匹配到，检查是否已经是完整的民族名称
         if text.endswith('族'):
@@ -378,69 +612,125 @@ class IDCardRecognizer:
             
         return text.strip()
         
-    def recognize_with_multiple_methods(self, image_path, debug=False):
-        """使用多种方法进行识别以提高准确率"""
+    def prepare_image(self, image_path, image_data=None):
+        """
+        加载并矫正图像（分阶段流水线的预处理阶段），返回矫正后的图像
+
+        本张图片的耗时统计从这里重新开始，之后可在另一个进程中调用recognize_prepared完成OCR
+        """
+        self.metrics = PipelineMetrics()
+        return self.preprocessor.preprocess_for_ocr(image_path, self.metrics, image_data)
+        
+    def recognize_prepared(self, processed_image, method='multiple', debug=False, reset_metrics=False):
+        """
+        在已矫正的图像上完成OCR，返回不含metrics的识别结果
+
+        method: 'multiple'依次尝试各区域配置并选择最佳结果，'single'只使用默认区域配置
+        reset_metrics: 单独运行OCR阶段时（如流水线的OCR工作进程）重新开始统计
+        """
+        if reset_metrics:
+            self.metrics = PipelineMetrics()
+            
+        # 整卡OCR只做一次，词框结果对所有区域配置通用
+        words = self.get_card_words(processed_image) if SINGLE_PASS_OCR else None
+        
+        # 方法1：使用默认区域配置
         results = []
+        result1 = self.recognize_processed_image(processed_image, ID_CARD_REGIONS, words)
+        results.append(('default', result1))
+        logger.debug("默认区域结果: 姓名='%s', 民族='%s'", result1.get('name', ''), result1.get('ethnicity', ''))
+        if method == 'single':
+            return result1
+        
+        # 如果默认结果不好，依次尝试所有备用区域配置
+        if not result1.get('success') or (not result1.get('name') and not result1.get('ethnicity')):
+            for variant_name, variant_regions in ALTERNATIVE_REGIONS.items():
+                self.metrics.increment('region_variants')
+                variant_result = self.recognize_processed_image(processed_image, variant_regions, words)
+                results.append((variant_name, variant_result))
+                logger.debug("备用区域%s结果: 姓名='%s', 民族='%s'", variant_name, variant_result.get('name', ''), variant_result.get('ethnicity', ''))
+                # 姓名有效且民族已匹配到词典时即为最终结果（select_best_result同样会选中它），不再尝试其余区域配置
+                if variant_result.get('success') and self.is_valid_name(variant_result.get('name', '')) and \
+                        self.is_valid_ethnicity(variant_result.get('ethnicity', '')):
+                    break
         
+        # 选择最佳结果
+        best_result = self.select_best_result([r[1] for r in results])
+        
+        # 添加调试信息
+        if debug:
+            best_result['debug_attempts'] = [{'method': method, 'name': r.get('name', ''), 'ethnicity': r.get('ethnicity', '')} for method, r in results]
+        return best_result
+        
+    def recognize_with_multiple_methods(self, image_path, debug=False, image_data=None):
+        """使用多种方法进行识别以提高准确率（image_data为可选的已读入的文件内容）"""
         try:
-            print(f"[DEBUG] 开始多种方法识别: {image_path}")
-            
-            # 方法1：使用默认区域配置
-            result1 = self.recognize_with_regions(image_path, ID_CARD_REGIONS, debug)
-            results.append(('default', result1))
-            print(f"[DEBUG] 默认区域结果: 姓名='{result1.get('name', '')}', 民族='{result1.get('ethnicity', '')}")
-            
-            # 如果默认结果不好，尝试其他区域配置
-            if not result1.get('success') or (not result1.get('name') and not result1.get('ethnicity')):
-                # 方法2：使用备用区域配置1
-                result2 = self.recognize_with_regions(image_path, ALTERNATIVE_REGIONS['variant1'], debug)
-                results.append(('variant1', result2))
-                print(f"[DEBUG] 备用区域1结果: 姓名='{result2.get('name', '')}', 民族='{result2.get('ethnicity', '')}")
-                
-                # 方法3：使用备用区域配置2
-                result3 = self.recognize_with_regions(image_path, ALTERNATIVE_REGIONS['variant2'], debug)
-                results.append(('variant2', result3))
-                print(f"[DEBUG] 备用区域2结果: 姓名='{result3.get('name', '')}', 民族='{result3.get('ethnicity', '')}")
+            logger.debug("开始多种方法识别: %s", image_path)
             
-            # 选择最佳结果
-            best_result = self.select_best_result([r[1] for r in results])
+            # 只加载并矫正一次图像，所有区域配置共用同一份矫正结果
+            processed_image = self.prepare_image(image_path, image_data)
             
-            # 添加调试信息
-            if debug:
-                best_result['debug_attempts'] = [{'method': method, 'name': r.get('name', ''), 'ethnicity': r.get('ethnicity', '')} for method, r in results]
+            image_hash, duplicate = self.check_duplicate(image_path, processed_image, debug)
+            if duplicate is not None:
+                return duplicate
             
+            best_result = self.recognize_prepared(processed_image, 'multiple', debug)
+            best_result['metrics'] = self.metrics.to_dict()
+            self.attach_image_hash(best_result, image_hash)
             return best_result
             
         except Exception as e:
-            print(f"[DEBUG] 多种方法识别失败: {str(e)}")
+            logger.error("多种方法识别失败: %s", e)
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'metrics': self.metrics.to_dict()
             }
             
-    def recognize_with_regions(self, image_path, regions_config, debug=False):
-        """使用指定的区域配置进行识别"""
+    def recognize_with_regions(self, image_path, regions_config, debug=False, image_data=None):
+        """使用指定的区域配置进行识别（image_data为可选的已读入的文件内容）"""
+        self.metrics = PipelineMetrics()
         try:
             # 预处理图像
-            processed_image = self.preprocessor.preprocess_for_ocr(image_path)
+            processed_image = self.preprocessor.preprocess_for_ocr(image_path, self.metrics, image_data)
             
-            # 提取文字区域
-            regions = self.preprocessor.extract_text_regions(processed_image, regions_config)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'metrics': self.metrics.to_dict()
+            }
+            
+        result = self.recognize_processed_image(processed_image, regions_config)
+        result['metrics'] = self.metrics.to_dict()
+        return result
+        
+    def recognize_processed_image(self, processed_image, regions_config, words=None):
+        """
+        在已矫正的图像上使用指定的区域配置进行识别
+
+        words: 可选的整卡OCR词框结果（见get_card_words），置信度足够时直接使用
+        """
+        if words is None and not self.ocr_backend.uses_config:
+            return self.recognize_regions_batch(processed_image, regions_config)
             
+        try:
             # 识别姓名和民族
             name = ""
             ethnicity = ""
+            ocr_sources = {}
             
-            if 'name' in regions:
-                name = self.recognize_name(regions['name'])
+            if 'name' in regions_config:
+                name, ocr_sources['name'] = self.recognize_field('name', processed_image, regions_config['name'], words)
                 
-            if 'ethnicity' in regions:
-                ethnicity = self.recognize_ethnicity(regions['ethnicity'])
+            if 'ethnicity' in regions_config:
+                ethnicity, ocr_sources['ethnicity'] = self.recognize_field('ethnicity', processed_image, regions_config['ethnicity'], words)
             
             return {
                 'success': True,
                 'name': name,
-                'ethnicity': ethnicity
+                'ethnicity': ethnicity,
+                'ocr_sources': ocr_sources
             }
             
         except Exception as e:
@@ -449,6 +739,94 @@ class IDCardRecognizer:
                 'error': str(e)
             }
             
+    def recognize_regions_batch(self, processed_image, regions_config):
+        """把姓名、民族区域一次交给OCR后端批量识别（用于不使用Tesseract配置的后端）"""
+        try:
+            fields = [field_name for field_name in ('name', 'ethnicity') if field_name in regions_config]
+            with self.metrics.stage('extract_text_regions'):
+                regions = self.preprocessor.extract_text_regions(
+                    processed_image, {field_name: regions_config[field_name] for field_name in fields})
+            with self.metrics.ocr_call(self.ocr_backend.name):
+                texts = self.ocr_backend.recognize_batch([regions[field_name] for field_name in fields])
+                
+            result = {'success': True, 'name': "", 'ethnicity': "", 'ocr_sources': {}}
+            for field_name, ocr_result in zip(fields, texts):
+                clean_text = self.clean_name_text if field_name == 'name' else self.clean_ethnicity_text
+                result[field_name] = clean_text(ocr_result.text.strip())
+                result['ocr_sources'][field_name] = self.ocr_backend.name
+            return result
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def recognize_images(self, images, method='multiple'):
+        """
+        识别一组已读入内存的图片，返回同样顺序的识别结果列表
+
+        images: [(标签, 文件内容), ...]，标签仅用于日志（如上传的文件名）
+        method: 'multiple'或'single'，含义同批量识别引擎
+        不使用Tesseract配置的后端把所有图片的姓名、民族区域合并为一次批量识别；
+        批量识别的耗时计入第一张图片的统计。Tesseract后端逐张识别。
+        """
+        if self.ocr_backend.uses_config:
+            recognize = self.recognize if method == 'single' else self.recognize_with_multiple_methods
+            return [recognize(label, image_data=image_data) for label, image_data in images]
+
+        results = [None] * len(images)
+        prepared = []
+        for index, (label, image_data) in enumerate(images):
+            self.metrics = PipelineMetrics()
+            try:
+                processed_image = self.preprocessor.preprocess_for_ocr(label, self.metrics, image_data)
+                with self.metrics.stage('extract_text_regions'):
+                    regions = self.preprocessor.extract_text_regions(processed_image, ID_CARD_REGIONS)
+            except Exception as e:
+                logger.warning("预处理失败 %s: %s", label, e)
+                results[index] = {'success': False, 'error': str(e), 'metrics': self.metrics.to_dict()}
+                continue
+            fields = [field_name for field_name in ('name', 'ethnicity') if field_name in regions]
+            prepared.append((index, processed_image, fields, regions, self.metrics))
+
+        crops = [regions[field_name] for _, _, fields, regions, _ in prepared for field_name in fields]
+        if crops:
+            batch_metrics = prepared[0][4]
+            try:
+                with batch_metrics.ocr_call(self.ocr_backend.name):
+                    texts = iter(self.ocr_backend.recognize_batch(crops))
+            except Exception as e:
+                logger.error("批量OCR失败: %s", e)
+                for index, _, _, _, metrics in prepared:
+                    results[index] = {'success': False, 'error': str(e), 'metrics': metrics.to_dict()}
+                return results
+            batch_metrics.increment('batched_images', len(prepared))
+
+        for index, processed_image, fields, _, metrics in prepared:
+            result = {'success': True, 'name': "", 'ethnicity': "", 'ocr_sources': {}}
+            for field_name in fields:
+                clean_text = self.clean_name_text if field_name == 'name' else self.clean_ethnicity_text
+                result[field_name] = clean_text(next(texts).text.strip())
+                result['ocr_sources'][field_name] = self.ocr_backend.name
+
+            # 默认区域没有结果时，与recognize_with_multiple_methods一样逐个尝试备用区域配置
+            if method == 'multiple' and not result['name'] and not result['ethnicity']:
+                self.metrics = metrics
+                candidates = [result]
+                for variant_regions in ALTERNATIVE_REGIONS.values():
+                    metrics.increment('region_variants')
+                    variant_result = self.recognize_regions_batch(processed_image, variant_regions)
+                    candidates.append(variant_result)
+                    if variant_result.get('success') and self.is_valid_name(variant_result.get('name', '')) and \
+                            self.is_valid_ethnicity(variant_result.get('ethnicity', '')):
+                        break
+                result = self.select_best_result(candidates)
+
+            result['metrics'] = metrics.to_dict()
+            results[index] = result
+        return results
+
     def select_best_result(self, results):
         """从多个识别结果中选择最佳结果"""
         if not results:
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Tesseract可执行文件查找
+
+在常见安装路径和PATH中查找tesseract，并运行一次 tesseract --version 确认可用。
+查找结果（路径、版本以及可执行文件的修改时间和大小）缓存在用户目录下的小文件中：
+之后的启动和每个工作进程只需核对可执行文件是否变化，不再逐个路径查找、也不再启动子进程；
+Tesseract升级、移动或卸载后缓存自动失效。
+"""
+
+import json
+import logging
+import os
+import platform
+import shutil
+
+import pytesseract
+
+
+logger = logging.getLogger('idcard_ocr.tesseract_locator')
+
+
+# Windows常见安装路径（包括chocolatey安装路径）
+WINDOWS_TESSERACT_PATHS = [
+    r"C:\ProgramData\chocolatey\lib\tesseract\tools\tesseract.exe",
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+    r"C:\Users\%USERNAME%\AppData\Local\Tesseract-OCR\tesseract.exe"
+]
+
+
+def find_tesseract_candidates():
+    """按优先顺序列出可能的tesseract可执行文件（Windows常见安装路径，然后是PATH）"""
+    candidates = []
+    if platform.system() == "Windows":
+        for path in WINDOWS_TESSERACT_PATHS:
+            expanded_path = os.path.expandvars(path)
+            if os.path.exists(expanded_path):
+                candidates.append(expanded_path)
+
+    path = shutil.which("tesseract")
+    if path and path not in candidates:
+        candidates.append(path)
+    return candidates
+
+
+def file_signature(path):
+    """可执行文件的修改时间和大小，用于判断缓存是否仍然有效"""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_cached_tesseract(cache_path):
+    """读取缓存的Tesseract信息，缓存不存在、损坏或可执行文件已变化时返回None"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        if file_signature(info['path']) != info['signature']:
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return info
+
+
+def save_cached_tesseract(cache_path, info):
+    """写入缓存（先写临时文件再替换，多个工作进程同时写入时不会读到不完整的文件）"""
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.debug("无法写入Tesseract缓存 %s: %s", cache_path, e)
+
+
+def discover_tesseract():
+    """逐个尝试候选路径，返回第一个可用的Tesseract信息{'path', 'version', 'signature'}，都不可用时返回None"""
+    for path in find_tesseract_candidates():
+        pytesseract.pytesseract.tesseract_cmd = path
+        try:
+            version = str(pytesseract.get_tesseract_version())
+            return {'path': path, 'version': version, 'signature': file_signature(path)}
+        except Exception as e:
+            logger.debug("Tesseract不可用 %s: %s", path, e)
+    return None
+
+
+def configure_tesseract(cache_path=None):
+    """
+    让pytesseract使用找到的Tesseract，返回{'path', 'version', ...}，找不到可用的Tesseract时返回None
+
+    cache_path: 缓存文件路径，None表示不使用缓存（每次都重新查找）
+    """
+    info = load_cached_tesseract(cache_path) if cache_path else None
+    if info is not None:
+        logger.debug("使用缓存的Tesseract %s: %s", info['version'], info['path'])
+    else:
+        info = discover_tesseract()
+        if info is None:
+            pytesseract.pytesseract.tesseract_cmd = 'tesseract'
+            return None
+        logger.info("找到Tesseract %s: %s", info['version'], info['path'])
+        if cache_path:
+            save_cached_tesseract(cache_path, info)
+
+    pytesseract.pytesseract.tesseract_cmd = info['path']
+    return info
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+身份证信息识别本地HTTP服务（供其他内部工具调用）
+
+工作进程常驻并预先创建好识别器；并发到达的请求先进入队列，由调度线程合并为微批，
+整批交给一个工作进程识别（opencv_dnn等后端对整批的区域只做一次前向计算）。
+Tesseract等逐个区域识别的后端合并没有收益，排队的请求按空闲工作进程数平均分批，不等待后续请求。
+
+用法示例：
+    python -m src.server --port 8765 --workers 4
+    curl --data-binary @身份证.jpg "http://127.0.0.1:8765/recognize?filename=身份证.jpg"
+    curl http://127.0.0.1:8765/health
+
+POST /recognize 的请求体为图片文件内容，返回JSON：
+    {"filename": ..., "name": ..., "ethnicity": ..., "status": ..., "note": ..., "cached": ..., "elapsed_ms": ...}
+"""
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# 修复PyInstaller和直接运行的导入问题
+try:
+    from .config.settings import (APP_NAME, APP_VERSION, MAX_IMAGE_FILE_SIZE, RESULT_CACHE_ENABLED, LOG_LEVEL,
+        LOG_MODULE_LEVELS, LOG_JSONL_PATH, SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_BATCH_SIZE,
+        SERVER_BATCH_WAIT_MS, SERVER_REQUEST_TIMEOUT, SERVER_MAX_QUEUE, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+    from .utils.batch_engine import _init_worker, _worker_ready, _process_batch_in_worker, RECOGNITION_METHODS
+    from .utils.log_setup import setup_logging, get_logging_config
+except ImportError:
+    try:
+        from src.config.settings import (APP_NAME, APP_VERSION, MAX_IMAGE_FILE_SIZE, RESULT_CACHE_ENABLED, LOG_LEVEL,
+            LOG_MODULE_LEVELS, LOG_JSONL_PATH, SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_BATCH_SIZE,
+            SERVER_BATCH_WAIT_MS, SERVER_REQUEST_TIMEOUT, SERVER_MAX_QUEUE, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+        from src.utils.batch_engine import _init_worker, _worker_ready, _process_batch_in_worker, RECOGNITION_METHODS
+        from src.utils.log_setup import setup_logging, get_logging_config
+    except ImportError:
+        # 动态路径处理
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        sys.path.insert(0, current_dir)
+
+        from config.settings import (APP_NAME, APP_VERSION, MAX_IMAGE_FILE_SIZE, RESULT_CACHE_ENABLED, LOG_LEVEL,
+            LOG_MODULE_LEVELS, LOG_JSONL_PATH, SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_BATCH_SIZE,
+            SERVER_BATCH_WAIT_MS, SERVER_REQUEST_TIMEOUT, SERVER_MAX_QUEUE, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+        from utils.batch_engine import _init_worker, _worker_ready, _process_batch_in_worker, RECOGNITION_METHODS
+        from utils.log_setup import setup_logging, get_logging_config
+
+
+logger = logging.getLogger('idcard_ocr.server')
+
+# 返回给调用方的结果字段
+RESPONSE_FIELDS = ('filename', 'name', 'ethnicity', 'status', 'note', 'cached')
+
+
+def _init_service_worker(*args):
+    """服务工作进程初始化：忽略Ctrl+C（由主进程负责停止服务），其余同批量识别的工作进程"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker(*args)
+
+
+class QueueFullError(Exception):
+    """排队的请求数已达上限"""
+
+
+class _Request:
+    """一个等待识别的上传图片"""
+
+    __slots__ = ('label', 'image_data', 'deadline', 'future')
+
+    def __init__(self, label, image_data, deadline):
+        self.label = label
+        self.image_data = image_data
+        self.deadline = deadline
+        self.future = Future()
+
+
+class RecognitionService:
+
+    def __init__(self, max_workers=None, batch_size=SERVER_BATCH_SIZE, batch_wait=SERVER_BATCH_WAIT_MS / 1000,
+                 timeout=SERVER_REQUEST_TIMEOUT, max_queue=SERVER_MAX_QUEUE, use_cache=RESULT_CACHE_ENABLED,
+                 method='multiple', profile=PREPROCESS_PROFILE):
+        """
+        max_workers: 常驻工作进程数，None表示使用CPU核心数
+        batch_size: 每个微批最多包含的图片数
+        batch_wait: 微批中第一张图片到达后最多再等待其他请求的时间（秒）
+        timeout: 单个请求的超时时间（秒），超时的请求不再送去识别
+        max_queue: 排队等待识别的请求数上限
+        use_cache: 是否使用识别结果缓存
+        method: 'multiple'或'single'，含义同批量识别引擎
+        profile: 预处理档位（PREPROCESS_PROFILES中的名称）
+        """
+        if method not in RECOGNITION_METHODS:
+            raise ValueError(f"不支持的识别方法: {method}")
+        if profile not in PREPROCESS_PROFILES:
+            raise ValueError(f"不支持的预处理档位: {profile}")
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0.0, batch_wait)
+        self.timeout = timeout
+        self.use_cache = use_cache
+        self.method = method
+        self.profile = profile
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        # 同时在识别的批数不超过工作进程数：工作进程都忙时请求留在队列中，下一批可以合并更多请求
+        self._slots = threading.Semaphore(self.max_workers)
+        self._busy = 0
+        # 后端是否整批识别（由工作进程启动时报告）；逐个识别的后端不合并请求，以免一个进程串行处理整批
+        self.coalesce = True
+        self._executor = None
+        self._dispatcher = None
+        self._stopping = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self.stats = {'processed': 0, 'batches': 0, 'rejected': 0, 'expired': 0}
+
+    def start(self):
+        """启动工作进程并等待它们完成初始化，然后开始调度"""
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_service_worker,
+                                             initargs=(self.use_cache, self.method, self.profile, get_logging_config()))
+        start_time = time.perf_counter()
+        ready = [future.result() for future in [self._executor.submit(_worker_ready) for _ in range(self.max_workers)]]
+        self.coalesce = not any(uses_config for _, uses_config in ready)
+        logger.info("%s 个工作进程已就绪，用时 %.2f 秒（%s）", len({pid for pid, _ in ready}),
+                    time.perf_counter() - start_time, '合并微批' if self.coalesce else '按空闲进程分批')
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+        # 仍在排队的请求直接失败
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError("服务正在停止"))
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def submit(self, label, image_data):
+        """提交一张图片，返回Future（结果为结果行）；队列已满时抛出QueueFullError"""
+        request = _Request(label, image_data, time.monotonic() + self.timeout)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            with self._stats_lock:
+                self.stats['rejected'] += 1
+            raise QueueFullError(f"排队的请求数已达上限 {self._queue.maxsize}")
+        return request.future
+
+    def recognize(self, label, image_data):
+        """识别一张图片并等待结果，超时抛出concurrent.futures.TimeoutError"""
+        future = self.submit(label, image_data)
+        return future.result(timeout=self.timeout)
+
+    def health(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['mean_batch_size'] = round(stats['processed'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return dict(status='ok', workers=self.max_workers, method=self.method, profile=self.profile, queued=self._queue.qsize(),
+                    coalesce=self.coalesce, **stats)
+
+    def _next_batch(self):
+        """
+        取出下一批请求：阻塞等待第一个，再在batch_wait内合并后续到达的请求（跳过已超时的）。
+        不合并时只取已在排队的请求，每批ceil(排队数/空闲进程数)个，让空闲的工作进程分担
+        """
+        batch = []
+        deadline = None
+        limit = self.batch_size
+        while len(batch) < limit:
+            if deadline is None:
+                timeout = 0.1
+            elif self.coalesce:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            else:
+                # 不合并时只取已在排队的请求，不等待后续到达的
+                timeout = 0
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is None and not self._stopping.is_set():
+                    continue
+                break
+
+            if request.future.done() or time.monotonic() >= request.deadline:
+                # 调用方已超时，不再占用工作进程
+                request.future.cancel()
+                with self._stats_lock:
+                    self.stats['expired'] += 1
+                continue
+            batch.append(request)
+            if deadline is None:
+                if not self.coalesce:
+                    with self._stats_lock:
+                        free = self.max_workers - self._busy
+                    limit = min(self.batch_size, math.ceil((1 + self._queue.qsize()) / max(1, free)))
+                deadline = time.monotonic() + self.batch_wait
+        return batch
+
+    def _dispatch_loop(self):
+        while not self._stopping.is_set():
+            self._slots.acquire()
+            batch = self._next_batch()
+            if not batch:
+                self._slots.release()
+                continue
+
+            images = [(request.label, request.image_data) for request in batch]
+            with self._stats_lock:
+                self._busy += 1
+            try:
+                future = self._executor.submit(_process_batch_in_worker, images, self.method)
+            except Exception as e:
+                with self._stats_lock:
+                    self._busy -= 1
+                self._slots.release()
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            future.add_done_callback(lambda done, batch=batch: self._complete_batch(batch, done))
+
+    def _complete_batch(self, batch, done):
+        with self._stats_lock:
+            self._busy -= 1
+        self._slots.release()
+        try:
+            rows = done.result()
+        except Exception as e:
+            logger.error("批量识别失败: %s", e)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self.stats['processed'] += len(batch)
+            self.stats['batches'] += 1
+        for request, row in zip(batch, rows):
+            row['batch_size'] = len(batch)
+            request.future.set_result(row)
+
+
+class RecognitionRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    server_version = f"IDCardOCR/{APP_VERSION}"
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, close=False):
+        # 未读取请求体时必须关闭连接，否则剩余的请求体会被当作下一个请求
+        if close:
+            self.close_connection = True
+        self.send_json(status, {'error': message})
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/health':
+            self.send_json(200, self.server.service.health())
+        else:
+            self.send_error_json(404, f"未知的路径: {self.path}")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/recognize':
+            self.send_error_json(404, f"未知的路径: {url.path}", close=True)
+            return
+
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self.send_error_json(411, "缺少Content-Length", close=True)
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            self.send_error_json(400, "Content-Length无效", close=True)
+            return
+        if length > MAX_IMAGE_FILE_SIZE:
+            self.send_error_json(413, f"图片超过大小上限 {MAX_IMAGE_FILE_SIZE // (1024 * 1024)}MB", close=True)
+            return
+        if length <= 0:
+            self.send_error_json(400, "请求体为空")
+            return
+
+        start_time = time.perf_counter()
+        image_data = self.rfile.read(length)
+        filename = parse_qs(url.query).get('filename', ['upload'])[0]
+
+        try:
+            row = self.server.service.recognize(os.path.basename(filename) or 'upload', image_data)
+        except QueueFullError as e:
+            self.send_error_json(503, str(e))
+            return
+        except FutureTimeoutError:
+            self.send_error_json(504, f"识别超时（{self.server.service.timeout}秒）")
+            return
+        except Exception as e:
+            logger.exception("识别请求失败: %s", e)
+            self.send_error_json(500, f"识别失败: {e}")
+            return
+
+        payload = {field: row.get(field, '') for field in RESPONSE_FIELDS}
+        payload['elapsed_ms'] = round((time.perf_counter() - start_time) * 1000, 1)
+        payload['batch_size'] = row.get('batch_size', 1)
+        self.send_json(200, payload)
+
+
+class RecognitionServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, RecognitionRequestHandler)
+        self.service = service
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m src.server',
+        description=f"{APP_NAME} {APP_VERSION} - 本地识别服务"
+    )
+    parser.add_argument('--host', default=SERVER_HOST, help=f'监听地址（默认{SERVER_HOST}）')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help=f'监听端口（默认{SERVER_PORT}）')
+    parser.add_argument('-w', '--workers', type=int, default=SERVER_WORKERS,
+                        help='常驻工作进程数（默认使用CPU核心数）')
+    parser.add_argument('-m', '--method', choices=RECOGNITION_METHODS, default='multiple',
+                        help='识别方法：multiple为多区域配置（默认），single为单区域配置')
+    parser.add_argument('-p', '--profile', choices=tuple(PREPROCESS_PROFILES), default=PREPROCESS_PROFILE,
+                        help=f'预处理档位：fast最快（适合清晰的扫描件），accurate最慢（默认{PREPROCESS_PROFILE}）')
+    parser.add_argument('--batch-size', type=int, default=SERVER_BATCH_SIZE,
+                        help=f'每个微批最多包含的图片数（默认{SERVER_BATCH_SIZE}）')
+    parser.add_argument('--batch-wait-ms', type=float, default=SERVER_BATCH_WAIT_MS,
+                        help=f'合并微批时最多等待的毫秒数（默认{SERVER_BATCH_WAIT_MS}）')
+    parser.add_argument('--timeout', type=float, default=SERVER_REQUEST_TIMEOUT,
+                        help=f'单个请求的超时秒数（默认{SERVER_REQUEST_TIMEOUT}）')
+    parser.add_argument('--max-queue', type=int, default=SERVER_MAX_QUEUE,
+                        help=f'排队请求数上限，超出时返回503（默认{SERVER_MAX_QUEUE}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用识别结果缓存')
+    parser.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                        help=f'日志级别（默认{LOG_LEVEL}）')
+    parser.add_argument('--log-jsonl', default=LOG_JSONL_PATH, help='把日志同时写入该JSONL文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """服务主函数，返回进程退出码"""
+    args = parse_args(argv)
+    setup_logging(args.log_level or LOG_LEVEL, LOG_MODULE_LEVELS, args.log_jsonl)
+
+    service = RecognitionService(max_workers=args.workers, batch_size=args.batch_size,
+                                 batch_wait=args.batch_wait_ms / 1000, timeout=args.timeout,
+                                 max_queue=args.max_queue, use_cache=RESULT_CACHE_ENABLED and not args.no_cache,
+                                 method=args.method, profile=args.profile)
+    try:
+        server = RecognitionServer((args.host, args.port), service)
+    except OSError as e:
+        print(f"错误: 无法监听 {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 2
+
+    print(f"正在启动 {service.max_workers} 个工作进程...")
+    service.start()
+    print(f"识别服务已启动: http://{args.host}:{server.server_port}/recognize"
+          f"（微批 {service.batch_size} 张 / {args.batch_wait_ms:g}ms，超时 {service.timeout:g} 秒）")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务...")
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,679 @@
+# -*- coding: utf-8 -*-
+"""
+批量识别引擎（不依赖tkinter，可在GUI、命令行或服务中复用）
+"""
+
+import logging
+import asyncio
+import inspect
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# 修复PyInstaller和直接运行的导入问题
+try:
+    from ..ocr.recognizer import IDCardRecognizer
+    from ..ocr.config_stats import OCRConfigStats
+    from ..config.settings import (RESULT_CACHE_ENABLED, RESULT_CACHE_PATH, RESULT_CACHE_MAX_BYTES,
+        PREFETCH_ENABLED, PREFETCH_DEPTH, PREFETCH_THREADS, PREFETCH_MAX_BYTES,
+            DEDUP_ENABLED, DEDUP_MAX_DISTANCE, DEDUP_MAX_MISMATCH, PIPELINE_STAGE_CONCURRENCY, PIPELINE_QUEUE_SIZE,
+            PIPELINE_MAX_IN_FLIGHT, PIPELINE_MONITOR_INTERVAL, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+    from .result_cache import ResultCache
+    from .metrics import MetricsAggregator, merge_metrics
+    from .log_setup import setup_logging, get_logging_config
+    from .prefetch import ImagePrefetcher, read_image_buffer
+    from .duplicate_index import DuplicateIndex
+    from .pipeline import Stage, StagedPipeline
+except ImportError:
+    try:
+        from src.ocr.recognizer import IDCardRecognizer
+        from src.ocr.config_stats import OCRConfigStats
+        from src.config.settings import (RESULT_CACHE_ENABLED, RESULT_CACHE_PATH, RESULT_CACHE_MAX_BYTES,
+            PREFETCH_ENABLED, PREFETCH_DEPTH, PREFETCH_THREADS, PREFETCH_MAX_BYTES,
+            DEDUP_ENABLED, DEDUP_MAX_DISTANCE, DEDUP_MAX_MISMATCH, PIPELINE_STAGE_CONCURRENCY, PIPELINE_QUEUE_SIZE,
+            PIPELINE_MAX_IN_FLIGHT, PIPELINE_MONITOR_INTERVAL, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+        from src.utils.result_cache import ResultCache
+        from src.utils.metrics import MetricsAggregator, merge_metrics
+        from src.utils.log_setup import setup_logging, get_logging_config
+        from src.utils.prefetch import ImagePrefetcher, read_image_buffer
+        from src.utils.duplicate_index import DuplicateIndex
+        from src.utils.pipeline import Stage, StagedPipeline
+    except ImportError:
+        # 动态路径处理
+        current_dir = os.path.dirname(__file__)
+        parent_dir = os.path.dirname(current_dir)
+        sys.path.insert(0, parent_dir)
+
+        from ocr.recognizer import IDCardRecognizer
+        from ocr.config_stats import OCRConfigStats
+        from config.settings import (RESULT_CACHE_ENABLED, RESULT_CACHE_PATH, RESULT_CACHE_MAX_BYTES,
+            PREFETCH_ENABLED, PREFETCH_DEPTH, PREFETCH_THREADS, PREFETCH_MAX_BYTES,
+            DEDUP_ENABLED, DEDUP_MAX_DISTANCE, DEDUP_MAX_MISMATCH, PIPELINE_STAGE_CONCURRENCY, PIPELINE_QUEUE_SIZE,
+            PIPELINE_MAX_IN_FLIGHT, PIPELINE_MONITOR_INTERVAL, PREPROCESS_PROFILES, PREPROCESS_PROFILE)
+        from utils.result_cache import ResultCache
+        from utils.metrics import MetricsAggregator, merge_metrics
+        from utils.log_setup import setup_logging, get_logging_config
+        from utils.prefetch import ImagePrefetcher, read_image_buffer
+        from utils.duplicate_index import DuplicateIndex
+        from utils.pipeline import Stage, StagedPipeline
+
+
+logger = logging.getLogger('idcard_ocr.batch_engine')
+
+
+# 每个工作进程独享一个识别器实例和缓存连接
+_worker_recognizer = None
+_worker_cache = None
+
+
+# 识别方法：多区域配置（默认）或单区域配置
+RECOGNITION_METHODS = ('multiple', 'single')
+
+
+def open_result_cache(recognizer, method='multiple'):
+    """按识别器的流水线指纹和识别方法打开结果缓存，失败时返回None（不影响识别）"""
+    try:
+        fingerprint = f"{recognizer.get_pipeline_fingerprint()}-{method}"
+        return ResultCache(RESULT_CACHE_PATH, fingerprint, max_bytes=RESULT_CACHE_MAX_BYTES)
+    except Exception as e:
+        logger.warning("结果缓存不可用: %s", e)
+        return None
+
+
+def _init_worker(use_cache, method, profile, log_config):
+    """工作进程初始化：沿用主进程的日志配置，限制每个进程内部的线程数，并创建识别器"""
+    global _worker_recognizer, _worker_cache
+
+    if log_config:
+        setup_logging(**log_config)
+
+    # 多进程并行时，避免Tesseract/OpenCV在每个进程内再开多线程互相争抢CPU
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except Exception:
+        pass
+
+    _worker_recognizer = IDCardRecognizer(profile)
+    if use_cache:
+        _worker_cache = open_result_cache(_worker_recognizer, method)
+
+
+def _process_in_worker(image_path, debug, method, image_data=None):
+    """在工作进程中识别单个文件"""
+    return process_image(_worker_recognizer, image_path, debug, _worker_cache, method, image_data)
+
+
+def _prepare_in_worker(image_path, image_data, debug, method, hash_image):
+    """在工作进程中完成单个文件的解码/预处理阶段"""
+    return prepare_image(_worker_recognizer, image_path, image_data, debug, _worker_cache, method, hash_image)
+
+
+def _ocr_in_worker(processed_image, content_hash, image_hash, method):
+    """在工作进程中完成单个文件的OCR阶段"""
+    return ocr_prepared_image(_worker_recognizer, processed_image, _worker_cache, content_hash, image_hash, method)
+
+
+def _worker_ready():
+    """空任务：提交后等待完成即可确认工作进程已启动并创建好识别器；返回(进程号, 后端是否逐个区域识别)"""
+    return os.getpid(), _worker_recognizer.ocr_backend.uses_config
+
+
+def _process_batch_in_worker(images, method):
+    """在工作进程中识别一组已读入内存的图片"""
+    return process_image_batch(_worker_recognizer, images, _worker_cache, method)
+
+
+def _recognize(recognizer, image_path, debug, method, image_data=None):
+    """按识别方法调用识别器"""
+    if method == 'single':
+        return recognizer.recognize(image_path, debug=debug, image_data=image_data)
+    return recognizer.recognize_with_multiple_methods(image_path, debug=debug, image_data=image_data)
+
+
+def lookup_cache(cache, image_path, image_data=None):
+    """查询结果缓存，返回(内容哈希, 缓存的识别结果)；未命中时结果为None，查询失败时两者都为None"""
+    try:
+        if image_data is not None:
+            content_hash = cache.hash_bytes(image_data)
+        else:
+            content_hash = cache.hash_file(image_path)
+        return content_hash, cache.get(content_hash)
+    except Exception as e:
+        logger.warning("查询结果缓存失败: %s", e)
+        return None, None
+
+
+def store_in_cache(cache, content_hash, result):
+    """
+    写入结果缓存
+
+    只缓存成功的识别结果。识别器会吞掉OCR异常，Tesseract未安装或损坏时结果仍为成功但姓名民族为空，
+    因此姓名民族都为空、或有OCR调用抛出异常（ocr_errors）的结果也不缓存，修复环境后重新识别；
+    近似重复图片没有自己的识别结果，不缓存；耗时统计和OCR配置统计只对本次识别有意义，不写入缓存
+    """
+    if cache is None or content_hash is None or not result.get('success') or result.get('duplicate_of'):
+        return
+    if not result.get('name') and not result.get('ethnicity'):
+        return
+    if result.get('metrics', {}).get('counters', {}).get('ocr_errors'):
+        return
+    try:
+        cache.put(content_hash, {key: value for key, value in result.items() if key not in ('metrics', 'config_stats')})
+    except Exception as e:
+        logger.warning("写入结果缓存失败: %s", e)
+
+
+def recognize_with_cache(recognizer, image_path, debug=False, cache=None, method='multiple', image_data=None):
+    """
+    识别单个文件，优先查询结果缓存
+
+    返回(识别结果, 是否命中缓存)。调试模式需要保存中间图像，不使用缓存。
+    image_data为可选的已读入的文件内容，提供时直接用于计算哈希和解码，不再读取文件。
+    """
+    if cache is None or debug:
+        return _recognize(recognizer, image_path, debug, method, image_data), False
+
+    content_hash, result = lookup_cache(cache, image_path, image_data)
+    if result is not None:
+        return result, True
+
+    result = _recognize(recognizer, image_path, debug, method, image_data)
+    store_in_cache(cache, content_hash, result)
+    return result, False
+
+
+def _new_row(image_path):
+    """创建空的结果行"""
+    return {
+        'path': image_path,
+        'filename': os.path.basename(image_path),
+        'name': "",
+        'ethnicity': "",
+        'status': "",
+        'note': "",
+        'cached': False
+    }
+
+
+def fill_error(row, error):
+    """把处理异常记录到结果行（在except块中调用，附带调用栈）"""
+    row['status'] = "处理错误"
+    row['note'] = f"处理异常: {str(error)}"
+    row['traceback'] = traceback.format_exc()
+    return row
+
+
+def fill_row(row, result, debug=False):
+    """把识别结果整理到结果行"""
+    row['metrics'] = result.get('metrics', {})
+
+    if result['success']:
+        row['name'] = result.get('name', '')
+        row['ethnicity'] = result.get('ethnicity', '')
+        row['status'] = "成功"
+        row['ocr_sources'] = result.get('ocr_sources', {})
+        if result.get('image_hash'):
+            row['image_hash'] = result['image_hash']
+        if result.get('duplicate_of'):
+            # 近似重复图片跳过了OCR，结果由BatchEngine从原图的结果行复制
+            row['duplicate_of'] = result['duplicate_of']
+
+        if debug and 'debug' in result:
+            row['debug'] = result['debug']
+
+        # 如果识别成功但结果为空，标记为部分成功
+        if not row['name'] and not row['ethnicity']:
+            row['status'] = "部分成功"
+            row['note'] = "识别到文本但姓名民族为空"
+    else:
+        row['status'] = "失败"
+        row['note'] = result.get('error', '识别失败')
+    return row
+
+
+def process_image(recognizer, image_path, debug=False, cache=None, method='multiple', image_data=None):
+    """
+    识别单个图片文件，并整理为结果行（elapsed为处理耗时，单位秒）
+
+    image_data: 可选的预读得到的文件内容
+    """
+    start_time = time.perf_counter()
+    row = _new_row(image_path)
+
+    try:
+        # 检查文件是否存在（已预读到内容时文件必然存在）
+        if image_data is None and not os.path.exists(image_path):
+            raise FileNotFoundError(f"File not found: {image_path}")
+
+        # OCR识别（使用多种方法提高准确率）
+        result, row['cached'] = recognize_with_cache(recognizer, image_path, debug, cache, method, image_data)
+        fill_row(row, result, debug)
+
+    except FileNotFoundError as fnf_error:
+        row['status'] = "文件不存在"
+        row['note'] = f"文件未找到: {str(fnf_error)}"
+
+    except Exception as e:
+        fill_error(row, e)
+
+    row['config_stats'] = recognizer.take_config_stats()
+    row['elapsed'] = time.perf_counter() - start_time
+    return row
+
+
+def process_image_batch(recognizer, images, cache=None, method='multiple'):
+    """
+    识别一组已读入内存的图片（如服务收到的上传），返回同样顺序的结果行
+
+    images: [(标签, 文件内容), ...]。命中缓存的图片直接使用缓存结果，其余图片交给
+    recognizer.recognize_images一起识别；elapsed为整批的处理耗时。
+    """
+    start_time = time.perf_counter()
+    rows = [_new_row(label) for label, _ in images]
+    hashes = [None] * len(images)
+    misses = []
+
+    for index, (label, image_data) in enumerate(images):
+        if cache is not None:
+            hashes[index], result = lookup_cache(cache, label, image_data)
+            if result is not None:
+                rows[index]['cached'] = True
+                fill_row(rows[index], result)
+                continue
+        misses.append(index)
+
+    if misses:
+        try:
+            results = recognizer.recognize_images([images[index] for index in misses], method)
+        except Exception as e:
+            for index in misses:
+                fill_error(rows[index], e)
+            results = []
+
+        for index, result in zip(misses, results):
+            fill_row(rows[index], result)
+            store_in_cache(cache, hashes[index], result)
+
+    elapsed = time.perf_counter() - start_time
+    for row in rows:
+        row['elapsed'] = elapsed
+    return rows
+
+
+def prepare_image(recognizer, image_path, image_data=None, debug=False, cache=None, method='multiple', hash_image=False):
+    """
+    分阶段流水线的解码/预处理阶段
+
+    命中结果缓存、调试模式（需要保存中间图像）、文件不存在或预处理失败时直接得到结果行，返回{'row': 结果行}；
+    否则返回矫正后的图像（processed_image）、内容哈希、图像哈希和用于确认近似重复的签名（hash_image为True时）、统计和耗时，
+    由ocr_prepared_image完成OCR。
+    """
+    if debug or (image_data is None and not os.path.exists(image_path)):
+        return {'row': process_image(recognizer, image_path, debug, cache, method, image_data)}
+
+    start_time = time.perf_counter()
+    content_hash = None
+    if cache is not None:
+        content_hash, result = lookup_cache(cache, image_path, image_data)
+        if result is not None:
+            row = fill_row(_new_row(image_path), result)
+            row['cached'] = True
+            row['elapsed'] = time.perf_counter() - start_time
+            return {'row': row}
+
+    try:
+        processed_image = recognizer.prepare_image(image_path, image_data)
+        image_hash = signature = None
+        if hash_image:
+            image_hash = recognizer.compute_image_hash(processed_image)
+            signature = recognizer.compute_image_signature(processed_image)
+    except Exception as e:
+        logger.error("预处理失败 %s: %s", image_path, e)
+        row = fill_row(_new_row(image_path), {'success': False, 'error': str(e), 'metrics': recognizer.metrics.to_dict()})
+        row['elapsed'] = time.perf_counter() - start_time
+        return {'row': row}
+
+    return {
+        'processed_image': processed_image,
+        'content_hash': content_hash,
+        'image_hash': image_hash,
+        'image_signature': signature,
+        'metrics': recognizer.metrics.to_dict(),
+        'elapsed': time.perf_counter() - start_time
+    }
+
+
+def ocr_prepared_image(recognizer, processed_image, cache=None, content_hash=None, image_hash=None, method='multiple'):
+    """分阶段流水线的OCR阶段：在矫正后的图像上完成识别，成功的结果写入缓存；返回(识别结果, 耗时秒)"""
+    start_time = time.perf_counter()
+    try:
+        result = recognizer.recognize_prepared(processed_image, method, reset_metrics=True)
+    except Exception as e:
+        logger.error("识别失败: %s", e)
+        result = {'success': False, 'error': str(e)}
+    result['metrics'] = recognizer.metrics.to_dict()
+    result['config_stats'] = recognizer.take_config_stats()
+    recognizer.attach_image_hash(result, image_hash)
+    store_in_cache(cache, content_hash, result)
+    return result, time.perf_counter() - start_time
+
+
+def process_image_without_dedup(recognizer, image_path, debug=False, cache=None, method='multiple'):
+    """不做近似重复检测地识别单个文件（近似重复图片的原图识别失败时重新识别）"""
+    duplicate_index, recognizer.duplicate_index = recognizer.duplicate_index, None
+    try:
+        return process_image(recognizer, image_path, debug, cache, method)
+    finally:
+        recognizer.duplicate_index = duplicate_index
+
+
+def mark_duplicate(row, original):
+    """用原图的结果填充近似重复图片的结果行，并在备注中注明复用了哪个文件的结果"""
+    row['name'] = original['name']
+    row['ethnicity'] = original['ethnicity']
+    row['status'] = original['status']
+    row['duplicate_of'] = original['path']
+    row['note'] = f"与 {os.path.basename(original['path'])} 近似重复，复用其识别结果"
+
+
+class BatchEngine:
+
+    def __init__(self, max_workers=None, debug=False, recognizer=None, use_cache=RESULT_CACHE_ENABLED,
+                 method='multiple', prefetch=PREFETCH_ENABLED, dedup=DEDUP_ENABLED, profile=PREPROCESS_PROFILE):
+        """
+        max_workers: 工作进程数，None表示使用CPU核心数，1表示在当前进程内顺序处理
+        recognizer: 顺序处理时复用的识别器实例（可选）
+        use_cache: 是否使用识别结果缓存
+        method: 'multiple'使用recognize_with_multiple_methods，'single'使用单区域配置的recognize
+        prefetch: 是否在后台预读后面的图片文件
+        dedup: 是否检测本批内的近似重复图片（复用先识别的结果，并在备注中标记）
+        profile: 预处理档位（PREPROCESS_PROFILES中的名称）
+        """
+        if method not in RECOGNITION_METHODS:
+            raise ValueError(f"不支持的识别方法: {method}")
+        if profile not in PREPROCESS_PROFILES:
+            raise ValueError(f"不支持的预处理档位: {profile}")
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.debug = debug
+        self.recognizer = recognizer
+        self.use_cache = use_cache
+        self.method = method
+        self.prefetch = prefetch
+        self.dedup = dedup
+        self.profile = profile
+        self.cache = None
+        # 多进程处理时的分阶段流水线，用于查看各阶段的队列深度
+        self.pipeline = None
+
+        # 已产出的结果行（按路径，供顺序处理时的近似重复图片复制结果）
+        self._originals = {}
+
+        # 各字段结果来源（整卡OCR或具体的OCR配置）的命中次数，用于调整配置顺序
+        self.source_counts = {}
+        # 各字段多配置OCR的尝试、命中和提前结束次数（汇总各工作进程随结果返回的新增统计）
+        self.config_stats = {}
+
+        # 本次处理的各阶段耗时和OCR调用统计（不含断点续跑跳过的文件）
+        self.metrics = MetricsAggregator()
+
+    def run(self, image_files, ordered=True, should_stop=None, journal=None):
+        """
+        批量识别图片，逐个产出结果行
+
+        image_files: 图片路径列表或任意可迭代对象（如ImageScanner，边扫描边识别）
+        ordered: True按输入顺序产出结果，False按完成顺序产出
+        should_stop: 可选的无参回调，返回True时停止处理
+        journal: 可选的已打开的JobJournal，已完成的文件直接产出旧结果（标记resumed），新结果实时写入日志
+        """
+        completed = journal.completed if journal is not None else {}
+        self._originals = {}
+
+        if self.max_workers <= 1:
+            rows = self._run_inline(image_files, completed, should_stop)
+        else:
+            rows = self._run_pool(image_files, completed, ordered, should_stop)
+
+        for row in rows:
+            self._record_config_stats(row.pop('config_stats', None))
+            if self.dedup and not row.get('duplicate_of'):
+                self._originals[row['path']] = {key: row[key] for key in ('path', 'name', 'ethnicity', 'status')}
+            if journal is not None:
+                journal.record(row)
+            self._record_sources(row)
+            if not row.get('resumed'):
+                self.metrics.add(row.get('metrics'), row.get('elapsed'))
+            yield row
+
+    def _resolve_duplicate(self, row, original, reprocess):
+        """
+        近似重复图片复制原图的结果
+
+        original: 原图的结果行；原图识别失败或结果为空时调用reprocess重新完整识别这张图片
+        """
+        if original is not None and original['status'] == "成功":
+            mark_duplicate(row, original)
+            return row
+        logger.debug("%s 的原图 %s 没有有效结果，重新识别", row['path'], row['duplicate_of'])
+        return reprocess()
+
+    def _record_sources(self, row):
+        """累计各字段结果来源的命中次数"""
+        for field_name, source in row.get('ocr_sources', {}).items():
+            if source is None:
+                continue
+            counts = self.source_counts.setdefault(field_name, {})
+            counts[source] = counts.get(source, 0) + 1
+
+    def _record_config_stats(self, delta):
+        """汇总一个结果带回的OCR配置统计"""
+        for field_name, stats in (delta or {}).items():
+            self.config_stats.setdefault(field_name, OCRConfigStats([])).merge(stats)
+
+    def get_config_stats(self):
+        """按字段获取本次处理中各OCR配置的尝试次数、命中次数、提前结束次数和命中率（见OCRConfigStats.to_dict）"""
+        return {field_name: stats.to_dict() for field_name, stats in self.config_stats.items()}
+
+    def _stopped(self, should_stop):
+        return should_stop is not None and should_stop()
+
+    def _run_inline(self, image_files, completed, should_stop):
+        """在当前进程内顺序处理"""
+        if self.recognizer is None:
+            self.recognizer = IDCardRecognizer(self.profile)
+        else:
+            self.recognizer.preprocessor.set_profile(self.profile)
+        # 顺序处理时原图总是先于近似重复图片完成
+        self.recognizer.duplicate_index = None
+        if self.dedup:
+            self.recognizer.duplicate_index = DuplicateIndex(DEDUP_MAX_DISTANCE, DEDUP_MAX_MISMATCH)
+        if self.use_cache and self.cache is None:
+            self.cache = open_result_cache(self.recognizer, self.method)
+
+        for image_path, image_data in self._read_ahead(image_files, completed):
+            if self._stopped(should_stop):
+                return
+            if image_path in completed:
+                yield dict(completed[image_path], resumed=True)
+                continue
+            row = process_image(self.recognizer, image_path, self.debug, self.cache, self.method, image_data)
+            if row.get('duplicate_of'):
+                row = self._resolve_duplicate(
+                    row, self._originals.get(row['duplicate_of']),
+                    lambda: process_image_without_dedup(self.recognizer, image_path, self.debug, self.cache, self.method))
+            yield row
+
+    def _read_ahead(self, image_files, completed):
+        """逐个产出(路径, 预读的文件内容)，未启用预读时内容为None"""
+        if not self.prefetch:
+            return ((image_path, None) for image_path in image_files)
+        return iter(ImagePrefetcher(image_files, depth=PREFETCH_DEPTH, max_bytes=PREFETCH_MAX_BYTES,
+                                    threads=PREFETCH_THREADS, skip=completed))
+
+    def _run_pool(self, image_files, completed, ordered, should_stop):
+        """
+        多进程分阶段处理：发现 → 读取（线程）→ 解码/预处理（进程池）→ 近似重复检测 → OCR（进程池）→ 后处理
+
+        各阶段之间为有界队列，同时在流水线中的文件数不超过PIPELINE_MAX_IN_FLIGHT，
+        调用方（写入结果文件）处理不过来时整个流水线随之放慢。
+        """
+        workers = self.max_workers
+        concurrency = {name: value or workers for name, value in PIPELINE_STAGE_CONCURRENCY.items()}
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(self.use_cache, self.method, self.profile, get_logging_config()))
+        readers = ThreadPoolExecutor(max_workers=concurrency['read'], thread_name_prefix='reader') \
+            if self.prefetch else None
+
+        # 近似重复检测在主进程中进行：预处理阶段算出图像哈希，排在前面的图片为原图，其余近似重复图片跳过OCR
+        duplicate_index = None
+        if self.dedup:
+            duplicate_index = DuplicateIndex(DEDUP_MAX_DISTANCE, DEDUP_MAX_MISMATCH)
+        # 已得到结果的原图（路径 -> asyncio.Future），近似重复图片在后处理阶段等待原图的结果
+        settled = {}
+
+        def settle(path, row):
+            future = settled.get(path)
+            if future is None:
+                future = settled[path] = asyncio.get_running_loop().create_future()
+            if not future.done():
+                future.set_result({key: row[key] for key in ('path', 'name', 'ethnicity', 'status')})
+
+        def failed_row(job, error):
+            logger.error("处理失败 %s: %s", job['path'], error)
+            row = fill_error(_new_row(job['path']), error)
+            row['elapsed'] = job.get('elapsed', 0.0)
+            return row
+
+        def per_item(func):
+            """
+            单个文件的阶段：异常（如工作进程被终止、结果无法序列化、内存不足）只让这个文件得到"处理错误"结果行，
+            后续阶段跳过它，整批处理继续；输入迭代等与单个文件无关的异常仍然中断流水线
+            """
+            if inspect.iscoroutinefunction(func):
+                async def guarded(job):
+                    try:
+                        return await func(job)
+                    except Exception as e:
+                        job['row'] = failed_row(job, e)
+                        return job
+            else:
+                def guarded(job):
+                    try:
+                        return func(job)
+                    except Exception as e:
+                        job['row'] = failed_row(job, e)
+                        return job
+            return guarded
+
+        def read(job):
+            job['image_data'] = read_image_buffer(job['path'])
+            return job
+
+        async def preprocess(job):
+            output = await asyncio.get_running_loop().run_in_executor(
+                executor, _prepare_in_worker, job['path'], job.pop('image_data', None), self.debug, self.method,
+                duplicate_index is not None)
+            job.update(output)
+            return job
+
+        def check_duplicate(job):
+            # 命中缓存和断点续跑的文件没有经过预处理，无法确认文字像素，不登记
+            if 'row' not in job and job.get('image_hash') is not None:
+                original_path = duplicate_index.claim(job['image_hash'], job['path'], job.pop('image_signature'))
+                if original_path is not None:
+                    logger.debug("%s 与 %s 近似重复，跳过OCR", job['path'], original_path)
+                    job['duplicate_of'] = original_path
+                    del job['processed_image']
+            return job
+
+        async def ocr(job):
+            result, elapsed = await asyncio.get_running_loop().run_in_executor(
+                executor, _ocr_in_worker, job.pop('processed_image'), job['content_hash'], job['image_hash'],
+                self.method)
+            job['result'] = result
+            job['elapsed'] += elapsed
+            return job
+
+        async def post_process(job):
+            try:
+                if 'row' in job:
+                    row = job['row']
+                elif 'duplicate_of' in job:
+                    row = await resolve_duplicate(job)
+                else:
+                    row = fill_row(_new_row(job['path']), job['result'])
+                    row['metrics'] = merge_metrics(job['metrics'], row['metrics'])
+                    row['config_stats'] = job['result'].get('config_stats')
+                    row['elapsed'] = job['elapsed']
+            except Exception as e:
+                row = failed_row(job, e)
+            # 原图无论成功与否都要登记结果，否则等待它的近似重复图片会一直等下去
+            if not row.get('duplicate_of') and not row.get('resumed'):
+                settle(row['path'], row)
+            return row
+
+        async def resolve_duplicate(job):
+            original_path = job['duplicate_of']
+            original = completed.get(original_path)
+            if original is None:
+                if original_path not in settled:
+                    settled[original_path] = asyncio.get_running_loop().create_future()
+                original = await settled[original_path]
+
+            row = _new_row(job['path'])
+            row['image_hash'] = format(job['image_hash'], 'x')
+            row['duplicate_of'] = original_path
+            row['metrics'] = merge_metrics(job['metrics'], {'counters': {'duplicates': 1}})
+            row['elapsed'] = job['elapsed']
+            if original['status'] == "成功":
+                mark_duplicate(row, original)
+                return row
+            logger.debug("%s 的原图 %s 没有有效结果，重新识别", job['path'], original_path)
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, _process_in_worker, job['path'], self.debug, self.method)
+
+        stages = []
+        if readers is not None:
+            stages.append(Stage('read', per_item(read), concurrency['read'], executor=readers,
+                                skip=lambda job: 'row' in job))
+        stages.append(Stage('preprocess', per_item(preprocess), concurrency['preprocess'],
+                            skip=lambda job: 'row' in job))
+        if duplicate_index is not None:
+            # 按输入顺序登记，与顺序处理一样总是以排在前面的图片为原图
+            stages.append(Stage('dedup', per_item(check_duplicate), ordered=True))
+        stages.append(Stage('ocr', per_item(ocr), concurrency['ocr'],
+                            skip=lambda job: 'row' in job or 'duplicate_of' in job))
+        # 后处理阶段的并发数不小于在途文件数：等待原图结果的近似重复图片不会占满后处理阶段
+        max_in_flight = PIPELINE_MAX_IN_FLIGHT or workers * 4
+        stages.append(Stage('post_process', post_process, max_in_flight))
+
+        jobs = ({'path': image_path, 'row': dict(completed[image_path], resumed=True)} if image_path in completed
+                else {'path': image_path} for image_path in image_files)
+        self.pipeline = StagedPipeline(stages, queue_size=PIPELINE_QUEUE_SIZE or workers,
+                                       max_in_flight=max_in_flight, ordered=ordered,
+                                       monitor_interval=PIPELINE_MONITOR_INTERVAL)
+        finished = False
+        try:
+            if self._stopped(should_stop):
+                return
+            for row in self.pipeline.run(jobs):
+                yield row
+                if self._stopped(should_stop):
+                    return
+            finished = True
+        finally:
+            # 全部完成时等待工作进程退出（不等待时解释器退出阶段可能与进程池的管理线程冲突）；
+            # 提前停止时不等待仍在运行的任务
+            executor.shutdown(wait=finished)
+            if readers is not None:
+                readers.shutdown(wait=False)
+
+    def stage_stats(self):
+        """多进程处理时各流水线阶段的状态（见StagedPipeline.snapshot），顺序处理时为空字典"""
+        if self.pipeline is None:
+            return {}
+        return self.pipeline.snapshot()
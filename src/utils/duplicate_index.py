@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+近似重复图片检测
+
+同一张身份证重复扫描、以不同JPEG质量另存或连拍时，矫正后卡片上的姓名、民族区域几乎相同。
+对这些区域计算差值哈希（dHash），按汉明距离在BK树中查找本批已识别过的候选图片；
+哈希只用于缩小范围：不同姓名（如"刘"和"胡"）的区域哈希也可能很接近，
+因此每个候选都要再逐像素比较识别尺寸下的姓名、民族区域二值图，文字像素基本一致时才复用其结果。
+
+哈希只取字段区域而不是整张卡片：同一版式的不同身份证整体外观非常接近，整卡哈希的距离区分不开。
+"""
+
+import os
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+# 修复PyInstaller打包后的导入问题
+try:
+    from ..ocr.ethnicity_matcher import BKTree
+except ImportError:
+    try:
+        from src.ocr.ethnicity_matcher import BKTree
+    except ImportError:
+        # 动态路径处理
+        current_dir = os.path.dirname(__file__)
+        parent_dir = os.path.dirname(current_dir)
+        sys.path.insert(0, parent_dir)
+
+        from ocr.ethnicity_matcher import BKTree
+
+
+def region_dhash(gray, region_config, hash_width=32, hash_height=8):
+    """
+    计算单个区域的差值哈希（hash_width * hash_height位）
+
+    区域先做Otsu二值化，消除背景噪声和压缩噪声对平坦区域梯度方向的影响
+    """
+    h, w = gray.shape[:2]
+    x1 = int(region_config['x'] * w)
+    y1 = int(region_config['y'] * h)
+    x2 = int((region_config['x'] + region_config['width']) * w)
+    y2 = int((region_config['y'] + region_config['height']) * h)
+    crop = gray[max(0, y1):min(h, y2), max(0, x1):min(w, x2)]
+    if crop.size == 0:
+        return 0
+
+    _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    small = cv2.resize(binary, (hash_width + 1, hash_height), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def image_fingerprint(image, regions_config, hash_width=32, hash_height=8):
+    """把各字段区域的哈希按字段名顺序拼接为一个整数"""
+    gray = image if len(image.shape) == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    fingerprint = 0
+    for field_name in sorted(regions_config):
+        fingerprint = (fingerprint << (hash_width * hash_height)) | \
+            region_dhash(gray, regions_config[field_name], hash_width, hash_height)
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def image_signature(regions):
+    """
+    各字段区域的文字像素掩码，用于确认近似重复
+
+    regions: {字段名: 识别尺寸的二值图（白底黑字）}，如ImagePreprocessor.extract_text_regions的输出；
+    掩码按位压缩保存，返回{字段名: (形状, 压缩后的掩码)}
+    """
+    return {name: (region.shape[:2], np.packbits(region < 128)) for name, region in regions.items()}
+
+
+def _unpack_mask(shape, bits):
+    return np.unpackbits(bits, count=shape[0] * shape[1]).reshape(shape)
+
+
+def signature_mismatch(a, b):
+    """
+    两个签名中差异最大的字段的不一致比例（0~1）
+
+    一张图中的文字像素在另一张图对应位置的3x3邻域内都没有文字像素时计为不一致，
+    容许重新扫描、压缩带来的1像素偏移；字段或尺寸不一致时返回1.0
+    """
+    if a is None or b is None or a.keys() != b.keys():
+        return 1.0
+    kernel = np.ones((3, 3), np.uint8)
+    worst = 0.0
+    for name, (shape, bits) in a.items():
+        other_shape, other_bits = b[name]
+        if tuple(shape) != tuple(other_shape):
+            return 1.0
+        mask_a = _unpack_mask(shape, bits)
+        mask_b = _unpack_mask(shape, other_bits)
+        ink = int(mask_a.sum()) + int(mask_b.sum())
+        if ink == 0:
+            continue
+        missing = int((mask_a & (1 - cv2.dilate(mask_b, kernel))).sum()) + \
+            int((mask_b & (1 - cv2.dilate(mask_a, kernel))).sum())
+        worst = max(worst, missing / ink)
+    return worst
+
+
+class DuplicateIndex:
+    """
+    按汉明距离检索、按文字像素确认的图片索引
+
+    claim为原子操作，多个线程（如流水线各阶段）可以共用同一个索引
+    """
+
+    def __init__(self, max_distance, max_mismatch):
+        """
+        max_distance: 区域哈希汉明距离不超过该值的图片作为候选
+        max_mismatch: 候选与本图的文字像素不一致比例（见signature_mismatch）不超过该值时才视为近似重复
+        """
+        self.max_distance = max_distance
+        self.max_mismatch = max_mismatch
+        self._tree = BKTree([], hamming_distance)
+        self._entries = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def add(self, image_hash, key, signature):
+        """登记一张图片"""
+        with self._lock:
+            self._add(image_hash, key, signature)
+
+    def find(self, image_hash, signature):
+        """返回最接近且经过确认的已登记图片的key，没有近似重复时返回None"""
+        with self._lock:
+            return self._find(image_hash, signature)
+
+    def claim(self, image_hash, key, signature):
+        """已有近似重复的图片时返回其key，否则登记这张图片并返回None"""
+        with self._lock:
+            existing = self._find(image_hash, signature)
+            if existing is None:
+                self._add(image_hash, key, signature)
+            return existing
+
+    def _add(self, image_hash, key, signature):
+        # 哈希相同但文字不同的图片都要登记，各自可以作为之后图片的原图
+        entries = self._entries.get(image_hash)
+        if entries is None:
+            entries = self._entries[image_hash] = []
+            self._tree.add(image_hash)
+        entries.append((self._count, key, signature))
+        self._count += 1
+
+    def _find(self, image_hash, signature):
+        candidates = []
+        for distance, candidate_hash in self._tree.search(image_hash, self.max_distance):
+            for order, key, candidate_signature in self._entries[candidate_hash]:
+                candidates.append((distance, order, key, candidate_signature))
+        # 距离相同时取最先登记的
+        for _, _, key, candidate_signature in sorted(candidates, key=lambda item: item[:2]):
+            if signature_mismatch(signature, candidate_signature) <= self.max_mismatch:
+                return key
+        return None
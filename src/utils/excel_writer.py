@@ -4,7 +4,8 @@ Excel文件写入工具
 """
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 import datetime
 import os
@@ -12,11 +13,11 @@ import sys
 
 # 修复PyInstaller和直接运行的导入问题
 try:
-    from ..config.settings import EXCEL_COLUMNS
+    from ..config.settings import EXCEL_COLUMNS, EXCEL_INCLUDE_TIMING, EXCEL_TIMING_COLUMN
     from .file_handler import FileHandler
 except ImportError:
     try:
-        from src.config.settings import EXCEL_COLUMNS
+        from src.config.settings import EXCEL_COLUMNS, EXCEL_INCLUDE_TIMING, EXCEL_TIMING_COLUMN
         from src.utils.file_handler import FileHandler
     except ImportError:
         # 动态路径处理
@@ -24,49 +25,44 @@ except ImportError:
         parent_dir = os.path.dirname(current_dir)
         sys.path.insert(0, parent_dir)
         
-        from config.settings import EXCEL_COLUMNS
+        from config.settings import EXCEL_COLUMNS, EXCEL_INCLUDE_TIMING, EXCEL_TIMING_COLUMN
         from utils.file_handler import FileHandler
 
 
+def summary_rows(total_count, success_count):
+    """数据下方统计信息的(标签, 值)行，第一行为标题"""
+    failed_count = total_count - success_count
+    success_rate = (success_count / total_count * 100) if total_count > 0 else 0
+    return [
+        ('处理统计', ''),
+        ('总文件数', total_count),
+        ('成功识别', success_count),
+        ('识别失败', failed_count),
+        ('成功率', f'{success_rate:.1f}%'),
+        ('处理时间', datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    ]
+
+
 class ExcelWriter:
     
     def __init__(self):
         self.file_handler = FileHandler()
         
     def write_results(self, results, output_file):
-        """将识别结果写入Excel文件"""
+        """将识别结果写入Excel文件（流式写入，内存占用不随行数增长）"""
+        writer = StreamingExcelWriter(output_file)
         try:
-            # 确保输出目录存在
-            self.file_handler.ensure_directory_exists(output_file)
-            
-            # 创建工作簿
-            workbook = Workbook()
-            worksheet = workbook.active
-            worksheet.title = "身份证信息提取结果"
-            
-            # 设置样式
-            self._setup_styles(worksheet)
-            
-            # 写入表头
-            self._write_header(worksheet)
-            
-            # 写入数据
-            self._write_data(worksheet, results)
-            
-            # 调整列宽
-            self._adjust_column_widths(worksheet)
-            
-            # 添加统计信息
-            self._add_summary(worksheet, results)
-            
-            # 保存文件
-            workbook.save(output_file)
-            
-            return True, f"Excel文件已保存: {output_file}"
+            writer.open()
             
+            for result in results:
+                writer.write_row(result)
+                
         except Exception as e:
+            writer.discard()
             return False, f"保存Excel文件失败: {str(e)}"
             
+        return writer.close()
+            
     def _setup_styles(self, worksheet):
         """设置样式"""
         # 定义样式
@@ -153,48 +149,6 @@ class ExcelWriter:
         for column, width in column_widths.items():
             worksheet.column_dimensions[column].width = width
             
-    def _add_summary(self, worksheet, results):
-        """添加统计信息"""
-        if not results:
-            return
-            
-        # 在数据下方添加统计信息
-        last_row = len(results) + 1
-        summary_start_row = last_row + 3
-        
-        # 统计数据
-        total_count = len(results)
-        success_count = sum(1 for r in results if r.get('status') == '成功')
-        failed_count = total_count - success_count
-        success_rate = (success_count / total_count * 100) if total_count > 0 else 0
-        
-        # 写入统计信息
-        summary_data = [
-            ('处理统计', ''),
-            ('总文件数', total_count),
-            ('成功识别', success_count),
-            ('识别失败', failed_count),
-            ('成功率', f'{success_rate:.1f}%'),
-            ('处理时间', datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        ]
-        
-        for i, (label, value) in enumerate(summary_data):
-            row = summary_start_row + i
-            
-            # 标签
-            cell = worksheet.cell(row=row, column=1, value=label)
-            if i == 0:  # 标题行
-                cell.font = Font(name='微软雅黑', size=11, bold=True)
-            else:
-                cell.font = self.data_font
-            cell.alignment = self.data_alignment
-            
-            # 值
-            if value != '':
-                cell = worksheet.cell(row=row, column=2, value=value)
-                cell.font = self.data_font
-                cell.alignment = self.data_alignment
-                
     def create_template_excel(self, output_file):
         """创建Excel模板文件"""
         try:
@@ -229,4 +183,190 @@ class ExcelWriter:
             return True, f"模板文件已创建: {output_file}"
             
         except Exception as e:
-            return False, f"创建模板文件失败: {str(e)}"
\ No newline at end of file
+            return False, f"创建模板文件失败: {str(e)}"
+
+
+class StreamingExcelWriter:
+    """
+    基于openpyxl只写模式的流式Excel写入器
+
+    逐行接收识别结果并立即写出，样式使用共享的命名样式，
+    内存占用不随结果行数增长；关闭时在数据下方追加统计信息（见summary_rows）。
+    include_timing为True时增加单张耗时列，并在关闭时追加"性能统计"工作表。
+    """
+    
+    def __init__(self, output_file, include_timing=EXCEL_INCLUDE_TIMING):
+        self.output_file = output_file
+        self.include_timing = include_timing
+        self.file_handler = FileHandler()
+        self.workbook = None
+        self.worksheet = None
+        
+        # 统计数据（逐行累计）
+        self.total_count = 0
+        self.success_count = 0
+        
+    def open(self):
+        """创建工作簿并写入表头"""
+        # 确保输出目录存在
+        self.file_handler.ensure_directory_exists(self.output_file)
+        
+        self.workbook = Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet("身份证信息提取结果")
+        
+        self._register_styles()
+        
+        # 只写模式下列宽必须在写入数据前设置
+        column_widths = {'A': 30, 'B': 15, 'C': 15, 'D': 12, 'E': 40}
+        headers = list(EXCEL_COLUMNS)
+        if self.include_timing:
+            column_widths['F'] = 14
+            headers.append(EXCEL_TIMING_COLUMN)
+        for column, width in column_widths.items():
+            self.worksheet.column_dimensions[column].width = width
+            
+        self.worksheet.append([self._cell(header, 'idcard_header') for header in headers])
+        
+    def _register_styles(self):
+        """注册共享的命名样式"""
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        data_font = Font(name='微软雅黑', size=10)
+        data_alignment = Alignment(horizontal='left', vertical='center')
+        
+        styles = [
+            NamedStyle(name='idcard_header',
+                       font=Font(name='微软雅黑', size=12, bold=True, color='FFFFFF'),
+                       fill=PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid'),
+                       alignment=Alignment(horizontal='center', vertical='center'),
+                       border=thin_border),
+            NamedStyle(name='idcard_data', font=data_font, alignment=data_alignment, border=thin_border),
+            NamedStyle(name='idcard_success', font=data_font, alignment=data_alignment, border=thin_border,
+                       fill=PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')),
+            NamedStyle(name='idcard_error', font=data_font, alignment=data_alignment, border=thin_border,
+                       fill=PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')),
+            NamedStyle(name='idcard_summary_title', font=Font(name='微软雅黑', size=11, bold=True),
+                       alignment=data_alignment),
+            NamedStyle(name='idcard_summary', font=data_font, alignment=data_alignment)
+        ]
+        for style in styles:
+            self.workbook.add_named_style(style)
+            
+    def _cell(self, value, style):
+        cell = WriteOnlyCell(self.worksheet, value=value)
+        cell.style = style
+        return cell
+        
+    def write_row(self, result):
+        """写入一行识别结果"""
+        status = result.get('status', '')
+        
+        # 根据状态设置背景色
+        if status == '成功':
+            status_style = 'idcard_success'
+        elif status in ['失败', '错误']:
+            status_style = 'idcard_error'
+        else:
+            status_style = 'idcard_data'
+            
+        row = [
+            self._cell(result.get('filename', ''), 'idcard_data'),
+            self._cell(result.get('name', ''), 'idcard_data'),
+            self._cell(result.get('ethnicity', ''), 'idcard_data'),
+            self._cell(status, status_style),
+            self._cell(result.get('note', ''), 'idcard_data')
+        ]
+        if self.include_timing:
+            elapsed = result.get('elapsed')
+            row.append(self._cell(round(elapsed * 1000) if elapsed is not None else '', 'idcard_data'))
+        self.worksheet.append(row)
+        
+        self.total_count += 1
+        if status == '成功':
+            self.success_count += 1
+            
+    def _write_summary(self):
+        """在数据下方追加统计信息"""
+        if self.total_count == 0:
+            return
+            
+        # 与数据之间空两行
+        self.worksheet.append([])
+        self.worksheet.append([])
+        
+        for i, (label, value) in enumerate(summary_rows(self.total_count, self.success_count)):
+            if i == 0:  # 标题行
+                self.worksheet.append([self._cell(label, 'idcard_summary_title')])
+            else:
+                self.worksheet.append([self._cell(label, 'idcard_summary'), self._cell(value, 'idcard_summary')])
+                
+    def _write_performance_sheet(self, performance):
+        """追加性能统计工作表（performance为MetricsAggregator.summary()的输出）"""
+        sheet = self.workbook.create_sheet("性能统计")
+        for column, width in {'A': 28, 'B': 12, 'C': 14, 'D': 14, 'E': 10}.items():
+            sheet.column_dimensions[column].width = width
+            
+        def cell(value, style):
+            item = WriteOnlyCell(sheet, value=value)
+            item.style = style
+            return item
+            
+        latency = performance.get('latency', {})
+        sheet.append([cell('单张耗时（毫秒）', 'idcard_summary_title')])
+        sheet.append([cell('处理文件数', 'idcard_summary'), cell(performance.get('image_count', 0), 'idcard_summary')])
+        for label, key in (('平均', 'mean'), ('中位数', 'p50'), ('P95', 'p95'), ('最大', 'max')):
+            sheet.append([cell(label, 'idcard_summary'), cell(latency.get(key, 0.0), 'idcard_summary')])
+        preprocess = performance.get('preprocess', {})
+        if preprocess.get('megapixels'):
+            sheet.append([cell('预处理（毫秒/百万像素）', 'idcard_summary'),
+                          cell(preprocess['ms_per_megapixel'], 'idcard_summary')])
+            
+        sheet.append([])
+        sheet.append([cell(header, 'idcard_header') for header in ('处理阶段', '次数', '总耗时（毫秒）', '平均（毫秒）', '占比')])
+        for name, stage in performance.get('stages', {}).items():
+            sheet.append([cell(name, 'idcard_data'), cell(stage['count'], 'idcard_data'),
+                          cell(stage['total_ms'], 'idcard_data'), cell(stage['mean_ms'], 'idcard_data'),
+                          cell(f"{stage['share'] * 100:.1f}%", 'idcard_data')])
+                          
+        sheet.append([])
+        sheet.append([cell(header, 'idcard_header') for header in ('OCR配置', '调用次数', '总耗时（毫秒）', '平均（毫秒）')])
+        for name, call in performance.get('ocr_calls', {}).items():
+            sheet.append([cell(name, 'idcard_data'), cell(call['count'], 'idcard_data'),
+                          cell(call['total_ms'], 'idcard_data'), cell(call['mean_ms'], 'idcard_data')])
+                          
+        counters = performance.get('counters', {})
+        if counters:
+            sheet.append([])
+            sheet.append([cell('计数', 'idcard_summary_title')])
+            for name, count in sorted(counters.items()):
+                sheet.append([cell(name, 'idcard_summary'), cell(count, 'idcard_summary')])
+                
+    def close(self, performance=None):
+        """写入统计信息并保存文件（performance为可选的性能汇总，见MetricsAggregator.summary）"""
+        try:
+            self._write_summary()
+            if self.include_timing and performance:
+                self._write_performance_sheet(performance)
+            self.workbook.save(self.output_file)
+            return True, f"Excel文件已保存: {self.output_file}"
+            
+        except Exception as e:
+            return False, f"保存Excel文件失败: {str(e)}"
+            
+        finally:
+            self.workbook = None
+            self.worksheet = None
+            
+    def discard(self):
+        """放弃写入（例如处理被停止时）"""
+        if self.workbook is not None:
+            # 先结束各工作表的行写入，避免未完成的写入生成器在回收时报错
+            for sheet in self.workbook.worksheets:
+                sheet.close()
+            self.workbook.close()
+        self.workbook = None
+        self.worksheet = None
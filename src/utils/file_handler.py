@@ -3,22 +3,66 @@
 文件处理工具
 """
 
+import logging
 import os
+import queue
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # 修复PyInstaller和直接运行的导入问题
 try:
-    from ..config.settings import SUPPORTED_IMAGE_FORMATS
+    from ..config.settings import SUPPORTED_IMAGE_FORMATS, SCAN_RECURSIVE, SCAN_WORKERS, SCAN_SKIP_DIRS, MAX_IMAGE_FILE_SIZE
 except ImportError:
     try:
-        from src.config.settings import SUPPORTED_IMAGE_FORMATS
+        from src.config.settings import SUPPORTED_IMAGE_FORMATS, SCAN_RECURSIVE, SCAN_WORKERS, SCAN_SKIP_DIRS, MAX_IMAGE_FILE_SIZE
     except ImportError:
         # 动态路径处理
         current_dir = os.path.dirname(__file__)
         parent_dir = os.path.dirname(current_dir)
         sys.path.insert(0, parent_dir)
         
-        from config.settings import SUPPORTED_IMAGE_FORMATS
+        from config.settings import SUPPORTED_IMAGE_FORMATS, SCAN_RECURSIVE, SCAN_WORKERS, SCAN_SKIP_DIRS, MAX_IMAGE_FILE_SIZE
+
+
+logger = logging.getLogger('idcard_ocr.file_handler')
+
+
+class ImageScanner:
+    """
+    后台扫描图片文件
+
+    扫描在后台线程中进行，找到的文件立即可以迭代取出，识别可以在扫描完成前开始。
+    found为目前已找到的文件数，finished表示扫描是否结束。
+    """
+    
+    def __init__(self, paths):
+        self.found = 0
+        self.finished = False
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(paths,), daemon=True)
+        self._thread.start()
+        
+    def _run(self, paths):
+        try:
+            for path in paths:
+                self.found += 1
+                self._queue.put(path)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._queue.put(None)
+            
+    def __iter__(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                if self.error is not None:
+                    raise ValueError(f"Failed to read folder: {self.error}")
+                return
+            yield path
 
 
 class FileHandler:
@@ -26,10 +70,23 @@ class FileHandler:
     def __init__(self):
         pass
         
-    def get_image_files(self, folder_path):
-        """获取文件夹中的所有图片文件"""
-        image_files = []
+    def get_image_files(self, folder_path, recursive=False, workers=1):
+        """获取文件夹中的所有图片文件（按路径排序）"""
+        image_files = sorted(self.iter_image_files(folder_path, recursive, workers))
+        logger.info("Total valid image files found: %s", len(image_files))
+        return image_files
+        
+    def scan_image_files(self, folder_path, recursive=SCAN_RECURSIVE, workers=SCAN_WORKERS):
+        """在后台线程中扫描图片文件，返回可迭代的ImageScanner"""
+        return ImageScanner(self.iter_image_files(folder_path, recursive, workers))
         
+    def iter_image_files(self, folder_path, recursive=False, workers=1):
+        """
+        逐个产出文件夹中的有效图片文件
+
+        同一文件夹内按文件名顺序产出；recursive为True时包含子文件夹，workers大于1时并行扫描子文件夹。
+        文件夹不存在时立即抛出ValueError。
+        """
         # 标准化路径
         normalized_folder = os.path.normpath(folder_path)
         
@@ -39,48 +96,94 @@ class FileHandler:
         if not os.path.isdir(normalized_folder):
             raise ValueError(f"Path is not a directory: {normalized_folder}")
         
-        print(f"Scanning folder: {normalized_folder}")
+        logger.info("Scanning folder: %s", normalized_folder)
         
+        if recursive and workers > 1:
+            return self._walk_parallel(normalized_folder, workers)
+        return self._walk(normalized_folder, recursive)
+        
+    def _walk(self, folder, recursive):
+        """按深度优先顺序扫描"""
+        pending = [folder]
+        while pending:
+            directory = pending.pop()
+            entries, subdirs = self._list_directory(directory, recursive, top=directory == folder)
+            for entry in entries:
+                if self._is_valid_entry(entry):
+                    yield os.path.normpath(entry.path)
+            # 反向压栈，使子文件夹按名称顺序处理
+            pending.extend(reversed(subdirs))
+            
+    def _walk_parallel(self, folder, workers):
+        """多线程扫描子文件夹，每扫描完一个文件夹就产出其中的文件"""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._scan_directory, folder, True)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    for subdir in subdirs:
+                        futures.add(executor.submit(self._scan_directory, subdir, False))
+                    yield from files
+                    
+    def _scan_directory(self, directory, top):
+        """扫描单个文件夹，返回(有效图片路径列表, 子文件夹列表)"""
+        entries, subdirs = self._list_directory(directory, True, top)
+        files = [os.path.normpath(entry.path) for entry in entries if self._is_valid_entry(entry)]
+        return files, subdirs
+        
+    def _list_directory(self, directory, recursive, top):
+        """列出文件夹内容，返回(按名称排序的扩展名匹配的文件项, 子文件夹路径列表)"""
         try:
-            # 获取文件列表
-            files = os.listdir(normalized_folder)
-            print(f"Found {len(files)} files in directory")
+            with os.scandir(directory) as iterator:
+                entries = list(iterator)
+        except OSError as e:
+            if top:
+                raise ValueError(f"Failed to read folder: {str(e)}")
+            logger.warning("Error reading folder %s: %s", directory, e)
+            return [], []
             
-            for filename in files:
+        entries.sort(key=lambda entry: entry.name)
+        logger.debug("Found %s entries in %s", len(entries), directory)
+        
+        files = []
+        subdirs = []
+        for entry in entries:
+            _, ext = os.path.splitext(entry.name.lower())
+            if ext in SUPPORTED_IMAGE_FORMATS:
+                files.append(entry)
+            elif recursive and entry.name not in SCAN_SKIP_DIRS:
                 try:
-                    file_path = os.path.join(normalized_folder, filename)
-                    
-                    # 标准化文件路径
-                    normalized_file_path = os.path.normpath(file_path)
-                    
-                    # 检查是否是文件
-                    if os.path.isfile(normalized_file_path):
-                        # 检查文件扩展名
-                        _, ext = os.path.splitext(filename.lower())
-                        if ext in SUPPORTED_IMAGE_FORMATS:
-                            # 验证文件可读性
-                            if self.validate_image_file(normalized_file_path)[0]:
-                                image_files.append(normalized_file_path)
-                                print(f"Added image file: {filename}")
-                            else:
-                                print(f"Skipped invalid image: {filename}")
-                        else:
-                            print(f"Skipped non-image file: {filename} (ext: {ext})")
-                    else:
-                        print(f"Skipped non-file: {filename}")
-                        
-                except Exception as file_error:
-                    print(f"Error processing file {filename}: {file_error}")
+                    # DirEntry通常已缓存文件类型，不需要额外的系统调用
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                except OSError:
                     continue
-                        
-        except Exception as e:
-            raise ValueError(f"Failed to read folder: {str(e)}")
+            else:
+                logger.debug("Skipped non-image file: %s (ext: %s)", entry.name, ext)
+        return files, subdirs
         
-        # 按文件名排序
-        image_files.sort()
+    def _is_valid_entry(self, entry):
+        """用DirEntry的缓存信息验证图片文件，避免对每个文件重复stat"""
+        try:
+            if not entry.is_file():
+                logger.debug("Skipped non-file: %s", entry.name)
+                return False
+            valid, message = self._check_file_size(entry.stat().st_size)
+        except OSError as e:
+            logger.warning("Error processing file %s: %s", entry.name, e)
+            return False
+            
+        if not valid:
+            logger.debug("Skipped invalid image: %s (%s)", entry.name, message)
+        return valid
         
-        print(f"Total valid image files found: {len(image_files)}")
-        return image_files
+    def _check_file_size(self, file_size):
+        if file_size == 0:
+            return False, "文件为空"
+        elif file_size > MAX_IMAGE_FILE_SIZE:
+            return False, "文件过大"
+        return True, "文件有效"
         
     def validate_image_file(self, file_path):
         """验证图片文件"""
@@ -98,14 +201,10 @@ class FileHandler:
         # 检查文件大小
         try:
             file_size = os.path.getsize(file_path)
-            if file_size == 0:
-                return False, "文件为空"
-            elif file_size > 50 * 1024 * 1024:  # 50MB限制
-                return False, "文件过大"
         except Exception as e:
             return False, f"无法读取文件信息: {str(e)}"
             
-        return True, "文件有效"
+        return self._check_file_size(file_size)
         
     def ensure_directory_exists(self, file_path):
         """确保目录存在"""
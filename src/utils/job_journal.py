@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+批量任务断点日志
+
+在输出文件旁边维护一个追加写入的JSONL日志，每完成一个文件就记录一行结果。
+程序被停止或崩溃后，使用相同的文件夹、输出文件、预处理档位和识别方法重新开始时可以跳过已完成的文件。
+"""
+
+import json
+import os
+
+
+class JobJournal:
+
+    # 这些状态视为未完成，断点续跑时会重新处理
+    RETRY_STATUSES = ('处理错误', '文件不存在')
+
+    def __init__(self, output_file, folder, profile=None, method=None):
+        """
+        output_file: 结果输出文件，日志保存在其旁边
+        folder: 处理的图片文件夹
+        profile, method: 预处理档位和识别方法；与旧日志记录的不一致时旧结果不可复用，重新开始
+        """
+        self.journal_path = output_file + '.journal.jsonl'
+        self.folder = os.path.normpath(folder)
+        self.profile = profile
+        self.method = method
+        self.completed = {}
+        self._file = None
+
+    def open(self):
+        """打开日志：同一任务（文件夹、档位和识别方法都相同）的旧日志会被读取用于续跑，否则重新开始"""
+        loaded = self._load() if os.path.exists(self.journal_path) else None
+
+        if loaded is None:
+            self.completed = {}
+            mode = 'w'
+        else:
+            self.completed, valid_length = loaded
+            # 截掉崩溃时写了一半的最后一行，新结果从完整的行之后开始写
+            os.truncate(self.journal_path, valid_length)
+            mode = 'a'
+
+        self._file = open(self.journal_path, mode, encoding='utf-8')
+        if mode == 'w':
+            self._write(self._header())
+        return self.completed
+
+    def _header(self):
+        return {'type': 'job', 'folder': self.folder, 'profile': self.profile, 'method': self.method}
+
+    def _load(self):
+        """
+        读取旧日志，返回(已完成的结果, 最后一个完整行之后的字节位置)
+
+        任务信息行缺失、损坏或与本次任务不一致时返回None（重新开始）
+        """
+        completed = {}
+        valid_length = 0
+        with open(self.journal_path, 'rb') as f:
+            for index, line in enumerate(f):
+                if not line.endswith(b'\n'):
+                    # 崩溃时可能留下写了一半的最后一行
+                    break
+                valid_length += len(line)
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    if index == 0:
+                        return None
+                    continue
+
+                if index == 0:
+                    if entry != self._header():
+                        return None
+                    continue
+
+                if entry.get('type') == 'result' and entry.get('status') not in self.RETRY_STATUSES:
+                    row = dict(entry)
+                    del row['type']
+                    completed[row['path']] = row
+
+        if valid_length == 0:
+            return None
+        return completed, valid_length
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def record(self, row):
+        """记录一个文件的处理结果"""
+        if row.get('resumed'):
+            return
+        entry = {'type': 'result'}
+        entry.update(row)
+        self._write(entry)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """任务全部完成并保存结果后删除日志"""
+        self.close()
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+日志配置
+
+各模块使用"idcard_ocr.<模块名>"命名的logger，并以%格式化参数的方式记录日志，
+级别未启用时不会格式化字符串也不会产生任何输出。可选的JSONL日志文件便于事后分析。
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+
+
+LOGGER_NAME = 'idcard_ocr'
+
+CONSOLE_FORMAT = '%(levelname)s %(name)s: %(message)s'
+
+# 最近一次setup_logging的参数，工作进程据此使用相同的日志配置
+_active_config = {}
+
+
+class JsonlHandler(logging.Handler):
+    """把日志记录逐行写为JSON（追加写入，多个工作进程可共用同一个文件）"""
+
+    def __init__(self, path):
+        super().__init__()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, record):
+        try:
+            entry = {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+                'level': record.levelname,
+                'logger': record.name,
+                'process': record.process,
+                'message': record.getMessage()
+            }
+            if record.exc_info:
+                entry['exception'] = logging.Formatter().formatException(record.exc_info)
+            # 整行一次写出，避免多进程交错
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            super().close()
+
+
+def get_logger(name):
+    """获取模块logger，例如get_logger('recognizer') -> idcard_ocr.recognizer"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def setup_logging(level='WARNING', module_levels=None, jsonl_path=None, console=True):
+    """
+    配置idcard_ocr下所有logger（可重复调用，之前安装的处理器会被替换）
+
+    level: 默认级别，如'DEBUG'、'INFO'、'WARNING'
+    module_levels: 单独设置某些模块的级别，如{'recognizer': 'DEBUG'}
+    jsonl_path: 可选的JSONL日志文件路径
+    console: 是否输出到标准错误（打包后的窗口程序没有控制台时自动跳过）
+    """
+    global _active_config
+    for name in _active_config.get('module_levels', {}):
+        get_logger(name).setLevel(logging.NOTSET)
+    _active_config = {'level': level, 'module_levels': dict(module_levels or {}),
+                      'jsonl_path': jsonl_path, 'console': console}
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    logger.setLevel(level)
+    logger.propagate = False
+
+    if console and sys.stderr is not None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        logger.addHandler(handler)
+
+    if jsonl_path:
+        logger.addHandler(JsonlHandler(jsonl_path))
+
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+
+    for name, module_level in (module_levels or {}).items():
+        get_logger(name).setLevel(module_level)
+
+    return logger
+
+
+def get_logging_config():
+    """返回最近一次setup_logging的参数（未配置时为空字典）"""
+    return dict(_active_config)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+识别流水线的耗时与计数统计
+
+PipelineMetrics记录单张图片各处理阶段的耗时、每次Tesseract调用的配置和耗时以及各类计数；
+MetricsAggregator把一批图片的统计汇总为性能报告。
+"""
+
+import math
+import time
+from contextlib import contextmanager
+
+
+# 图像预处理的各阶段（ImagePreprocessor.preprocess_for_ocr），用于计算每百万像素的预处理耗时
+PREPROCESS_STAGES = ('load_image', 'resize_image', 'denoise_image', 'enhance_contrast', 'detect_id_card')
+
+
+def percentile(sorted_values, percent):
+    """按最近秩法计算百分位数（sorted_values需已排序）"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+
+class PipelineMetrics:
+
+    def __init__(self):
+        self.stages = {}
+        self.ocr_calls = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """统计一个处理阶段的耗时（同名阶段累加）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    @contextmanager
+    def ocr_call(self, config_name):
+        """统计一次Tesseract调用（抛出异常的调用另计入ocr_errors）"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment('ocr_errors')
+            raise
+        finally:
+            call = self.ocr_calls.setdefault(config_name, [0, 0.0])
+            call[0] += 1
+            call[1] += time.perf_counter() - start
+
+    def increment(self, name, count=1):
+        self.counters[name] = self.counters.get(name, 0) + count
+
+    def to_dict(self):
+        """导出为可序列化的字典（耗时单位毫秒）"""
+        return {
+            'stages': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            'ocr_calls': {name: {'count': count, 'ms': round(seconds * 1000, 3)}
+                          for name, (count, seconds) in self.ocr_calls.items()},
+            'counters': dict(self.counters)
+        }
+
+
+class _NullMetrics:
+    """不做任何统计的占位对象，避免在调用处判断是否启用统计"""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    @contextmanager
+    def ocr_call(self, config_name):
+        yield
+
+    def increment(self, name, count=1):
+        pass
+
+    def to_dict(self):
+        return {}
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def merge_metrics(*metrics):
+    """合并同一张图片在不同阶段（可能在不同进程中）得到的统计（PipelineMetrics.to_dict()的输出）"""
+    merged = {'stages': {}, 'ocr_calls': {}, 'counters': {}}
+    for item in metrics:
+        if not item:
+            continue
+        for name, ms in item.get('stages', {}).items():
+            merged['stages'][name] = round(merged['stages'].get(name, 0.0) + ms, 3)
+        for name, call in item.get('ocr_calls', {}).items():
+            total = merged['ocr_calls'].setdefault(name, {'count': 0, 'ms': 0.0})
+            total['count'] += call['count']
+            total['ms'] = round(total['ms'] + call['ms'], 3)
+        for name, count in item.get('counters', {}).items():
+            merged['counters'][name] = merged['counters'].get(name, 0) + count
+    return merged
+
+
+class MetricsAggregator:
+
+    def __init__(self):
+        self.image_count = 0
+        self.elapsed = []
+        self.stages = {}
+        self.ocr_calls = {}
+        self.counters = {}
+
+    def add(self, metrics, elapsed=None):
+        """累加一张图片的统计（metrics为PipelineMetrics.to_dict()的输出，elapsed单位秒）"""
+        self.image_count += 1
+        if elapsed is not None:
+            self.elapsed.append(elapsed * 1000)
+        if not metrics:
+            return
+
+        for name, ms in metrics.get('stages', {}).items():
+            stage = self.stages.setdefault(name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += ms
+        for name, call in metrics.get('ocr_calls', {}).items():
+            total = self.ocr_calls.setdefault(name, [0, 0.0])
+            total[0] += call['count']
+            total[1] += call['ms']
+        for name, count in metrics.get('counters', {}).items():
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def summary(self):
+        """汇总报告（耗时单位毫秒）"""
+        ordered = sorted(self.elapsed)
+        stage_total = sum(total for _, total in self.stages.values()) or 1.0
+        # 按解码得到的像素数计算预处理耗时，便于比较不同预处理档位和图片尺寸
+        megapixels = self.counters.get('decoded_pixels', 0) / 1e6
+        preprocess_total = sum(self.stages[name][1] for name in PREPROCESS_STAGES if name in self.stages)
+        return {
+            'image_count': self.image_count,
+            'latency': {
+                'mean': round(sum(ordered) / len(ordered), 1) if ordered else 0.0,
+                'p50': round(percentile(ordered, 50), 1),
+                'p95': round(percentile(ordered, 95), 1),
+                'max': round(ordered[-1], 1) if ordered else 0.0
+            },
+            'stages': {
+                name: {
+                    'count': count,
+                    'total_ms': round(total, 1),
+                    'mean_ms': round(total / count, 2),
+                    'share': round(total / stage_total, 3)
+                }
+                for name, (count, total) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+            },
+            'ocr_calls': {
+                name: {
+                    'count': count,
+                    'total_ms': round(total, 1),
+                    'mean_ms': round(total / count, 2) if count else 0.0
+                }
+                for name, (count, total) in sorted(self.ocr_calls.items(), key=lambda item: -item[1][1])
+            },
+            'counters': dict(self.counters),
+            'preprocess': {
+                'megapixels': round(megapixels, 3),
+                'ms_per_megapixel': round(preprocess_total / megapixels, 2) if megapixels else 0.0
+            }
+        }
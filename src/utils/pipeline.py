@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段流水线
+
+把处理过程拆成若干阶段（如 读取 → 解码/预处理 → OCR → 后处理），各阶段有自己的并发数，
+阶段之间用有界队列连接：下游处理不过来时上游自然阻塞，整体吞吐由最慢的阶段决定；
+同时在流水线中的条目数不超过max_in_flight，内存占用随之受限。
+
+流水线在后台线程的asyncio事件循环中运行，耗时的阶段在线程池或进程池中执行，
+事件循环只负责在阶段之间传递条目。run()以普通生成器的形式产出结果，GUI后台线程和命令行都可以直接使用。
+"""
+
+import asyncio
+import inspect
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger('idcard_ocr.pipeline')
+
+# 阶段结束标记
+_DONE = object()
+
+
+class Stage:
+    """流水线中的一个阶段"""
+
+    def __init__(self, name, func, concurrency=1, executor=None, skip=None, ordered=False):
+        """
+        name: 阶段名称（用于统计）
+        func: 处理函数，接收一个条目并返回交给下一阶段的条目；
+              executor为None时在事件循环中直接调用（应当很快完成），可以是协程函数
+        concurrency: 本阶段同时处理的条目数
+        executor: 可选的线程池，func在其中执行
+        skip: 可选的判断函数，返回True的条目不经处理直接交给下一阶段
+        ordered: True时条目按输入顺序交给func（concurrency固定为1），结果与上游各条目的完成顺序无关
+        """
+        if ordered and concurrency != 1:
+            raise ValueError("按输入顺序处理的阶段只能有一个并发")
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, concurrency)
+        self.executor = executor
+        self.skip = skip
+        self.ordered = ordered
+
+        self.queue = None
+        self.running = 0
+        self.active = 0
+        self.processed = 0
+        self.skipped = 0
+        self.busy = 0.0
+        self.max_queued = 0
+
+
+class StagedPipeline:
+
+    def __init__(self, stages, queue_size=8, max_in_flight=32, ordered=True, monitor_interval=None):
+        """
+        stages: Stage列表，按处理顺序排列
+        queue_size: 每个阶段输入队列的长度上限
+        max_in_flight: 已从输入取出但尚未被调用方取走的条目数上限
+        ordered: True按输入顺序产出结果，False按完成顺序产出
+        monitor_interval: 每隔多少秒以INFO级别记录一次各阶段的队列深度，None表示不记录
+        """
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.ordered = ordered
+        self.monitor_interval = monitor_interval
+
+        self.discovered = 0
+        self.in_flight = 0
+        self._start_time = None
+        self._loop = None
+        self._task = None
+        self._window = None
+        self._output = None
+        self._started = threading.Event()
+
+    def run(self, source):
+        """从source（任意可迭代对象，在后台线程中迭代）取出条目，逐个产出经过所有阶段的结果"""
+        self._output = queue.Queue()
+        self._started.clear()
+        thread = threading.Thread(target=self._run_loop, args=(source,), name='pipeline', daemon=True)
+        thread.start()
+        try:
+            while True:
+                kind, value = self._output.get()
+                if kind == 'error':
+                    raise value
+                if kind == 'done':
+                    return
+                # 调用方取走一个条目后才允许再从输入中取出新条目
+                self._call_in_loop(self._release)
+                yield value
+        finally:
+            if thread.is_alive():
+                self._started.wait()
+                self._call_in_loop(self._task.cancel)
+                thread.join()
+
+    def snapshot(self):
+        """各阶段的状态：排队数、最大排队数、处理中和已处理的条目数、累计处理耗时和利用率"""
+        elapsed = time.perf_counter() - self._start_time if self._start_time is not None else 0.0
+        stats = {}
+        for stage in self.stages:
+            capacity = elapsed * stage.concurrency
+            stats[stage.name] = {
+                'concurrency': stage.concurrency,
+                'queued': stage.queue.qsize() if stage.queue is not None else 0,
+                'max_queued': stage.max_queued,
+                'active': stage.active,
+                'processed': stage.processed,
+                'skipped': stage.skipped,
+                'busy_s': round(stage.busy, 3),
+                'utilization': round(stage.busy / capacity, 3) if capacity else 0.0
+            }
+        return stats
+
+    def format_depths(self):
+        """排队数/处理中，如'read 0/4 | preprocess 8/8 | ocr 3/8'"""
+        return ' | '.join(f"{name} {stat['queued']}/{stat['active']}" for name, stat in self.snapshot().items())
+
+    def _call_in_loop(self, callback):
+        try:
+            self._loop.call_soon_threadsafe(callback)
+        except RuntimeError:
+            # 所有条目都已产出，事件循环已经结束
+            pass
+
+    def _run_loop(self, source):
+        try:
+            asyncio.run(self._main(source))
+        except asyncio.CancelledError:
+            # 调用方提前结束了迭代
+            return
+        except BaseException as e:
+            self._output.put(('error', e))
+            return
+        self._output.put(('done', None))
+
+    async def _main(self, source):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._window = asyncio.Semaphore(self.max_in_flight)
+        self._start_time = time.perf_counter()
+        self._started.set()
+
+        inboxes = [asyncio.Queue(self.queue_size) for _ in self.stages]
+        # 最后一个队列由结果收集协程读取，长度受max_in_flight限制
+        inboxes.append(asyncio.Queue())
+        for stage, inbox in zip(self.stages, inboxes):
+            stage.queue = inbox
+            stage.running = stage.concurrency
+
+        downstream = [stage.concurrency for stage in self.stages[1:]] + [1]
+        tasks = [asyncio.create_task(self._feed(source, inboxes[0]))]
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.concurrency):
+                tasks.append(asyncio.create_task(
+                    self._work(stage, inboxes[index], inboxes[index + 1], downstream[index])))
+        tasks.append(asyncio.create_task(self._collect(inboxes[-1])))
+        monitor = asyncio.create_task(self._monitor()) if self.monitor_interval else None
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if monitor is not None:
+                monitor.cancel()
+
+    async def _feed(self, source, outbox):
+        """发现阶段：在单独的线程中迭代输入（如边扫描边产出的文件列表）"""
+        iterator = iter(source)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pipeline-discover')
+        try:
+            while True:
+                await self._window.acquire()
+                item = await self._loop.run_in_executor(executor, next, iterator, _DONE)
+                if item is _DONE:
+                    self._window.release()
+                    break
+                self.in_flight += 1
+                await self._put(outbox, (self.discovered, item), self.stages[0] if self.stages else None)
+                self.discovered += 1
+        finally:
+            executor.shutdown(wait=False)
+
+        first = self.stages[0].concurrency if self.stages else 1
+        for _ in range(first):
+            await outbox.put(_DONE)
+
+    async def _work(self, stage, inbox, outbox, downstream):
+        next_stage = self._next_stage(stage)
+        # 按输入顺序处理时，先到的条目在此等待排在前面的条目
+        waiting = {}
+        next_seq = 0
+        while True:
+            entry = await inbox.get()
+            if entry is _DONE:
+                break
+            if not stage.ordered:
+                await self._process(stage, entry, outbox, next_stage)
+                continue
+            waiting[entry[0]] = entry
+            while next_seq in waiting:
+                await self._process(stage, waiting.pop(next_seq), outbox, next_stage)
+                next_seq += 1
+
+        # 本阶段最后一个结束的协程通知下一阶段的所有协程结束
+        stage.running -= 1
+        if stage.running == 0:
+            for _ in range(downstream):
+                await outbox.put(_DONE)
+
+    async def _process(self, stage, entry, outbox, next_stage):
+        seq, item = entry
+        if stage.skip is not None and stage.skip(item):
+            stage.skipped += 1
+        else:
+            stage.active += 1
+            start = time.perf_counter()
+            try:
+                if stage.executor is not None:
+                    item = await self._loop.run_in_executor(stage.executor, stage.func, item)
+                else:
+                    item = stage.func(item)
+                    if inspect.isawaitable(item):
+                        item = await item
+            finally:
+                stage.active -= 1
+                stage.busy += time.perf_counter() - start
+            stage.processed += 1
+        await self._put(outbox, (seq, item), next_stage)
+
+    async def _put(self, outbox, entry, stage):
+        await outbox.put(entry)
+        if stage is not None:
+            stage.max_queued = max(stage.max_queued, outbox.qsize())
+
+    def _next_stage(self, stage):
+        index = self.stages.index(stage)
+        return self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+    async def _collect(self, inbox):
+        """把完成的条目交给调用方；按输入顺序产出时，先到的条目在此等待排在前面的条目"""
+        waiting = {}
+        next_seq = 0
+        while True:
+            entry = await inbox.get()
+            if entry is _DONE:
+                break
+            seq, item = entry
+            if not self.ordered:
+                self._output.put(('item', item))
+                continue
+            waiting[seq] = item
+            while next_seq in waiting:
+                self._output.put(('item', waiting.pop(next_seq)))
+                next_seq += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self._window.release()
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.monitor_interval)
+            logger.info("流水线队列（排队/处理中）: %s，在途 %s", self.format_depths(), self.in_flight)
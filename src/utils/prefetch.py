@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+图片文件预读
+
+在识别当前图片的同时，用后台线程提前读取后面若干个文件，隐藏磁盘或网络共享盘的读取延迟。
+文件用np.fromfile直接读入numpy数组（没有中间的bytes副本），可以直接交给cv2.imdecode解码。
+"""
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+logger = logging.getLogger('idcard_ocr.prefetch')
+
+
+def read_image_buffer(image_path):
+    """把文件内容读入uint8数组，读取失败时返回None（由后续处理报告具体错误）"""
+    try:
+        return np.fromfile(image_path, dtype=np.uint8)
+    except OSError as e:
+        logger.debug("Prefetch failed for %s: %s", image_path, e)
+        return None
+
+
+class ImagePrefetcher:
+    """
+    按顺序产出(路径, 文件内容)，后台最多预读depth个文件
+
+    max_bytes: 已提交预读但尚未取走的文件总大小上限，按文件大小计算，读取尚未完成的文件也计入（至少保留一个在途文件）
+    skip: 可选的集合，其中的路径不预读（如断点续跑时已完成的文件），产出时内容为None
+    """
+
+    def __init__(self, image_files, depth=8, max_bytes=256 * 1024 * 1024, threads=4, skip=None):
+        self.image_files = image_files
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self.threads = max(1, threads)
+        self.skip = skip or ()
+
+    def _file_size(self, image_path):
+        """预读前按文件大小估计将占用的字节数（读取尚未完成时也计入上限）"""
+        try:
+            return os.stat(image_path).st_size
+        except OSError:
+            return 0
+
+    def __iter__(self):
+        files = iter(self.image_files)
+        pending = deque()
+        # 已提交预读（含尚未读完）的文件总大小
+        buffered = 0
+        executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='prefetch')
+        exhausted = False
+        try:
+            while True:
+                # 补充预读任务：数量和预读的字节数都不超过上限
+                while not exhausted and len(pending) < self.depth and (not pending or buffered < self.max_bytes):
+                    image_path = next(files, None)
+                    if image_path is None:
+                        exhausted = True
+                        break
+                    if image_path in self.skip:
+                        pending.append((image_path, None, 0))
+                    else:
+                        size = self._file_size(image_path)
+                        buffered += size
+                        pending.append((image_path, executor.submit(read_image_buffer, image_path), size))
+
+                if not pending:
+                    return
+
+                image_path, future, size = pending.popleft()
+                buffered -= size
+                yield image_path, future.result() if future is not None else None
+        finally:
+            for _, future, _ in pending:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown(wait=False)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+识别结果缓存
+
+以图片内容哈希和识别流水线指纹为键，把识别结果保存在本地SQLite数据库中。
+图片内容和识别配置都未变化时直接返回上次的结果；总大小超过上限时按最近访问时间淘汰。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class ResultCache:
+
+    # 每写入多少条记录检查一次总大小
+    EVICT_CHECK_INTERVAL = 100
+
+    def __init__(self, db_path, fingerprint, max_bytes=200 * 1024 * 1024):
+        """
+        db_path: 缓存数据库文件路径
+        fingerprint: 识别流水线指纹（见IDCardRecognizer.get_pipeline_fingerprint）
+        max_bytes: 缓存结果的总大小上限
+        """
+        self.db_path = db_path
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self._puts_since_check = 0
+
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        # 多个工作进程可能同时读写同一个数据库
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' content_hash TEXT NOT NULL,'
+            ' fingerprint TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' accessed REAL NOT NULL,'
+            ' PRIMARY KEY (content_hash, fingerprint))'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed)')
+        self.conn.commit()
+
+    @staticmethod
+    def hash_file(file_path, chunk_size=1024 * 1024):
+        """计算文件内容的SHA-256"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_bytes(data):
+        """计算内存中文件内容（bytes或uint8数组）的SHA-256，结果与hash_file一致"""
+        return hashlib.sha256(memoryview(data)).hexdigest()
+
+    def get(self, content_hash):
+        """查询缓存，未命中返回None"""
+        row = self.conn.execute(
+            'SELECT value FROM results WHERE content_hash = ? AND fingerprint = ?',
+            (content_hash, self.fingerprint)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self.conn.execute(
+            'UPDATE results SET accessed = ? WHERE content_hash = ? AND fingerprint = ?',
+            (time.time(), content_hash, self.fingerprint)
+        )
+        self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, content_hash, result):
+        """写入识别结果"""
+        value = json.dumps(result, ensure_ascii=False)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO results (content_hash, fingerprint, value, size, accessed)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (content_hash, self.fingerprint, value, len(value.encode('utf-8')), time.time())
+        )
+        self.conn.commit()
+
+        self._puts_since_check += 1
+        if self._puts_since_check >= self.EVICT_CHECK_INTERVAL:
+            self._puts_since_check = 0
+            self.evict()
+
+    def evict(self):
+        """总大小超过上限时，优先淘汰其他指纹的旧结果，再按最近访问时间淘汰"""
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        rows = self.conn.execute(
+            'SELECT content_hash, fingerprint, size FROM results'
+            ' ORDER BY fingerprint = ?, accessed',
+            (self.fingerprint,)
+        ).fetchall()
+        for content_hash, fingerprint, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute(
+                'DELETE FROM results WHERE content_hash = ? AND fingerprint = ?',
+                (content_hash, fingerprint)
+            )
+            total -= size
+            removed += 1
+
+        self.conn.commit()
+        return removed
+
+    def clear(self):
+        """清空缓存"""
+        self.conn.execute('DELETE FROM results')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量识别引擎（多进程流水线）验证脚本
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+import cv2
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from utils import batch_engine
+from utils.batch_engine import BatchEngine, store_in_cache
+from test_duplicate_index import render_card
+
+
+def run_with_timeout(engine, files, timeout=120):
+    """在后台线程中跑完整批，超时说明有文件一直在等待（如等待原图结果的近似重复图片）"""
+    rows = []
+    errors = []
+
+    def consume():
+        try:
+            rows.extend(engine.run(files))
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "批量识别未在限定时间内结束"
+    if errors:
+        raise errors[0]
+    return rows
+
+
+def test_item_errors_do_not_abort_batch():
+    """单个文件在某个阶段抛出异常时只得到"处理错误"结果行，其余文件继续处理，等待它的近似重复图片不会卡住"""
+    original_read = batch_engine.read_image_buffer
+    original_fill_row = batch_engine.fill_row
+
+    def read_image_buffer(image_path):
+        if os.path.basename(image_path) == 'huge.jpg':
+            raise MemoryError("文件过大")
+        return original_read(image_path)
+
+    def fill_row(row, result, debug=False):
+        # 只在主进程的后处理阶段对原图抛出异常
+        if os.path.basename(row['path']) == 'a.jpg' and os.getpid() == main_pid:
+            raise RuntimeError("后处理失败")
+        return original_fill_row(row, result, debug)
+
+    main_pid = os.getpid()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = []
+        for filename, name in (('a.jpg', 'LIU'), ('a_copy.jpg', 'LIU'), ('huge.jpg', 'HU'), ('b.jpg', 'ZHAO')):
+            path = os.path.join(temp_dir, filename)
+            cv2.imwrite(path, render_card(name))
+            files.append(path)
+
+        batch_engine.read_image_buffer = read_image_buffer
+        batch_engine.fill_row = fill_row
+        try:
+            engine = BatchEngine(max_workers=2, use_cache=False, prefetch=True, dedup=True)
+            rows = run_with_timeout(engine, files)
+        finally:
+            batch_engine.read_image_buffer = original_read
+            batch_engine.fill_row = original_fill_row
+
+    statuses = {row['filename']: row['status'] for row in rows}
+    print(f"   结果: {statuses}")
+    assert [row['path'] for row in rows] == files
+    assert statuses['huge.jpg'] == statuses['a.jpg'] == "处理错误"
+    assert 'MemoryError' in rows[2]['traceback'] and "后处理失败" in rows[0]['note']
+    # 原图出错时近似重复图片重新完整识别，其余文件正常处理
+    assert statuses['a_copy.jpg'] != "处理错误" and not rows[1].get('duplicate_of')
+    assert statuses['b.jpg'] != "处理错误"
+    # 工作进程中的OCR配置统计随结果返回并在主进程汇总
+    assert sum(item['attempts'] for item in engine.get_config_stats()['name'].values()) > 0
+
+
+class RecordingCache:
+    """记录写入的结果缓存"""
+
+    def __init__(self):
+        self.stored = {}
+
+    def put(self, content_hash, result):
+        self.stored[content_hash] = result
+
+
+def test_only_usable_results_are_cached():
+    """姓名民族都为空或有OCR调用出错的结果不缓存（可能是Tesseract未安装等环境问题）"""
+    cache = RecordingCache()
+    ok = {'success': True, 'name': '张三', 'ethnicity': '汉族', 'metrics': {'counters': {}}}
+    cases = {
+        'ok': ok,
+        'failed': {'success': False, 'error': 'x'},
+        'empty': dict(ok, name='', ethnicity=''),
+        'ocr_error': dict(ok, metrics={'counters': {'ocr_errors': 1}}),
+        'duplicate': dict(ok, duplicate_of='/data/a.jpg'),
+        'name_only': dict(ok, ethnicity=''),
+    }
+    for content_hash, result in cases.items():
+        store_in_cache(cache, content_hash, result)
+    assert sorted(cache.stored) == ['name_only', 'ok']
+    assert 'metrics' not in cache.stored['ok']
+
+
+def main():
+    """主函数"""
+    print("开始批量识别引擎验证")
+    print("=" * 50)
+    for test in (test_item_errors_do_not_abort_batch, test_only_usable_results_are_cached):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("批量识别引擎验证通过！")
+
+
+if __name__ == "__main__":
+    main()
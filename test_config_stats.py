@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR配置命中率统计验证脚本
+"""
+
+import os
+import sys
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from ocr.config_stats import OCRConfigStats
+
+
+def record(stats, config_name, hit=False, early_exit=False):
+    stats.record_attempt(config_name)
+    if hit:
+        stats.record_hit(config_name, early_exit)
+
+
+def test_order_by_hit_rate():
+    """按命中率排序，命中率相同时保持默认顺序"""
+    stats = OCRConfigStats(['default', 'single_line', 'sparse'])
+    assert stats.ordered() == ['default', 'single_line', 'sparse']
+    record(stats, 'default')
+    record(stats, 'sparse', hit=True)
+    assert stats.ordered() == ['sparse', 'single_line', 'default']
+
+
+def test_delta_and_merge():
+    """各工作进程的新增统计汇总后与在同一进程中统计的结果相同"""
+    workers = [OCRConfigStats(['default', 'sparse']) for _ in range(2)]
+    total = OCRConfigStats([])
+
+    record(workers[0], 'default', hit=True, early_exit=True)
+    record(workers[1], 'default')
+    record(workers[1], 'sparse', hit=True)
+    for stats in workers:
+        total.merge(stats.take_delta())
+    assert workers[0].take_delta() == {}
+
+    record(workers[0], 'sparse')
+    total.merge(workers[0].take_delta())
+
+    merged = total.to_dict()
+    print(f"   汇总结果: {merged}")
+    assert merged['default'] == {'attempts': 2, 'hits': 1, 'early_exits': 1, 'hit_rate': 0.5}
+    assert merged['sparse'] == {'attempts': 2, 'hits': 1, 'early_exits': 0, 'hit_rate': 0.5}
+
+
+def main():
+    """主函数"""
+    print("开始OCR配置命中率统计验证")
+    print("=" * 50)
+    for test in (test_order_by_hit_rate, test_delta_and_merge):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("OCR配置命中率统计验证通过！")
+
+
+if __name__ == "__main__":
+    main()
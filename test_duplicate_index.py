@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复图片检测验证脚本
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from config.settings import ID_CARD_REGIONS, DEDUP_MAX_DISTANCE, DEDUP_MAX_MISMATCH
+from ocr.recognizer import IDCardRecognizer
+from utils.duplicate_index import DuplicateIndex, signature_mismatch
+
+# 不限制哈希距离时，所有登记过的图片都作为候选，只靠文字像素确认
+ANY_DISTANCE = 10 ** 6
+
+_recognizer = None
+
+
+def get_recognizer():
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = IDCardRecognizer()
+    return _recognizer
+
+
+def render_card(name, ethnicity='HAN', seed=0, angle=0.0):
+    """在深色背景上渲染一张身份证样式的图片（拉丁字母姓名，不依赖中文字体）"""
+    width, height = 856, 540
+    card = np.full((height, width, 3), (236, 240, 244), dtype=np.uint8)
+    cv2.rectangle(card, (0, 0), (width - 1, height - 1), (180, 190, 200), 3)
+    for label, value, region in (('NAME', name, ID_CARD_REGIONS['name']),
+                                 ('ETHN', ethnicity, ID_CARD_REGIONS['ethnicity'])):
+        y = int((region['y'] + region['height'] * 0.75) * height)
+        cv2.putText(card, label, (int(0.02 * width), y), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (160, 120, 90), 2)
+        cv2.putText(card, value, (int((region['x'] + 0.01) * width), y), cv2.FONT_HERSHEY_SIMPLEX, 1.4,
+                    (20, 20, 20), 3)
+    for i, line in enumerate(('SEX M', 'BORN 1990 1 1', 'ADDRESS SOME STREET 1')):
+        cv2.putText(card, line, (20, int((0.5 + 0.12 * i) * height)), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (40, 40, 40), 2)
+
+    margin = 170
+    image = np.full((height + 2 * margin, width + 2 * margin, 3), (50, 60, 70), dtype=np.uint8)
+    image[margin:margin + height, margin:margin + width] = card
+    if angle:
+        matrix = cv2.getRotationMatrix2D((image.shape[1] / 2, image.shape[0] / 2), angle, 1)
+        image = cv2.warpAffine(image, matrix, (image.shape[1], image.shape[0]), borderValue=(50, 60, 70))
+    noise = np.random.default_rng(seed).normal(0, 4, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def fingerprint(image, quality=95):
+    """按批量识别的方式计算(区域哈希, 文字像素签名)"""
+    buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1]
+    recognizer = get_recognizer()
+    processed_image = recognizer.prepare_image('card.jpg', buffer)
+    return recognizer.compute_image_hash(processed_image), recognizer.compute_image_signature(processed_image)
+
+
+def distinct_cards():
+    names = [('LIU', 'HAN'), ('HU', 'HAN'), ('ZHAO', 'HAN'), ('ZHOU', 'HAN'), ('LI', 'HAN'), ('ZHAO', 'MIAO')]
+    return {f"{name}/{ethnicity}": fingerprint(render_card(name, ethnicity)) for name, ethnicity in names}
+
+
+def test_distinct_cards_do_not_collide():
+    """不同姓名或民族的卡片互不视为近似重复，即使不限制哈希距离"""
+    cards = distinct_cards()
+    for max_distance in (DEDUP_MAX_DISTANCE, ANY_DISTANCE):
+        index = DuplicateIndex(max_distance, DEDUP_MAX_MISMATCH)
+        for key, (image_hash, signature) in cards.items():
+            assert index.claim(image_hash, key, signature) is None, (max_distance, key)
+        assert len(index) == len(cards)
+
+    keys = list(cards)
+    for i, a in enumerate(keys):
+        for b in keys[i + 1:]:
+            mismatch = signature_mismatch(cards[a][1], cards[b][1])
+            print(f"   {a} / {b}: 不一致比例 {mismatch:.3f}")
+            assert mismatch > DEDUP_MAX_MISMATCH
+
+
+def test_resaved_card_is_duplicate():
+    """同一张卡片以低质量另存、重新拍摄时视为近似重复"""
+    original = render_card('LIU')
+    index = DuplicateIndex(DEDUP_MAX_DISTANCE, DEDUP_MAX_MISMATCH)
+    for key, (image_hash, signature) in distinct_cards().items():
+        index.claim(image_hash, key, signature)
+
+    image_hash, signature = fingerprint(original, quality=40)
+    assert index.claim(image_hash, 'LIU-q40', signature) == 'LIU/HAN'
+    image_hash, signature = fingerprint(render_card('LIU', seed=7))
+    assert index.claim(image_hash, 'LIU-rescan', signature) == 'LIU/HAN'
+
+    # 轻微旋转后重新拍摄：哈希距离可能超出候选范围，但文字像素仍然一致
+    rotated = fingerprint(render_card('LIU', seed=5, angle=3))
+    assert signature_mismatch(rotated[1], fingerprint(original)[1]) <= DEDUP_MAX_MISMATCH
+
+
+def test_signature_mismatch_edge_cases():
+    """签名缺失、字段或尺寸不一致时不视为近似重复"""
+    _, signature = fingerprint(render_card('LIU'))
+    assert signature_mismatch(signature, signature) == 0.0
+    assert signature_mismatch(signature, None) == 1.0
+    assert signature_mismatch(signature, {'name': signature['name']}) == 1.0
+    shape, bits = signature['name']
+    resized = dict(signature, name=((shape[0] + 1, shape[1]), bits))
+    assert signature_mismatch(signature, resized) == 1.0
+
+
+def main():
+    """主函数"""
+    print("开始近似重复检测验证")
+    print("=" * 50)
+    for test in (test_distinct_cards_do_not_collide, test_resaved_card_is_duplicate,
+                 test_signature_mismatch_edge_cases):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("近似重复检测验证通过！")
+
+
+if __name__ == "__main__":
+    main()
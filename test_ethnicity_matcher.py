@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+民族名称匹配验证脚本
+"""
+
+import os
+import sys
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from ocr.ethnicity_matcher import AhoCorasick, BKTree, EthnicityMatcher
+from ocr.recognizer import ETHNICITY_MAP, ETHNICITY_MATCHER
+
+
+def test_exact_match():
+    """精确匹配：取最长词条，分数按覆盖比例计算"""
+    cases = [
+        ('汉', '汉族', 1.0),
+        ('汉族', '汉族', 1.0),
+        ('民族汉', '汉族', 0.667),
+        ('土家族', '土家族', 1.0),
+        ('土家', '土家族', 1.0),
+        ('土', '土族', 1.0),
+        ('维吾尔', '维吾尔族', 1.0),
+        # 形近的"旅"视为"族"字，计入覆盖范围
+        ('汉旅', '汉族', 1.0),
+    ]
+    for text, name, score in cases:
+        match = ETHNICITY_MATCHER.match(text)
+        print(f"   '{text}' -> {match}")
+        assert match is not None and match.method == 'exact'
+        assert (match.name, match.score) == (name, score)
+
+
+def test_fuzzy_match():
+    """模糊匹配：形近字替换计0.5，单字只允许形近字"""
+    match = ETHNICITY_MATCHER.match('汊')
+    assert (match.name, match.score, match.method) == ('汉族', 0.75, 'fuzzy')
+    match = ETHNICITY_MATCHER.match('状族')
+    assert (match.name, match.score, match.method) == ('壮族', 0.75, 'fuzzy')
+    assert ETHNICITY_MATCHER.match('哈') is None
+    assert ETHNICITY_MATCHER.match('国') is None
+    assert ETHNICITY_MATCHER.match('') is None
+
+
+def test_lexicon_order_independent():
+    """匹配结果与词典顺序无关"""
+    reversed_matcher = EthnicityMatcher(dict(reversed(list(ETHNICITY_MAP.items()))))
+    for text in ('土家族', '土家', '民族汉', '汊', '维吾尔族', '蒙古', '高山'):
+        assert reversed_matcher.match(text) == ETHNICITY_MATCHER.match(text), text
+
+
+def test_edit_distance():
+    """形近字加权编辑距离"""
+    assert ETHNICITY_MATCHER.edit_distance('汉', '汊') == 0.5
+    assert ETHNICITY_MATCHER.edit_distance('汉', '回') == 1.0
+    assert ETHNICITY_MATCHER.edit_distance('蒙古', '蒙') == 1.0
+    assert ETHNICITY_MATCHER.edit_distance('', '苗') == 1.0
+
+
+def test_automaton_and_bk_tree():
+    """Aho-Corasick返回所有命中位置，BK树按距离排序返回容差内的词条"""
+    automaton = AhoCorasick(['土', '土家', '家族'])
+    assert sorted(automaton.find_all('土家族')) == [(0, '土'), (0, '土家'), (1, '家族')]
+    assert automaton.find_all('汉族') == []
+
+    def distance(a, b):
+        return abs(len(a) - len(b))
+    tree = BKTree(['a', 'bb', 'ccc', 'dddd'], distance)
+    assert tree.search('xx', 1) == [(0, 'bb'), (1, 'a'), (1, 'ccc')]
+    assert BKTree([], distance).search('a', 1) == []
+
+
+def main():
+    """主函数"""
+    print("开始民族名称匹配验证")
+    print("=" * 50)
+    for test in (test_exact_match, test_fuzzy_match, test_lexicon_order_independent,
+                 test_edit_distance, test_automaton_and_bk_tree):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("民族名称匹配验证通过！")
+
+
+if __name__ == "__main__":
+    main()
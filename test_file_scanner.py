@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片文件扫描验证脚本
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from utils.file_handler import FileHandler
+
+
+def make_tree(root):
+    """创建测试目录：包含子文件夹、调试文件夹、空文件和非图片文件"""
+    layout = {
+        'b.jpg': b'x',
+        'a.png': b'x',
+        'notes.txt': b'x',
+        'empty.jpg': b'',
+        'sub2/d.jpg': b'x',
+        'sub1/c.jpeg': b'x',
+        'sub1/deep/e.bmp': b'x',
+        'debug/a_processed.jpg': b'x',
+    }
+    for relative_path, content in layout.items():
+        path = os.path.join(root, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+
+def relative(root, paths):
+    return [os.path.relpath(path, root).replace(os.sep, '/') for path in paths]
+
+
+def test_flat_scan_order():
+    """不递归时只扫描顶层，按文件名顺序产出，跳过空文件和非图片文件"""
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root)
+        files = relative(root, FileHandler().iter_image_files(root, recursive=False))
+        assert files == ['a.png', 'b.jpg']
+
+
+def test_recursive_scan_order_and_skip_dirs():
+    """递归扫描按深度优先、名称顺序产出，跳过调试文件夹"""
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root)
+        files = relative(root, FileHandler().iter_image_files(root, recursive=True))
+        print(f"   扫描结果: {files}")
+        assert files == ['a.png', 'b.jpg', 'sub1/c.jpeg', 'sub1/deep/e.bmp', 'sub2/d.jpg']
+
+
+def test_parallel_scan_same_files():
+    """并行扫描得到相同的文件集合，后台扫描器产出全部文件"""
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root)
+        handler = FileHandler()
+        expected = ['a.png', 'b.jpg', 'sub1/c.jpeg', 'sub1/deep/e.bmp', 'sub2/d.jpg']
+        assert sorted(relative(root, handler.iter_image_files(root, recursive=True, workers=4))) == expected
+        assert relative(root, handler.get_image_files(root, recursive=True, workers=4)) == expected
+
+        scanner = handler.scan_image_files(root, recursive=True, workers=1)
+        assert relative(root, list(scanner)) == expected
+        assert scanner.finished and scanner.found == len(expected)
+
+
+def test_missing_folder():
+    """文件夹不存在时立即报错"""
+    with tempfile.TemporaryDirectory() as root:
+        try:
+            FileHandler().iter_image_files(os.path.join(root, 'missing'))
+        except ValueError:
+            return
+        raise AssertionError("文件夹不存在时应抛出ValueError")
+
+
+def main():
+    """主函数"""
+    print("开始图片文件扫描验证")
+    print("=" * 50)
+    for test in (test_flat_scan_order, test_recursive_scan_order_and_skip_dirs,
+                 test_parallel_scan_same_files, test_missing_folder):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("图片文件扫描验证通过！")
+
+
+if __name__ == "__main__":
+    main()
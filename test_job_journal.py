@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+断点日志验证脚本
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from utils.job_journal import JobJournal
+
+
+def make_row(path, status='成功'):
+    return {'path': path, 'filename': os.path.basename(path), 'name': '张三', 'ethnicity': '汉', 'status': status}
+
+
+def read_lines(journal_path):
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        return f.read().split('\n')
+
+
+def test_resume_after_partial_line():
+    """崩溃留下的半行被截掉，续写的结果单独成行"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'result.xlsx')
+        journal = JobJournal(output_file, '/data')
+        journal.open()
+        journal.record(make_row('/data/a.jpg'))
+        journal.close()
+        with open(journal.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"type": "result", "path": "/data/b')
+
+        journal = JobJournal(output_file, '/data')
+        completed = journal.open()
+        print(f"   续跑读取到: {list(completed)}")
+        assert list(completed) == ['/data/a.jpg']
+        journal.record(make_row('/data/c.jpg'))
+        journal.close()
+
+        lines = read_lines(journal.journal_path)
+        assert lines[-1] == ''
+        assert json.loads(lines[-2])['path'] == '/data/c.jpg'
+
+        journal = JobJournal(output_file, '/data')
+        completed = journal.open()
+        journal.close()
+        assert sorted(completed) == ['/data/a.jpg', '/data/c.jpg']
+
+
+def test_corrupt_header_starts_new_job():
+    """任务信息行损坏时不续跑其他文件夹的结果"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'result.xlsx')
+        journal = JobJournal(output_file, '/other')
+        with open(journal.journal_path, 'w', encoding='utf-8') as f:
+            f.write('{"type": "job", "fold\n')
+            f.write(json.dumps(dict(make_row('/other/a.jpg'), type='result'), ensure_ascii=False) + '\n')
+
+        journal = JobJournal(output_file, '/data')
+        completed = journal.open()
+        journal.close()
+        assert completed == {}
+        header = json.loads(read_lines(journal.journal_path)[0])
+        assert header['folder'] == os.path.normpath('/data')
+
+
+def test_other_folder_and_retry_statuses():
+    """其他文件夹的日志重新开始，处理错误的文件续跑时重新处理"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'result.xlsx')
+        journal = JobJournal(output_file, '/data')
+        journal.open()
+        journal.record(make_row('/data/a.jpg'))
+        journal.record(make_row('/data/b.jpg', status='处理错误'))
+        journal.close()
+
+        journal = JobJournal(output_file, '/data')
+        assert list(journal.open()) == ['/data/a.jpg']
+        journal.close()
+
+        journal = JobJournal(output_file, '/elsewhere')
+        assert journal.open() == {}
+        journal.remove()
+        assert not os.path.exists(journal.journal_path)
+
+
+def test_other_profile_or_method_starts_new_job():
+    """预处理档位或识别方法不同时旧结果不可复用，重新开始"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, 'result.xlsx')
+        journal = JobJournal(output_file, '/data', 'standard', 'multiple')
+        journal.open()
+        journal.record(make_row('/data/a.jpg'))
+        journal.close()
+
+        journal = JobJournal(output_file, '/data', 'standard', 'multiple')
+        assert list(journal.open()) == ['/data/a.jpg']
+        journal.close()
+
+        for profile, method in (('fast', 'multiple'), ('fast', 'single')):
+            journal = JobJournal(output_file, '/data', profile, method)
+            assert journal.open() == {}
+            journal.close()
+            header = json.loads(read_lines(journal.journal_path)[0])
+            assert (header['profile'], header['method']) == (profile, method)
+
+
+def main():
+    """主函数"""
+    print("开始断点日志验证")
+    print("=" * 50)
+    for test in (test_resume_after_partial_line, test_corrupt_header_starts_new_job,
+                 test_other_folder_and_retry_statuses, test_other_profile_or_method_starts_new_job):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("断点日志验证通过！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段流水线验证脚本
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from utils.pipeline import Stage, StagedPipeline
+
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'pipeline']
+
+
+def wait_for_pipeline_threads(timeout=5):
+    deadline = time.monotonic() + timeout
+    while pipeline_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return pipeline_threads()
+
+
+def slow_square(item):
+    # 排在前面的条目更慢，完成顺序与输入顺序相反
+    time.sleep(0.002 * (20 - item))
+    return item * item
+
+
+async def add_one(item):
+    await asyncio.sleep(0)
+    return item + 1
+
+
+class CountingSource:
+    """无限输入，记录流水线已经取走了多少个条目"""
+
+    def __init__(self):
+        self.taken = 0
+
+    def __iter__(self):
+        for item in itertools.count():
+            self.taken += 1
+            yield item
+
+
+def test_ordered_output():
+    """按输入顺序产出结果，在途条目数不超过max_in_flight；不要求顺序时产出相同的结果"""
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for ordered in (True, False):
+            seen = []
+            stages = [
+                Stage('square', slow_square, concurrency=4, executor=executor),
+                Stage('ordered', lambda item, seen=seen: seen.append(item) or item, ordered=True),
+                Stage('add', add_one, concurrency=2, skip=lambda item: item % 2 == 1),
+            ]
+            pipeline = StagedPipeline(stages, queue_size=2, max_in_flight=6, ordered=ordered)
+            results = []
+            for value in pipeline.run(range(20)):
+                assert pipeline.in_flight <= 6
+                results.append(value)
+
+            expected = [i * i + (1 - i % 2) for i in range(20)]
+            if ordered:
+                assert results == expected, results
+            else:
+                assert sorted(results) == sorted(expected)
+            # ordered阶段按输入顺序收到条目，与square阶段的完成顺序无关
+            assert seen == [i * i for i in range(20)]
+
+            stats = pipeline.snapshot()
+            assert stats['square']['processed'] == 20
+            assert (stats['add']['processed'], stats['add']['skipped']) == (10, 10)
+    assert not wait_for_pipeline_threads()
+
+
+def test_early_stop_cancels_pipeline():
+    """调用方提前结束迭代时流水线停止，不再从输入中取条目，后台线程结束"""
+    source = CountingSource()
+    pipeline = StagedPipeline([Stage('identity', lambda item: item)], queue_size=2, max_in_flight=4)
+    results = []
+    for value in pipeline.run(source):
+        results.append(value)
+        if len(results) == 5:
+            break
+
+    assert results == [0, 1, 2, 3, 4]
+    assert not wait_for_pipeline_threads()
+    taken = source.taken
+    print(f"   提前结束时已取走 {taken} 个条目")
+    assert taken <= len(results) + 4 + 1
+    time.sleep(0.05)
+    assert source.taken == taken
+
+
+def test_unhandled_exception_propagates():
+    """阶段或输入迭代中未处理的异常从run()抛出，流水线随之结束"""
+    # 批量识别引擎自己把单个文件的异常转为结果行，不会走到这里（见test_batch_engine.py）
+    def failing_source():
+        yield 0
+        raise OSError("扫描失败")
+
+    pipeline = StagedPipeline([Stage('identity', lambda item: item)])
+    try:
+        list(pipeline.run(failing_source()))
+    except OSError as e:
+        assert str(e) == "扫描失败"
+    else:
+        raise AssertionError("输入迭代中的异常应从run()抛出")
+
+    def fail_on_three(item):
+        if item == 3:
+            raise ValueError("坏条目")
+        return item
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for stage in (Stage('fail', fail_on_three), Stage('fail', fail_on_three, concurrency=2, executor=executor)):
+            pipeline = StagedPipeline([stage], max_in_flight=4)
+            results = []
+            try:
+                for value in pipeline.run(range(100)):
+                    results.append(value)
+            except ValueError as e:
+                assert str(e) == "坏条目"
+            else:
+                raise AssertionError("阶段中的异常应从run()抛出")
+            assert results == [0, 1, 2][:len(results)]
+    assert not wait_for_pipeline_threads()
+
+
+def main():
+    """主函数"""
+    print("开始分阶段流水线验证")
+    print("=" * 50)
+    for test in (test_ordered_output, test_early_stop_cancels_pipeline, test_unhandled_exception_propagates):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("分阶段流水线验证通过！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片文件预读验证脚本
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加src目录到Python路径
+current_dir = os.path.dirname(__file__)
+src_dir = os.path.join(current_dir, 'src')
+sys.path.insert(0, src_dir)
+
+from utils.prefetch import ImagePrefetcher
+
+
+def make_files(root, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, f"{i:02d}.jpg")
+        with open(path, 'wb') as f:
+            f.write(bytes([i]) * size)
+        paths.append(path)
+    return paths
+
+
+class CountingFiles:
+    """记录预读器已经从输入中取走了多少个路径"""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.taken = 0
+
+    def __iter__(self):
+        for path in self.paths:
+            self.taken += 1
+            yield path
+
+
+def run_prefetcher(files, **kwargs):
+    """返回(产出的(路径, 内容)列表, 每次产出时已取走但未产出的文件数)"""
+    items = []
+    ahead = []
+    for item in ImagePrefetcher(files, **kwargs):
+        ahead.append(files.taken - len(items) - 1)
+        items.append(item)
+    return items, ahead
+
+
+def test_order_and_content():
+    """按输入顺序产出文件内容"""
+    with tempfile.TemporaryDirectory() as root:
+        paths = make_files(root, 12, 100)
+        items, ahead = run_prefetcher(CountingFiles(paths), depth=4, threads=2)
+        assert [path for path, _ in items] == paths
+        assert all(buffer.nbytes == 100 and buffer[0] == i for i, (_, buffer) in enumerate(items))
+        assert max(ahead) <= 3
+
+
+def test_byte_budget():
+    """预读的字节数（含尚未读完的文件）达到上限后不再预读，但至少保留一个在途文件"""
+    with tempfile.TemporaryDirectory() as root:
+        paths = make_files(root, 10, 1000)
+        files = CountingFiles(paths)
+        items, ahead = run_prefetcher(files, depth=8, max_bytes=0, threads=4)
+        print(f"   每次产出时的预读数: {ahead}")
+        assert [path for path, _ in items] == paths
+        assert max(ahead) == 0
+
+        # 单个文件超过上限时仍然逐个读取；尚未读完的文件也计入上限
+        items, ahead = run_prefetcher(CountingFiles(paths), depth=8, max_bytes=500, threads=4)
+        assert len(items) == len(paths) and all(buffer.nbytes == 1000 for _, buffer in items)
+        assert max(ahead) == 0
+
+        items, ahead = run_prefetcher(CountingFiles(paths), depth=8, max_bytes=2500, threads=4)
+        print(f"   上限2500字节时每次产出时的预读数: {ahead}")
+        assert [path for path, _ in items] == paths
+        assert max(ahead) == 2
+
+
+def test_skip_and_missing():
+    """跳过的文件不读取，读取失败的文件内容为None"""
+    with tempfile.TemporaryDirectory() as root:
+        paths = make_files(root, 3, 10)
+        missing = os.path.join(root, 'missing.jpg')
+        items, _ = run_prefetcher(CountingFiles(paths + [missing]), skip={paths[1]})
+        assert [path for path, _ in items] == paths + [missing]
+        assert items[0][1] is not None and items[1][1] is None and items[3][1] is None
+
+
+def main():
+    """主函数"""
+    print("开始图片文件预读验证")
+    print("=" * 50)
+    for test in (test_order_and_content, test_byte_budget, test_skip_and_missing):
+        print(f"[TEST] {test.__doc__}")
+        test()
+        print("[SUCCESS] 通过")
+    print("=" * 50)
+    print("图片文件预读验证通过！")
+
+
+if __name__ == "__main__":
+    main()